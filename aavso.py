@@ -1,7 +1,22 @@
 #!/usr/bin/python3
 
+import collections
+import numpy as np
+import pandas as pd
+import lxml.html
 import requests
-from bs4 import BeautifulSoup
+import cache, cones, services, vsx_index
+
+
+# header texts of the results table columns read from a VSX results page (the coordinates column may name its
+# equinox after Coords)
+RESULTS_COLUMNS = {'dist': 'Dist.', 'name': 'Name', 'coords': 'Coords', 'type': 'Type'}
+
+# search page of VSX; format=d lists the objects found with their distances, nearest first (order=9)
+SEARCH_URL = 'http://www.aavso.org/vsx/index.php?view=results.get&format=d&order=9&coords='
+
+# an object of a VSX results page, with its position in degrees (nan if the page has none)
+Neighbour = collections.namedtuple('Neighbour', ['dist', 'name', 'type', 'ra', 'dec'])
 
 
 def main():
@@ -22,39 +37,27 @@ def check_vsx(RA, DEC, close) -> object:
 	coords = str(RA) + '+' + str(DEC)
 
 	# concatenate the base url with the coordinates
-	url = 'http://www.aavso.org/vsx/index.php?view=results.get&format=d&order=9&coords=' + coords
+	url = SEARCH_URL + coords
 	print('Coordinates =  ' + coords)
 	print('')
 
-	# get the html data from the url
-	r = requests.get(url)
-	html_doc = r.text
-	soup = BeautifulSoup(html_doc, 'lxml')
-	    
-	# grab the relevant object info in the 10th table
-	table = soup.find_all('table')[10]                                  
-
-	# find all the <tr> (i.e., rows of cells) in the table and get the first entry
-	all_tr = table.find_all('tr')                                       # type = bs4.ResultSet
-	first_entry = all_tr[2]                                             # type = bs4.Tag
-	second_entry = all_tr[1]
-   
-	# convert the result into a string and slice the distance (dist) and object name (idx)
-	results = first_entry.get_text().lstrip(' ')                        
-	dist = float(results[3:7])
-	idx = results[11:35].strip()
-	var_type = results[67:71].strip()
+	# get the html data from the url, or from the local cache if this position was looked up before
+	html_doc = cache.cached_text('vsx', lambda: services.get_text('vsx', url), ra=float(RA), dec=float(DEC))
+	neighbours = parse_results(html_doc)
 
 	# if no objects are found nearby, make 'answer' = '1' and proceed with analysis
-	if results[3:8] == 'There':
+	if len(neighbours) == 0:
 		print('No nearby objects were found')
 		print('')
 		print('PROCEEDING WITH ANALYSIS...')
-		answer = '1'
+		answer, idx, var_type = '1', '', ''
 
-	# if objects are found do 1 of 2 things:
+	# if objects are found do 1 of 2 things, going by the nearest one:
 	else:
+		dist, idx, var_type = neighbours[0][:3]
 		print('The VSX object {} of type {} is located {} arcmin from the coordinates you entered'.format(idx, var_type, dist))
+		if len(neighbours) > 1:
+			print('{} more VSX objects are within {:.2f} arcmin'.format(len(neighbours) - 1, neighbours[-1].dist))
 		print('')
 		# 1) if the nearby object is within the specified distance, assume its the same object and move on
 		if dist < close:
@@ -70,5 +73,118 @@ def check_vsx(RA, DEC, close) -> object:
 	return answer, idx, var_type
 
 
+def parse_results(html_doc):
+	'''Reads every object of a VSX results page into a list of Neighbours (distance in arcmin, name, type and
+	position), nearest first. The page is parsed by lxml, the results table is found with XPath by its header row
+	(see RESULTS_COLUMNS) and every row after it is read cell by cell, so long names, types and distances are kept
+	whole'''
+
+	doc = lxml.html.fromstring(html_doc)
+	header = doc.xpath('//tr[td[normalize-space()="{0}"] or th[normalize-space()="{0}"]]'.format(
+		RESULTS_COLUMNS['dist']))
+	if not header:
+		return []
+
+	labels = [cell.text_content().strip() for cell in header[0].xpath('./td|./th')]
+	try:
+		at = {key: next(i for i, label in enumerate(labels) if label.startswith(text))
+			for key, text in RESULTS_COLUMNS.items()}
+	except StopIteration:
+		return []
+
+	rows = header[0].xpath('ancestor::table[1]//tr')
+	found = []
+	for row in rows[rows.index(header[0]) + 1:]:
+		cells = [cell.text_content().strip() for cell in row.xpath('./td')]
+
+		# 'There were no records found' is a row of one cell
+		if len(cells) < len(labels):
+			continue
+
+		try:
+			dist = float(cells[at['dist']].rstrip("'"))
+		except ValueError:
+			continue
+		ra, dec = parse_coords(cells[at['coords']])
+		found.append(Neighbour(dist, cells[at['name']], cells[at['type']], ra, dec))
+
+	return sorted(found, key=lambda neighbour: neighbour.dist)
+
+
+def parse_coords(text):
+	'''Right ascension and declination in degrees of the sexagesimal coordinates of a VSX results row, e.g.
+	'18 09 40.30 -32 33 22.1'; nan, nan if they cannot be read'''
+
+	parts = text.split()
+	if len(parts) != 6:
+		return np.nan, np.nan
+
+	try:
+		h, m, s, d, dm, ds = map(float, parts)
+	except ValueError:
+		return np.nan, np.nan
+
+	sign = -1 if parts[3].startswith('-') else 1
+
+	return (h + m / 60 + s / 3600) * 15, sign * (abs(d) + dm / 60 + ds / 3600)
+
+
+def search(RA, DEC, radius):
+	'''All the VSX objects within radius arcmin of the coordinates (degrees), as Neighbours, nearest first'''
+
+	coords = str(RA) + '+' + str(DEC)
+	url = SEARCH_URL + coords + '&size={:.4f}&unit=2'.format(radius)
+
+	html_doc = cache.cached_text('vsx_cone', lambda: services.get_text('vsx', url), ra=float(RA), dec=float(DEC),
+					radius=round(float(radius), 4))
+
+	return parse_results(html_doc)
+
+
+def classify_query(df, close, index):
+	'''Checks every object of the query dataframe against a local VSX index at once and returns a dataframe with
+	the proceed answer ('1' if no VSX object within close arcmin), the nearest VSX name and type, and its distance'''
+
+	# the query file has right ascension in decimal hours
+	ra_d = df['RA'].astype(float).to_numpy() * 360 / 24
+	dec_d = df['Decl'].astype(float).to_numpy()
+	dist, names, types = index.nearest(ra_d, dec_d)
+
+	return pd.DataFrame({'proceed': np.where(dist < close, '0', '1'), 'vsx_id': names, 'vsx_type': types,
+				'vsx_dist': dist}, index=df.index)
+
+
+def classify_cones(df, close, cluster=cones.CLUSTER_RADIUS):
+	'''Like classify_query, but from the web: the objects of the query dataframe are grouped into cones (see
+	cones.plan) and every cone is searched in VSX once. The objects found are put into a small local index and
+	every member of the cone gets its nearest one by exact separation, as check_vsx would have found it. Members
+	of a cone whose search fails are left out, to be checked one by one'''
+
+	ra_d = df['RA'].astype(float).to_numpy() * 360 / 24
+	dec_d = df['Decl'].astype(float).to_numpy()
+
+	frames = []
+	for cone in cones.plan(ra_d, dec_d, vsx_index.SEARCH_RADIUS, cluster):
+		members = df.iloc[cone.members]
+		try:
+			neighbours = [n for n in search(cone.ra, cone.dec, cone.radius) if np.isfinite(n.ra)]
+		except (cache.CacheMiss, requests.RequestException) as e:
+			print('VSX search of a cone of {} objects failed ({}); checking them one by one'.format(len(members), e))
+			continue
+
+		if not neighbours:
+			frames.append(pd.DataFrame({'proceed': '1', 'vsx_id': '', 'vsx_type': '', 'vsx_dist': np.inf},
+							index=members.index))
+			continue
+
+		names, types, ras, decs = zip(*((n.name, n.type, n.ra, n.dec) for n in neighbours))
+		frames.append(classify_query(members, close, vsx_index.VSXIndex(ras, decs, names, types)))
+
+	if not frames:
+		return pd.DataFrame(columns=['proceed', 'vsx_id', 'vsx_type', 'vsx_dist'], index=df.index[:0])
+
+	return pd.concat(frames).sort_index()
+
+
 if __name__ == '__main__':
 	main()
@@ -1,133 +1,528 @@
 #!/usr/bin/python3
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import object_info, aavso, lombscargle, cross_id, phase_adjustments, parameters, initial_setup, plotting
-from matplotlib.ticker import FormatStrFormatter
-import shutil, os
-from pathlib import Path
+import numpy as np
+import initial_setup, cache, pipeline, stages, journal, instrument, services, triage
+import os, sys, json, argparse, configparser, shlex
+from collections import deque
+from functools import partial
 
 
-def main():
-	'''main program loop for determining period and epoch of a candidate eclipsing variable \
-	and then graphing its corresponding periodiagram and phase plot'''
+# Only the light modules are imported up front; pandas, matplotlib, astropy, astroquery and the rest are imported by
+# the commands and stages that use them, so --help, report and resuming a finished run start in a fraction of a
+# second and the analysis processes load only what the analysis needs
 
-	print_header()
-	print('')
+# the commands of the program; without one the options are those of run
+COMMANDS = ['ingest', 'run', 'resume', 'report']
 
-	# read the query file, create a dataframe, define the size and starting point in the df
-	# decide how close for a cross-id, and decide whether or not to run fully auto or with user input
-	df, total, start, how_close, auto_choice = initial_setup.read_query()
 
-	home = os.getcwd()
-		
-	# The primary loop that goes through each row of the dataframe df
-	for obj in range(start, total):
+def main(argv=None):
+	'''Runs one of the commands, e.g.
 
-		print('Now checking object {} of {}...'.format(str(obj), str(total)))
+	./app_eclipseDataminer.py ingest vsx.dat vsx_index.npz    make a local VSX index from a VSX catalog dump
+	./app_eclipseDataminer.py run --config run.ini            search a query file (the default command)
+	./app_eclipseDataminer.py resume                          run the last run again, skipping the finished objects
+	./app_eclipseDataminer.py report                          summarize the journal and the metrics of a run'''
 
-		# slice coordinates from data frame and convert right ascension in hours to decimal degrees
-		ra_h = df.iloc[obj][3]
-		ra_d = float(ra_h) * 360 / 24 
+	argv = sys.argv[1:] if argv is None else list(argv)
+	command = argv.pop(0) if argv and argv[0] in COMMANDS else 'run'
 
-		dec_d = df.iloc[obj][4]
-		
-		# check AAVSO's index (VSX) to see if variable star already exists at given position; check_vsx returns '1' if none found
-		proceed, vsx_name, vsx_type = aavso.check_vsx(ra_d, dec_d, how_close)
+	{'ingest': ingest, 'run': run, 'resume': resume, 'report': report}[command](argv)
 
-		# append df with vsx star id and vsx star type
-		df.ix[obj, 'vsx_id'] = vsx_name
-		df.ix[obj, 'vsx_type'] = vsx_type
 
-		# If there is already a nearby variable (nearby defined by 'how_close'), move to the next object
-		if proceed != '1':      
-			continue
+def run(argv=None, resuming=False):
+	'''main program loop for determining period and epoch of a candidate eclipsing variable \
+	and then graphing its corresponding periodiagram and phase plot'''
+
+	argv = sys.argv[1:] if argv is None else argv
+	args = parse_args(argv)
+	if resuming:
+		args.fresh = False
 
-		# set the field name, star id (sid), and url of the object
-		field_nm =  str(df.iloc[obj][0])
-		sid = str(df.iloc[obj][1])
-		print('The field name is ' + field_nm + ' and the star_id is ' + sid)
-		name, url = object_info.set_name(field_nm, sid)
+	print_header()
+	print('')
 
-		# get the data from the url just generated with the object's name then plot raw data to validate
-		dat = object_info.get_data_from_web(url)
-		if dat.empty == True:
+	# responses from VSX, OGLE and VizieR are kept on disk so reruns do not repeat the network requests
+	if args.no_cache:
+		cache.configure(None)
+	else:
+		cache.configure(args.cache, args.cache_ttl * 24 * 3600, args.cache_size * 1024 * 1024, args.offline)
+
+	# VSX, OGLE and VizieR can be stood in for by a local server, e.g. the replay server for load tests
+	if args.services is not None:
+		services.use(args.services)
+	services.configure_client(args.per_host, (args.connect_timeout, args.read_timeout), args.retries)
+
+	# headless runs never wait on a human: plots are only saved and every choice comes from the options
+	if args.headless:
+		import matplotlib
+		matplotlib.use('Agg')
+
+	# find the query file, define the size and starting point in the query, decide how close for a cross-id, and
+	# decide whether or not to run fully auto or with user input
+	query_file, total, start, how_close, auto_choice = initial_setup.read_query(args.query, args.start,
+										args.distance, '1' if args.auto else None,
+										args.stop)
+
+	# URLs can be given in a file instead of pasted in for every object
+	urls = None
+	if args.url_file is not None:
+		import object_info
+		urls = object_info.read_url_file(args.url_file)
+
+	# network lookups, analysis and output run as overlapping stages; in user input mode or without a url file
+	# the stages run one object at a time on the main thread so prompts and plot windows still work
+	unattended = auto_choice == '1' and (urls is not None or args.url_template is not None)
+	if args.pipeline and unattended:
+		kinds = ('thread', 'process')
+	else:
+		if args.pipeline or args.workers:
+			print('The pipeline and batch modes need fully automatic mode and a url source; running one object at a time')
+		kinds = ('inline', 'inline')
+
+	ls_args = {'method': args.ls_method, 'nterms': args.ls_nterms, 'nyquist': args.ls_nyquist,
+		'min_freq': args.ls_min_freq, 'max_freq': args.ls_max_freq, 'samples_per_peak': args.ls_samples_per_peak,
+		'search': args.ls_search, 'top': args.ls_top, 'engine': args.period_engine}
+	settings = {'url_template': args.url_template, 'ls_args': ls_args, 'duration': args.eclipse_duration,
+		'folders': not args.no_folders, 'profile_every': args.profile_every, 'profile_dir': args.profile_dir,
+		'triage': {'min_chi2': args.min_chi2, 'min_stetson_j': args.min_stetson_j, 'min_amplitude': args.min_amplitude,
+			'min_skew': args.min_skew, 'min_points': args.min_points} if args.triage else None,
+		'triage_query': args.triage_query, 'plots': 'skip' if args.no_folders else args.plots or ('background' if unattended else 'inline'),
+		'max_points': args.max_points}
+
+	# every stage outcome goes to an append-only journal; objects finished by an earlier run are skipped and the
+	# results they left in the journal are restored, so a restart never repeats their network and compute work.
+	# VSX checks are reused if they were made with the same lookup options, analyses if they were made with the
+	# same analysis options too; the rest are done again
+	run_journal = None
+	states = {}
+	if not args.no_journal:
+		lookup_key = journal.settings_key({'how_close': how_close, 'vsx_index': args.vsx_index})
+		analysis_key = journal.settings_key({'auto': auto_choice, 'ls_args': ls_args, 'duration': settings['duration'],
+							'triage': settings['triage'], 'triage_query': settings['triage_query']})
+		stale = set()
+		states = {} if args.fresh else journal.load(args.journal, lookup_key, analysis_key, stale)
+		if any(start <= obj < total for obj in stale):
+			print('Objects journaled with other options (distance, VSX index, triage or period search) are looked up '
+				'or analyzed again')
+		run_journal = journal.Journal(args.journal, fresh=args.fresh, lookup_key=lookup_key, analysis_key=analysis_key)
+		save_options(args.journal, argv)
+
+	steps = [pipeline.Stage('lookup', partial(stages.lookup, journal=run_journal), args.io_workers, kinds[0])]
+
+	# in background mode the plots come back with the records and are rendered on their own processes while the
+	# analysis goes on
+	renderer = None
+	if settings['plots'] == 'background':
+		import render
+		renderer = render.Renderer(args.plot_workers)
+
+	# the time every stage takes, the bytes downloaded and the points analyzed go to a JSON lines file per object,
+	# and the rate and time left are printed as the run goes
+	monitor = instrument.Monitor(None if args.no_metrics else args.metrics, total - start,
+					every=args.progress_every)
+
+	# the query file is read lazily in batches as the pipeline asks for more objects; every batch waits in pending
+	# until its last object comes out of the pipeline and is then written out
+	pending = deque()
+	batches = initial_setup.read_batches(query_file, start, total, args.query_batch, args.query_columns)
+	tasks = batch_tasks(batches, pending, start, total, how_close, auto_choice, args.vsx_index, urls, settings, states,
+				args.batch_xid, args.coalesce, monitor)
+
+	# batch mode looks up the objects first and then analyzes their light curves on a pool of 'workers' processes
+	if args.workers and unattended:
+		import batch
+		steps[0].kind = 'thread'
+		results = batch.analyze_all(pipeline.run(tasks, steps, args.queue_size), args.workers, field_ls=args.field_ls,
+						window=args.query_batch)
+	else:
+		steps.append(pipeline.Stage('analyze', stages.analyze, args.cpu_workers, kinds[1], when=stages.has_data))
+		results = pipeline.run(tasks, steps, args.queue_size)
+
+	# the results can also go to a columnar catalog, appended in batches as the objects finish
+	results_catalog = None
+	written = 0
+
+	# The primary loop that goes through each object of the query, in order, as the stages finish them
+	for rec in results:
+		obj = rec.item['obj'] if isinstance(rec, pipeline.Failed) else rec['obj']
+
+		# the batches before this object's are complete
+		while obj > pending[0][0].index[-1]:
+			written += write_batch(pending.popleft()[0], first=written == 0)
+		df, xids = pending[0]
+
+		if args.catalog is not None and results_catalog is None:
+			import catalog
+			results_catalog = catalog.Catalog(args.catalog, df)
+
+		if isinstance(rec, pipeline.Failed):
+			if isinstance(rec.error, cache.CacheMiss):
+				print('Offline mode and object {} is not cached...MOVING TO NEXT OBJECT...'.format(obj))
+			else:
+				print('Object {} failed in the {} stage: {!r}'.format(obj, rec.stage, rec.error))
+			if results_catalog is not None:
+				results_catalog.add(catalog.object_row(df, rec.item, 'failed in ' + rec.stage))
+			if run_journal is not None:
+				run_journal.failed(rec.item, rec.stage, rec.error)
+			monitor.record(rec.item, 'failed in ' + rec.stage)
 			continue
 
-		# Select only those data points graded as A, B, or C and exclude D, E, and F
-		dat = dat.loc[dat['frame_grade'].isin(['A', 'B', 'C'])]
-		# print(select_dat)
-       
-		# Plot the raw data that was just pulled from the web
-		plotting.plot_raw_data(dat, name, auto_choice)
-		print('')
+		stages.record(df, rec)
+		if renderer is not None and rec.get('plots'):
+			renderer.submit(rec.pop('plots'))
+		if run_journal is not None:
+			run_journal.done(rec, stages.status_of(rec))
+		monitor.record(rec, stages.status_of(rec))
 
-		# At this point the user can decide whether or not to proceed based on their visual interpretation of the data
-		# In the future, the fully automatic feature will make this decision based on machine learning
-		if auto_choice == '1':
-			pattern = '1'
+		if results_catalog is not None:
+			matches = rec.get('x_matches')
+			if matches is None and xids is not None:
+				matches = xids.loc[xids['obj'] == obj]
+			results_catalog.add(catalog.object_row(df, rec, stages.status_of(rec)), matches)
 
-		else:
-			# Skipping analysis to generate csv file with vsx id and type
-			# pattern=input('Continue analysis based on the plot of the raw data?[1]=Yes; [2]=No; [other key]=quit ').strip()
-			# print('')
-			pattern = '2'
+	# output the rest of the query to the csv file
+	while pending:
+		written += write_batch(pending.popleft()[0], first=written == 0)
 
-		delete_unused_file = name + '_Raw_Data.png'
+	if results_catalog is not None:
+		results_catalog.close()
+		print('Results appended to the catalog in ' + args.catalog)
 
-		if pattern == '2':
-			os.remove(delete_unused_file)
-			continue
+	if run_journal is not None:
+		run_journal.close()
 
-		if pattern != '1':   
-			os.remove(delete_unused_file)
-			break
+	if renderer is not None:
+		rendered, failed = renderer.close()
+		print('Rendered {} plots in the background{}'.format(rendered, ', {} failed'.format(failed) if failed else ''))
 
+	monitor.close()
+	if monitor.done and (not args.progress_every or monitor.done % args.progress_every):
+		print(monitor.progress())
 
-		# create a new folder for the object and generate an empty dataframe to hold the analysis parameters
-		final_df, path = object_info.make_folder(name)
+	saved = triage.savings(monitor.statuses, monitor.stage_totals)
+	if saved is not None:
+		print(saved)
 
-		# move the csv and png files into the newly created folder and switch to the new folder
-		path_to_file = Path(path + '/RAW_DATA.csv')
+	if cache.get_cache() is not None:
+		print('Cache statistics: {}'.format(cache.get_cache().stats()))
 
-		if path_to_file.is_file() == False:
-			shutil.move('./RAW_DATA.csv', path)
-			shutil.move(name + '_Raw_Data.png', path)
-			
-		os.chdir(path)
+	if services.stats():
+		print('Network statistics: {}'.format(services.stats()))
 
-		# check VizieR to cross match with objects in other catalogs...if in OGLE DIA, change to that name
-		new_name, x_matches = cross_id.viz(ra_d, dec_d, field_nm)
-		x_matches.to_csv('Possible_cross_ids.csv')
-		if new_name != 'Found nothing':
-			name = new_name
-	
-		print('New name is ' + new_name)
+	print('Good bye...')
 
-		# search for a frequency that yields an acceptable phase plot
-		freq, folded_df = lombscargle.find_freq(dat, name, auto_choice)
-		folded_df.to_csv('test_folded_df.csv')
 
-		# make adjustments to phase plot
-		epoch, zeroed = phase_adjustments.set_min_to_zero(folded_df)
-		phased = phase_adjustments.add_phases(zeroed, auto_choice)
+def batch_tasks(batches, pending, start, total, how_close, auto_choice, vsx_file, urls, settings, states, batch_xid,
+		coalesce=None, monitor=None):
+	'''Prepares the batches of the query file one after another and yields the records of their objects: each
+	batch is classified against the local VSX index in vsx_file (if any, loaded when the first batch with objects
+	left to do needs it) or in one VSX search per cone of nearby objects (with
+	coalesce, the cluster radius in arcmin), cross-identified in batched VizieR queries (with batch_xid or
+	coalesce), and gets the results journaled by an earlier run back. The objects those finished are taken off
+	the objects the monitor, if given, has to do. Every batch is appended to pending, along with its cross-ids,
+	before its records are handed out'''
+
+	vsx = None
+	for df in batches:
+		resume = journal.resume(states, df)
+		for state in resume.values():
+			stages.record(df, state)
+
+		# a batch finished by an earlier run needs no classification
+		left = [obj for obj in df.index if start <= obj < total and resume.get(obj, {}).get('stage') != 'done']
+		finished = sum(1 for obj in df.index if start <= obj < total) - len(left)
+		if finished:
+			print('Resuming: {} objects of the batch from {} were finished by an earlier run'.format(finished,
+				df.index[0]))
+			if monitor is not None:
+				monitor.todo -= finished
+
+		# with a local VSX index every object is classified up front in one vectorized query instead of one web
+		# request each
+		known = None
+		if vsx_file is not None and left:
+			import aavso, vsx_index
+			if vsx is None:
+				vsx = vsx_index.load(vsx_file)
+			known = aavso.classify_query(df, how_close, vsx)
+		elif coalesce and left:
+			import aavso
+			# objects already checked in an earlier run need no search
+			todo = [obj for obj in left if 'proceed' not in resume.get(obj, {})]
+			known = aavso.classify_cones(df.loc[todo], how_close, coalesce)
+
+		# cross-identify every surviving candidate in one batched VizieR query per catalog instead of one per object
+		xids = None
+		if batch_xid or coalesce:
+			xids = batch_cross_ids(df, known, resume, first=df.index[0] == start, coalesce=coalesce)
+
+		pending.append((df, xids))
+		yield from stages.make_tasks(df, start, total, how_close, auto_choice, known, xids, urls, settings, resume)
+
 
-		adj = phase_adjustments.set_epoch(phased, auto_choice)
-		phased.loc[:, 'Phase'] = phased.loc[:, 'Phase'].apply(lambda x: x - adj)
+def batch_cross_ids(df, known, resume, first, coalesce=None):
+	'''Cross-identifies the candidates of a batch of the query that are not known variables or already finished
+	and appends them to cross_ids.csv. With coalesce, nearby candidates share one query per cone (see
+	cross_id.viz_cones), otherwise every candidate is a position of multi-position queries (see
+	cross_id.viz_batch)'''
 
-		# calculate relevant parameters, place in data frame, and then write to file
-		period = parameters.final_csv(freq, epoch, adj, phased, auto_choice, name, final_df)
+	import cross_id
 
-		print('The name is ' + name)
-		# plot finalized phase diagram
-		plotting.final_phase_diagram(phased, name, period, auto_choice)
+	todo = df.index.to_numpy()
+	if known is not None:
+		todo = np.array([obj for obj in todo if obj not in known.index or known.loc[obj, 'proceed'] == '1'], dtype=int)
+	todo = np.array([obj for obj in todo if resume.get(obj, {}).get('stage') != 'done'], dtype=int)
 
-		os.chdir(home)
+	ra = df.loc[todo, 'RA'].astype(float).to_numpy() * 360 / 24
+	dec = df.loc[todo, 'Decl'].astype(float).to_numpy()
+	fn = df.loc[todo, 'Field'].astype(str).to_numpy()
+	xids = cross_id.viz_cones(ra, dec, fn, coalesce) if coalesce else cross_id.viz_batch(ra, dec, fn)
+	xids['obj'] = todo[xids['obj'].to_numpy(int)]
+	xids.to_csv('cross_ids.csv', index=False, mode='w' if first else 'a', header=first)
 
-	# output df to csv file
-	df.to_csv('output.csv')
+	return xids
 
-	print('Good bye...')
+
+def ingest(argv):
+	'''Loads a VSX catalog dump into a local VSX index for --vsx-index (see vsx_index.py)'''
+
+	parser = argparse.ArgumentParser(prog='app_eclipseDataminer.py ingest',
+					description='Make a local VSX index from a VSX catalog dump')
+	parser.add_argument('dump', help='vsx.dat of CDS catalog B/vsx, or a csv file with Name, RAdeg, DEdeg and Type')
+	parser.add_argument('index', help='index file to write, e.g. vsx_index.npz')
+	args = parser.parse_args(argv)
+
+	import vsx_index
+	index = vsx_index.ingest(args.dump, args.index)
+	print('Indexed {} VSX objects into {}'.format(len(index), args.index))
+
+
+def resume(argv):
+	'''Runs the last run journaled to the journal file again with the same options (see save_options); it skips
+	the objects that run finished. Options given here are added to the saved ones'''
+
+	parser = argparse.ArgumentParser(prog='app_eclipseDataminer.py resume',
+					description='Continue the last run journaled to a journal file')
+	parser.add_argument('--journal', default=journal.DEFAULT_PATH, help='journal file of the run')
+	args, extra = parser.parse_known_args(argv)
+
+	path = options_file(args.journal)
+	if not os.path.exists(path):
+		parser.error('no run to resume: {} not found'.format(path))
+
+	with open(path, encoding='utf-8') as f:
+		saved = json.load(f)
+
+	if os.path.abspath(saved['cwd']) != os.getcwd():
+		print('Resuming in ' + saved['cwd'])
+		os.chdir(saved['cwd'])
+
+	run(saved['argv'] + extra, resuming=True)
+
+
+def report(argv):
+	'''Summarizes a run from its journal and metrics files, without loading any of the analysis'''
+
+	parser = argparse.ArgumentParser(prog='app_eclipseDataminer.py report',
+					description='Summarize the journal and the metrics of a run')
+	parser.add_argument('--journal', default=journal.DEFAULT_PATH, help='journal file of the run')
+	parser.add_argument('--metrics', default='metrics.jsonl', help='metrics file of the run')
+	args = parser.parse_args(argv)
+
+	states = journal.load(args.journal)
+	outcomes = {}
+	for state in states.values():
+		outcome = {'done': state.get('status'), 'failed': 'failed in ' + str(state.get('failed_in'))}.get(state['stage'],
+														'looked up')
+		outcomes[outcome] = outcomes.get(outcome, 0) + 1
+	print('{}: {} objects{}'.format(args.journal, len(states), ''.join(', {} {}'.format(n, outcome) for outcome, n in
+										sorted(outcomes.items()))))
+
+	if os.path.exists(args.metrics):
+		summary = instrument.summarize(args.metrics)
+		print('{}: {} objects, {:.0f} objects/hour'.format(args.metrics, summary['objects'], summary['rate']))
+		for name in ('stages', 'timings', 'counts'):
+			if summary[name]:
+				print('  {}: {}'.format(name, ', '.join('{} {:.6g}'.format(k, v) for k, v in
+								summary[name].most_common())))
+
+
+def options_file(journal_path):
+	'''File the options of the run journaled to journal_path are saved in, for resume'''
+
+	return os.path.splitext(journal_path)[0] + '_options.json'
+
+
+def save_options(journal_path, argv):
+	'''Saves the command line of a run and the directory it runs in next to its journal'''
+
+	with open(options_file(journal_path), 'w', encoding='utf-8') as f:
+		json.dump({'argv': list(argv), 'cwd': os.getcwd()}, f)
+
+
+def write_batch(df, first):
+	'''Writes a finished batch of the query with its results to output.csv and returns the number of objects'''
+
+	df.to_csv('output.csv', mode='w' if first else 'a', header=first)
+
+	return len(df)
+
+
+def parse_args(argv=None):
+	'''Reads the command line options. Options can also be given in the [eclipse_dataminer] section of a config
+	file (--config) using the option names with underscores, e.g. url_template = ...; the command line wins'''
+
+	argv = sys.argv[1:] if argv is None else list(argv)
+
+	parser = argparse.ArgumentParser(description='Search OGLE photometry for new eclipsing binaries. These are the '
+					'options of the run command; the other commands are ' + ', '.join(COMMANDS[:1] + COMMANDS[2:]) +
+					' (see their --help)')
+	parser.add_argument('--config', help='ini file with default values for any of these options')
+	parser.add_argument('--headless', action='store_true', help='never prompt or open plot windows (implies --auto)')
+	parser.add_argument('--query', help='OGLE query text file')
+	parser.add_argument('--start', type=int, help='first object of the query file to check')
+	parser.add_argument('--stop', type=int, help='stop before this object of the query file')
+	parser.add_argument('--query-batch', type=int, default=initial_setup.BATCH_SIZE,
+				help='objects of the query file read (and written to output.csv) at a time')
+	parser.add_argument('--query-columns', nargs='+',
+				help='query columns to keep besides Field, StarID, RA and Decl (default all)')
+	parser.add_argument('--distance', type=float, help='arcmin within which a VSX object counts as the same object')
+	parser.add_argument('--auto', action='store_true', help='run the analysis fully automated')
+	parser.add_argument('--url-template', help='OGLE photometry url with {field} and {starid} placeholders')
+	parser.add_argument('--url-file', help='csv file with Field, StarID and url columns instead of pasting each url')
+	parser.add_argument('--ls-method', help='astropy LombScargle method used in automatic mode')
+	parser.add_argument('--ls-nterms', type=int, help='number of Fourier terms for the chi2 methods')
+	parser.add_argument('--ls-nyquist', type=float, help='Nyquist factor of the frequency grid')
+	parser.add_argument('--ls-min-freq', type=float, help='minimum frequency of the grid (with --ls-max-freq)')
+	parser.add_argument('--ls-max-freq', type=float, help='maximum frequency of the grid (with --ls-min-freq)')
+	parser.add_argument('--ls-samples-per-peak', type=float, help='samples per peak of the frequency grid')
+	parser.add_argument('--ls-search', choices=['dense', 'topk'], default='dense',
+				help='dense grid, or coarse-to-fine search of the top peaks checking P, 2P and P/2')
+	parser.add_argument('--ls-top', type=int, default=5, help='number of coarse peaks refined by --ls-search topk')
+	parser.add_argument('--period-engine', choices=['lombscargle', 'bls', 'pdm', 'ce'], default='lombscargle',
+				help='score the dense frequency grid with Lomb-Scargle, Box Least Squares, phase dispersion '
+				'minimization or conditional entropy')
+	parser.add_argument('--eclipse-duration', type=duration, default=0.2,
+				help="phase duration of the primary eclipse, or 'auto' to estimate it from each light curve")
+	parser.add_argument('--cache', default=cache.DEFAULT_PATH, help='file holding cached VSX, OGLE and VizieR responses')
+	parser.add_argument('--cache-ttl', type=float, default=30, help='days before a cached response is fetched again')
+	parser.add_argument('--cache-size', type=float, default=512, help='size in MB before old responses are evicted')
+	parser.add_argument('--offline', action='store_true', help='only use cached responses, never the network')
+	parser.add_argument('--services', help='base URL of a server standing in for VSX, OGLE and VizieR (see replay.py)')
+	parser.add_argument('--per-host', type=int, default=services.PER_HOST, help='requests to one host at a time')
+	parser.add_argument('--connect-timeout', type=float, default=services.TIMEOUT[0],
+				help='seconds to wait for a connection to a service')
+	parser.add_argument('--read-timeout', type=float, default=services.TIMEOUT[1],
+				help='seconds to wait for a service to answer')
+	parser.add_argument('--retries', type=int, default=services.RETRIES,
+				help='retries of a request that failed, with exponential backoff')
+	parser.add_argument('--vsx-index', help='local VSX index made by vsx_index.py to use instead of the VSX website')
+	parser.add_argument('--batch-xid', action='store_true', help='cross-identify all candidates in batched VizieR queries')
+	parser.add_argument('--coalesce', type=float, metavar='ARCMIN',
+				help='search VSX and VizieR once per cone of candidates within ARCMIN of each other')
+	parser.add_argument('--triage', action='store_true',
+				help='skip the period search of light curves that plainly do not vary (see triage.py)')
+	parser.add_argument('--triage-query', action='store_true',
+				help='do not download objects whose query file Isig, Imederr and Ndetect show they do not vary')
+	parser.add_argument('--min-chi2', type=float, default=triage.MIN_CHI2,
+				help='triage: reduced chi-square against a constant that counts as variable')
+	parser.add_argument('--min-stetson-j', type=float, default=triage.MIN_STETSON_J,
+				help="triage: Stetson's J that counts as variable")
+	parser.add_argument('--min-amplitude', type=float, default=triage.MIN_AMPLITUDE,
+				help='triage: 1st to 99th percentile amplitude, in median errors, that counts as variable')
+	parser.add_argument('--min-skew', type=float, default=triage.MIN_SKEW,
+				help='triage: light curves skewed further toward bright magnitudes are rejected')
+	parser.add_argument('--min-points', type=int, default=triage.MIN_POINTS, help='triage: fewest good points')
+	parser.add_argument('--pipeline', action='store_true', help='overlap network lookups, analysis and output')
+	parser.add_argument('--io-workers', type=int, default=8, help='threads for the network stage of the pipeline')
+	parser.add_argument('--cpu-workers', type=int, default=os.cpu_count(), help='processes for the analysis stage')
+	parser.add_argument('--workers', type=int, default=0, help='batch mode: analyze all light curves on this many processes')
+	parser.add_argument('--field-ls', action='store_true', help='batch mode: one Lomb-Scargle pass per OGLE field')
+	parser.add_argument('--queue-size', type=int, default=16, help='objects waiting between pipeline stages')
+	parser.add_argument('--no-cache', action='store_true', help='do not read or write the response cache')
+	parser.add_argument('--journal', default=journal.DEFAULT_PATH, help='file journaling the outcome of every object')
+	parser.add_argument('--fresh', action='store_true', help='start over instead of resuming from the journal')
+	parser.add_argument('--no-journal', action='store_true', help='neither resume from nor write a journal')
+	parser.add_argument('--metrics', default='metrics.jsonl',
+				help='file the stage timings and counts of every object are appended to as JSON lines')
+	parser.add_argument('--no-metrics', action='store_true', help='do not write the metrics file')
+	parser.add_argument('--progress-every', type=int, default=instrument.PROGRESS_EVERY,
+				help='print the rate and time left every this many objects (0 for never)')
+	parser.add_argument('--profile-every', type=int,
+				help='run every this many-th object under cProfile (with --profile-dir)')
+	parser.add_argument('--profile-dir', default='profiles', help='directory the cProfile statistics are saved to')
+	parser.add_argument('--catalog', help='directory of a Parquet results catalog to append the results to')
+	parser.add_argument('--no-folders', action='store_true', help='keep no folder of csv files and plots per object')
+	parser.add_argument('--plots', choices=['inline', 'background', 'skip'],
+				help='draw the plots in the analysis, on separate processes, or not at all (default background for '
+				'unattended runs, inline otherwise)')
+	parser.add_argument('--plot-workers', type=int, default=2, help='processes rendering the plots in background mode')
+	parser.add_argument('--max-points', type=int,
+				help='thin dense plots to about this many points (0 keeps them all; default 20000)')
+
+	args = parser.parse_args(argv)
+	if args.config is not None:
+		args = parser.parse_args(read_config(parser, args.config) + argv)
+
+	if args.headless:
+		args.auto = True
+		missing = [opt for opt in ('query', 'start', 'distance') if getattr(args, opt) is None]
+		if args.url_template is None and args.url_file is None:
+			missing.append('url_template or url_file')
+		if missing:
+			parser.error('--headless needs these options: ' + ', '.join(missing))
+
+	if args.period_engine != 'lombscargle' and (args.ls_search == 'topk' or args.field_ls):
+		parser.error('--period-engine {} scores the dense grid; it cannot be used with --ls-search topk or '
+				'--field-ls, which use Lomb-Scargle'.format(args.period_engine))
+
+	if args.query is not None and not os.path.isfile(args.query):
+		parser.error('cannot read query file ' + args.query)
+
+	return args
+
+
+def duration(value):
+	'''Type of the --eclipse-duration option: a phase between 0 and 1, or auto'''
+
+	if value == 'auto':
+		return value
+	if not 0 < float(value) < 1:
+		raise argparse.ArgumentTypeError('the duration must be greater than 0 and less than 1')
+
+	return float(value)
+
+
+def read_config(parser, config_file):
+	'''Reads the [eclipse_dataminer] section of an ini file into command line arguments, so its values get the
+	same types, nargs and choices checks as the options given on the command line'''
+
+	config = configparser.ConfigParser(interpolation=None)
+	if not config.read(config_file):
+		parser.error('cannot read config file ' + config_file)
+
+	section = config['eclipse_dataminer'] if config.has_section('eclipse_dataminer') else {}
+	actions = [action for action in parser._actions if action.option_strings and action.dest != 'help']
+	argv = []
+	for action in actions:
+		if action.dest not in section:
+			continue
+
+		# on/off flags take yes/no/true/false, options of several values are split like a shell would
+		option = action.option_strings[-1]
+		if action.nargs == 0:
+			if config.getboolean('eclipse_dataminer', action.dest):
+				argv.append(option)
+		elif action.nargs is None:
+			argv.append(option + '=' + section[action.dest])
+		else:
+			argv += [option] + shlex.split(section[action.dest])
+
+	unknown = set(section) - set(action.dest for action in actions)
+	if unknown:
+		parser.error('unknown options in config file: ' + ', '.join(sorted(unknown)))
+
+	return argv
 
 
 def print_header():
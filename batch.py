@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pipeline, stages
+
+
+def main():
+	'''main function for testing: analyzes copies of the test light curve on two workers'''
+
+	import pandas as pd
+	import lightcurve
+
+	os.chdir('./test_folder')
+	dat = pd.read_csv('test_dat.csv', index_col=0)
+	recs = [{'obj': i, 'name': 'Batch_Test_' + str(i), 'auto': '1', 'new_name': 'Found nothing', 'x_matches': None,
+		'ls_args': None, 'duration': 0.2, 'curve': lightcurve.LightCurve.from_frame(dat)} for i in range(4)]
+
+	for rec in analyze_all(recs, 2):
+		print(rec['name'], rec['period'], rec['epoch'], rec['minimum'], rec['maximum'])
+
+
+def analyze_all(recs, workers, chunksize=None, field_ls=False, window=None):
+	'''Fans the records from the lookup stage out to a pool of worker processes and yields the analyzed records (or
+	pipeline.Failed) in order. The light curves travel as the compact arrays of lightcurve.LightCurve and only the
+	parameters found (period, epoch, minimum, maximum) come back. Records without a light curve are
+	passed through unchanged. With field_ls the periodograms of all the stars of each field are computed together
+	first (see field_lombscargle.py), in float32 where that is precise enough, and the workers only fold at the
+	frequency found. With a window the records are taken window at a time, so only that many light curves are
+	held at once however long the run is'''
+
+	recs = iter(recs)
+	if workers <= 1:
+		yield from analyze_windows(recs, None, workers, chunksize, field_ls, window)
+		return
+
+	with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+		yield from analyze_windows(recs, pool, workers, chunksize, field_ls, window)
+
+
+def analyze_windows(recs, pool, workers, chunksize, field_ls, window):
+	'''Analyzes the records window at a time (all of them at once without a window) on the pool, or in this
+	process without one'''
+
+	while True:
+		part = list(itertools.islice(recs, window)) if window else list(recs)
+		if not part:
+			return
+
+		todo = [i for i, rec in enumerate(part) if stages.has_data(rec)]
+		if field_ls:
+			set_field_frequencies([part[i] for i in todo])
+
+		if pool is None:
+			done = dict(zip(todo, map(analyze_one, (part[i] for i in todo))))
+		else:
+			# hand each worker several light curves at a time so the cost of a round trip is paid once per chunk
+			size = chunksize or max(1, len(todo) // (workers * 4))
+			done = dict(zip(todo, pool.map(analyze_one, (part[i] for i in todo), chunksize=size)))
+
+		for i, rec in enumerate(part):
+			yield done.get(i, rec)
+
+		if not window:
+			return
+
+
+def set_field_frequencies(recs):
+	'''Finds the best Lomb-Scargle frequency of every light curve with one batched periodogram per OGLE field and
+	stores it in the record's ls_args. The periodogram is computed in float32 when lightcurve.compute_dtype finds
+	the phase rounding small enough for the time span and frequency grid of the field'''
+
+	import field_lombscargle, lightcurve
+
+	fields = {}
+	for rec in recs:
+		fields.setdefault(rec['field'], []).append(rec)
+
+	for members in fields.values():
+		# the times of all the light curves are days since the same reference HJD
+		t, Y = field_lombscargle.align([(rec['curve'].time, rec['curve'].mag) for rec in members])
+
+		# the grid follows the Lomb-Scargle arguments of the run, like find_freq would
+		ls_args = members[0].get('ls_args') or {}
+		frequency = field_lombscargle.autofrequency(t, ls_args.get('samples_per_peak') or 5,
+							ls_args.get('nyquist') or 5, ls_args.get('min_freq'),
+							ls_args.get('max_freq'))
+		dtype = lightcurve.compute_dtype(t.max() - t.min(), frequency[-1])
+		best, _ = field_lombscargle.best_frequencies(t, Y, frequency, dtype=dtype)
+
+		for rec, freq in zip(members, best):
+			rec['ls_args'] = dict(rec.get('ls_args') or {}, frequency=freq)
+
+
+def analyze_one(rec):
+	'''Runs the analysis stage on one record in a worker and returns only the small fields of the result, or a
+	pipeline.Failed if the analysis raised an exception'''
+
+	try:
+		rec = stages.analyze(rec)
+	except Exception as e:
+		return pipeline.Failed('analyze', {'obj': rec['obj']}, e)
+
+	rec.pop('x_matches', None)
+	rec.pop('xids', None)
+
+	return rec
+
+
+if __name__ == '__main__':
+	main()
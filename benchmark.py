@@ -0,0 +1,1029 @@
+#!/usr/bin/python3
+
+import contextlib
+import glob
+import io
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.ticker import FormatStrFormatter
+import requests
+from bs4 import BeautifulSoup
+from astropy.timeseries import LombScargle
+import object_info, batch, field_lombscargle, lombscargle, phase_adjustments, parameters, plotting, folded, lightcurve
+import catalog, initial_setup, synthetic, cache, pipeline, replay, services, stages, aavso
+import cones, periods, render, triage, vsx_index
+
+
+def main():
+	'''main function for running the benchmarks'''
+
+	print('########################################')
+	print('#             BENCHMARKS               #')
+	print('########################################')
+	print('')
+
+	# run the benchmarks named on the command line, or all of them
+	benches = {'parse': bench_parse_photometry, 'scaling': bench_batch_scaling, 'field_ls': bench_field_ls,
+		'topk': bench_topk_search, 'epoch': bench_eclipse_offset,
+		'fold': bench_folded_curve, 'memory': bench_memory,
+		'catalog': bench_catalog, 'query': bench_query, 'stages': bench_stages, 'replay': bench_replay,
+		'vsx': bench_vsx, 'cones': bench_cones, 'triage': bench_triage, 'imports': bench_imports,
+		'render': bench_render, 'periods': bench_periods}
+	names = [a for a in sys.argv[1:] if not a.startswith('--')]
+	for name in names or list(benches):
+		benches[name]()
+
+
+def time_it(func, repeat=3):
+	'''Returns the best wall time in seconds of several calls to func'''
+
+	return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def report(label, old, new):
+	'''Prints the timings of the old and new implementations and the speedup'''
+
+	print('{:<40} old {:10.4f} s   new {:10.4f} s   speedup {:8.1f}x'.format(label, old, new, old / new))
+
+
+def pre_block_from_csv(csv_file):
+	'''Rebuilds the text of an OGLE <pre> block from a saved RAW_DATA style csv file'''
+
+	df = pd.read_csv(csv_file, index_col=0)
+	lines = ['{:.5f} {:.3f} {:.3f} {} {}'.format(*row) for row in df[object_info.PHOT_COLUMNS].itertuples(index=False)]
+
+	return '\n'.join(lines)
+
+
+def synthetic_pre_block(n, seed=42):
+	'''Creates the text of an OGLE <pre> block with n random observations'''
+
+	rand = np.random.RandomState(seed)
+	hjd = 2450500 + np.sort(rand.rand(n)) * 1500
+	mag = 14 + rand.randn(n) * 0.1
+	err = 0.003 + rand.rand(n) * 0.002
+	flag = rand.choice([0, 40], n)
+	grade = rand.choice(lightcurve.GRADES, n)
+	lines = ['{:.5f} {:.3f} {:.3f} {} {}'.format(*row) for row in zip(hjd, mag, err, flag, grade)]
+
+	return '\n'.join(lines)
+
+
+def legacy_parse_photometry(table):
+	'''The original cell by cell parser from object_info.get_data_from_web, kept as the benchmark reference'''
+
+	long_str = table.split()
+	col = object_info.PHOT_COLUMNS
+	rows = int(len(long_str) / 5)
+	df = pd.DataFrame(columns=col, index=range(0, rows))
+
+	for row in range(0, rows):
+		for i in range(0, 5):
+			df.iat[row, i] = long_str[row * 5 + i]
+
+	for c in col[:4]:
+		df[c] = pd.to_numeric(df[c])
+
+	return df.loc[df['frame_grade'].isin(['A', 'B', 'C'])]
+
+
+def bench_parse_photometry():
+	'''Compares the vectorized OGLE photometry parser with the original loop'''
+
+	print('OGLE photometry parsing')
+	cases = [('test_folder/test_dat.csv', pre_block_from_csv('test_folder/test_dat.csv'))]
+	for n in (10000, 100000):
+		cases.append(('synthetic {} points'.format(n), synthetic_pre_block(n)))
+
+	for label, table in cases:
+		new_df = object_info.parse_photometry(table).to_frame()
+		old_df = legacy_parse_photometry(table)
+
+		# both parsers must keep the same rows with the same values (the magnitudes are now float32)
+		assert np.array_equal(new_df.index, old_df.index)
+		for c in object_info.PHOT_COLUMNS:
+			assert np.array_equal(new_df[c].astype(object), old_df[c].astype(new_df[c].dtype).astype(object))
+
+		old = time_it(lambda: legacy_parse_photometry(table), repeat=1)
+		new = time_it(lambda: object_info.parse_photometry(table))
+		report(label, old, new)
+
+	print('')
+
+
+def synthetic_eclipser(n, period=1.7, seed=0):
+	'''Creates a photometry dataframe of n points of a simple eclipsing binary with the given period'''
+
+	rand = np.random.RandomState(seed)
+	hjd = 2450500 + np.sort(rand.rand(n)) * 1500
+	phase = (hjd / period) % 1
+
+	# gaussian dips for the primary eclipse at phase 0 and the secondary at phase 0.5
+	dist_1 = np.minimum(phase, 1 - phase)
+	dist_2 = np.abs(phase - 0.5)
+	mag = 14 + 0.6 * np.exp(-(dist_1 / 0.03) ** 2) + 0.2 * np.exp(-(dist_2 / 0.03) ** 2) + rand.randn(n) * 0.01
+
+	return pd.DataFrame({'HJD': hjd, 'mag': mag, 'mag_err': np.full(n, 0.01), 'photometry_flag': np.zeros(n, int),
+			'frame_grade': pd.Categorical(['A'] * n, categories=lightcurve.GRADES)})
+
+
+def bench_batch_scaling(objects=32, points=600, workers=(1, 2, 4, 8, 16)):
+	'''Times the batch analysis of the same synthetic light curves on an increasing number of worker processes'''
+
+	print('Batch analysis scaling ({} objects of {} points, {} CPUs)'.format(objects, points, os.cpu_count()))
+	recs = [{'obj': i, 'name': 'Synthetic_{}'.format(i), 'auto': '1', 'new_name': 'Found nothing', 'x_matches': None,
+		'ls_args': None, 'duration': 0.2,
+		'curve': lightcurve.LightCurve.from_frame(synthetic_eclipser(points, 0.5 + i * 0.1, i))} for i in range(objects)]
+
+	home = os.getcwd()
+	base = None
+	for n in workers:
+		with tempfile.TemporaryDirectory() as tmp:
+			os.chdir(tmp)
+			begin = time.perf_counter()
+			results = list(batch.analyze_all([dict(rec) for rec in recs], n))
+			took = time.perf_counter() - begin
+			os.chdir(home)
+
+		base = base or took
+		print('{:>3} workers {:10.2f} s   {:8.1f} objects/s   speedup {:5.2f}x   efficiency {:4.0%}'.format(n, took,
+			len(results) / took, base / took, base / took / n))
+
+	print('')
+
+
+def synthetic_field(stars, epochs=300, missing=0.05, seed=0):
+	'''Creates the light curves of one field: shared epochs, a different eclipsing binary per star, and a fraction of
+	missing (or graded out) points'''
+
+	rand = np.random.RandomState(seed)
+	hjd = synthetic_eclipser(epochs, seed=seed)['HJD'].to_numpy()
+	curves = []
+	for i in range(stars):
+		mag = synthetic_eclipser(epochs, 0.3 + 3 * rand.rand(), seed + i + 1)['mag'].to_numpy()
+		keep = rand.rand(epochs) > missing
+		curves.append((hjd[keep], mag[keep]))
+
+	return curves
+
+
+def bench_field_ls():
+	'''Compares the batched field periodogram with one astropy LombScargle per star on the same frequency grid'''
+
+	print('Field-batched Lomb-Scargle versus astropy per star')
+	for stars in (10, 100, 500):
+		curves = synthetic_field(stars)
+		t, Y = field_lombscargle.align(curves)
+		frequency = field_lombscargle.autofrequency(t)
+
+		def per_star():
+			return np.array([frequency[np.argmax(LombScargle(h, m).power(frequency))] for h, m in curves])
+
+		def per_field(dtype=np.float64):
+			return field_lombscargle.best_frequencies(t, Y, frequency, dtype=dtype)[0]
+
+		agree = np.mean(per_star() == per_field())
+		agree_32 = np.mean(per_star() == per_field(np.float32))
+		old = time_it(per_star, repeat=1)
+		new = time_it(per_field)
+		new_32 = time_it(lambda: per_field(np.float32))
+		report('{} stars x {} frequencies'.format(stars, len(frequency)), old, new)
+		report('  float32 ({:.0%} / {:.0%} same peak)'.format(agree, agree_32), old, new_32)
+
+	print('')
+
+
+def bench_topk_search(nyquist=50, seeds=5, periods=(0.55, 0.9, 1.7, 3.3, 7.1)):
+	'''Compares the dense Lomb-Scargle grid with the coarse-to-fine top-K search for speed and for recovering the
+	true period (within 1%) of synthetic eclipsing binaries'''
+
+	print('Dense Lomb-Scargle grid versus coarse-to-fine top-K search (nyquist factor {})'.format(nyquist))
+	old = new = 0
+	found_old = found_new = 0
+	for seed in range(seeds):
+		for period in periods:
+			d = synthetic_eclipser(400, period, seed)
+			t, y = d['HJD'].to_numpy(), d['mag'].to_numpy()
+
+			begin = time.perf_counter()
+			frequency, power = LombScargle(t, y).autopower(nyquist_factor=nyquist)
+			old += time.perf_counter() - begin
+			found_old += abs(frequency[np.argmax(power)] * period - 1) < 0.01
+
+			begin = time.perf_counter()
+			best, _, _ = lombscargle.search_peaks(t, y, nyquist=nyquist)
+			new += time.perf_counter() - begin
+			found_new += abs(best * period - 1) < 0.01
+
+	total = seeds * len(periods)
+	report('{} curves, periods found {}/{} -> {}/{}'.format(total, found_old, total, found_new, total), old, new)
+	print('')
+
+
+def legacy_eclipse_offset(phase, mag):
+	'''The original pair by pair search of phase_adjustments.set_epoch, kept as the benchmark reference'''
+
+	min_dp = int(np.argmax(mag))
+	n = len(mag)
+	for i in range(0, min_dp + 1):
+		for j in range(0, n - min_dp):
+			if abs(mag[i] - mag[-j-1]) < 0.02:
+				return phase[i] + (phase[n - j - 1] - phase[i]) / 2, i, n - j - 1
+
+	return 0, 0, 0
+
+
+def synthetic_eclipse(n, skew=0.0, seed=0):
+	'''Creates the sorted phases and magnitudes of n points inside a primary eclipse centered a little off phase 0.
+	skew makes the egress shallower than the ingress, so matching points sit far from the start of the eclipse'''
+
+	rand = np.random.RandomState(seed)
+	phase = np.sort(rand.uniform(-0.1, 0.1, n))
+	width = np.where(phase > 0.004, 0.02 * (1 + skew), 0.02)
+	mag = 14 + 0.6 * np.exp(-((phase - 0.004) / width) ** 2) + rand.randn(n) * 0.005
+
+	return phase, mag
+
+
+def bench_eclipse_offset():
+	'''Compares the sorted binary search of phase_adjustments.eclipse_offset with the original nested loop'''
+
+	print('Eclipse center offset (set_epoch)')
+	folded = pd.read_csv('test_folder/test_folded_df.csv')
+	epoch, zeroed = phase_adjustments.set_min_to_zero(folded)
+	phased = phase_adjustments.add_phases(zeroed, '1').frame().sort_values('Phase')
+	eclipse = phased.loc[phased['Phase'].abs() < 0.1]
+	cases = [('test_folder/test_folded_df.csv', eclipse['Phase'].to_numpy(), eclipse['mag'].to_numpy())]
+	for n, skew in ((2000, 0), (2000, 3), (20000, 0), (20000, 3)):
+		cases.append(('synthetic {} points skew {}'.format(n, skew),) + synthetic_eclipse(n, skew))
+
+	for label, phase, mag in cases:
+		# both searches must pick the same pair of points
+		assert legacy_eclipse_offset(phase, mag) == phase_adjustments.eclipse_offset(phase, mag)
+
+		old = time_it(lambda: legacy_eclipse_offset(phase, mag), repeat=1)
+		new = time_it(lambda: phase_adjustments.eclipse_offset(phase, mag))
+		report(label, old, new)
+
+	print('')
+
+
+def legacy_fold(dat, frequency, adjustment):
+	'''The original dataframe phase code: apply to fold (lombscargle.find_freq) and to re-zero
+	(phase_adjustments.set_min_to_zero), copies of the first and last quarters for the extended range (add_phases),
+	and apply to shift by the eclipse center offset, kept as the benchmark reference'''
+
+	dt = dat.copy()
+	dt.loc[:, 'Phase'] = dt.loc[:, 'HJD'].apply(lambda x: x*frequency%1)
+
+	zero = dt.sort_values('mag', ascending=False)
+	min_phase = zero.iloc[0, 5]
+	epc = zero.iloc[0, 0]
+	zero.loc[:, 'Phase'] = zero.loc[:, 'Phase'].apply(lambda x: x - min_phase if x - min_phase >= 0 else x - min_phase + 1)
+
+	last = zero.loc[zero.loc[:, 'Phase'] >= 0.75]
+	last.loc[:, 'Phase'] = last.loc[:, 'Phase'].apply(lambda x: x - 1)
+	first = zero.loc[zero.loc[:, 'Phase'] <= 0.25]
+	first.loc[:, 'Phase'] = first.loc[:, 'Phase'].apply(lambda x: x + 1)
+	phased = pd.concat([zero, last, first], ignore_index=True)
+
+	phased.loc[:, 'Phase'] = phased.loc[:, 'Phase'].apply(lambda x: x - adjustment)
+
+	return epc, phased
+
+
+def new_fold(dat, frequency, adjustment):
+	'''The same steps on a folded.FoldedCurve'''
+
+	curve = folded.FoldedCurve(lightcurve.LightCurve.from_frame(dat), frequency)
+	epc = curve.rezero()
+	phased = curve.extended()
+	phased.shift(adjustment)
+
+	return epc, phased
+
+
+def bench_folded_curve():
+	'''Compares folding, re-zeroing, extending and shifting a light curve with folded.FoldedCurve against the
+	original dataframe code'''
+
+	print('Folded light curve (fold, move the minima to phase 0, extend to -0.25..1.25, shift)')
+	cases = [('test_folder/test_dat.csv', pd.read_csv('test_folder/test_dat.csv', index_col=0), 1 / 13.049)]
+	for n in (100000, 1000000):
+		cases.append(('synthetic {} points'.format(n), synthetic_eclipser(n), 1 / 1.7))
+
+	for label, dat, frequency in cases:
+		epc_old, old_df = legacy_fold(dat, frequency, 0.003)
+		epc_new, curve = new_fold(dat, frequency, 0.003)
+
+		# same epoch and the same points at the same phases (the rows come out in a different order)
+		assert epc_old == epc_new and len(old_df) == len(curve)
+		old_sorted = old_df.sort_values(['Phase', 'mag'])
+		new_order = np.lexsort((curve['mag'], curve['Phase']))
+		assert np.allclose(old_sorted['Phase'], curve['Phase'][new_order], rtol=0, atol=1e-12)
+		assert np.array_equal(old_sorted['mag'].astype(np.float32), curve['mag'][new_order])
+
+		old = time_it(lambda: legacy_fold(dat, frequency, 0.003), repeat=1)
+		new = time_it(lambda: new_fold(dat, frequency, 0.003))
+		report(label, old, new)
+
+	print('')
+
+
+def bench_memory(n=100000):
+	'''Compares the bytes per epoch of the photometry as the original dataframe, the typed float64 dataframe and
+	the LightCurve, in memory and pickled for the worker processes, and times a periodogram in float64 and float32'''
+
+	print('Photometry memory ({} points, bytes per epoch)'.format(n))
+	table = synthetic_pre_block(n)
+	lc = object_info.parse_photometry(table)
+	typed = lc.to_frame().astype({'mag': np.float64, 'mag_err': np.float64, 'photometry_flag': np.int64})
+	typed.index = typed.index.astype(np.int64)
+	forms = [('original dataframe', legacy_parse_photometry(table)), ('typed float64 dataframe', typed),
+		('LightCurve', lc)]
+
+	for label, data in forms:
+		size = data.nbytes if isinstance(data, lightcurve.LightCurve) else data.memory_usage(deep=True).sum()
+		print('{:<40} memory {:8.1f}   pickled {:8.1f}'.format(label, size / len(data), len(pickle.dumps(data)) / len(data)))
+
+	# the field periodogram of 100 stars at float64 and at the float32 chosen by compute_dtype
+	t, Y = field_lombscargle.align(synthetic_field(100))
+	t = t - lightcurve.REFERENCE_HJD
+	frequency = field_lombscargle.autofrequency(t)
+	dtype = lightcurve.compute_dtype(t.max() - t.min(), frequency[-1])
+	best_64 = field_lombscargle.best_frequencies(t, Y, frequency)[0]
+	best_32 = field_lombscargle.best_frequencies(t, Y, frequency, dtype=dtype)[0]
+	old = time_it(lambda: field_lombscargle.best_frequencies(t, Y, frequency))
+	new = time_it(lambda: field_lombscargle.best_frequencies(t, Y, frequency, dtype=dtype))
+	report('field periodogram float64 -> {} ({:.0%} same)'.format(np.dtype(dtype).name, np.mean(best_64 == best_32)),
+		old, new)
+	print('')
+
+
+def synthetic_results(n, seed=0):
+	'''Creates a query dataframe of n objects with made up results'''
+
+	rand = np.random.RandomState(seed)
+	return pd.DataFrame({'Field': ['BUL_SC{}'.format(i % 49 + 1) for i in range(n)], 'StarID': np.arange(n),
+				'RA': 18 + rand.rand(n), 'Decl': -30 + rand.rand(n), 'vsx_id': None, 'vsx_type': None,
+				'period': 0.2 + 10 * rand.rand(n), 'epoch': 2450500 + rand.rand(n) * 1500,
+				'minimum': 15 + rand.rand(n), 'maximum': 14 + rand.rand(n)})
+
+
+def bench_catalog(objects=(2000, 100000)):
+	'''Compares collecting "all objects with period < 1 d" from per-object folders of csv files with a filtered
+	read of the Parquet results catalog'''
+
+	print('Results catalog versus per-object folders (objects with period < 1 d)')
+	for n in objects:
+		df = synthetic_results(n)
+		with tempfile.TemporaryDirectory() as tmp:
+			begin = time.perf_counter()
+			with catalog.Catalog(os.path.join(tmp, 'results'), df) as results:
+				for obj in range(n):
+					results.add(catalog.object_row(df, {'obj': obj, 'name': str(obj)}, 'analyzed'))
+			written = time.perf_counter() - begin
+
+			new = time_it(lambda: catalog.read(os.path.join(tmp, 'results'), filters=[('period', '<', 1)]))
+			found = len(catalog.read(os.path.join(tmp, 'results'), filters=[('period', '<', 1)]))
+
+			# the folders are only made for the smaller run; writing 100k of them takes minutes
+			if n > 5000:
+				print('{:<40} new {:10.4f} s   ({} found, catalog written in {:.2f} s)'.format(
+					'{} objects'.format(n), new, found, written))
+				continue
+
+			for obj in range(n):
+				os.makedirs(os.path.join(tmp, str(obj)))
+				df.iloc[[obj]][['period', 'epoch', 'minimum', 'maximum']].to_csv(
+					os.path.join(tmp, str(obj), '{}_Parameters.csv'.format(obj)))
+
+			def scan():
+				frames = [pd.read_csv(f) for f in glob.glob(os.path.join(tmp, '*', '*_Parameters.csv'))]
+				table = pd.concat(frames)
+				return table.loc[table['period'] < 1]
+
+			assert len(scan()) == found
+			old = time_it(scan, repeat=1)
+			report('{} objects ({} found)'.format(n, found), old, new)
+
+	print('')
+
+
+
+def synthetic_query(path, n, seed=0):
+	'''Writes an OGLE query file of n objects'''
+
+	rand = np.random.RandomState(seed)
+	with open(path, 'w') as f:
+		f.write('# Field StarID StarCat RA Decl Pgood I Isig Imed Imederr Ndetect\n')
+		for i in range(n):
+			f.write('BUL_SC{} {} 1 {:.5f} {:.5f} 1 {:.3f} 0.1 {:.3f} 0.01 300\n'.format(i % 49 + 1, i, 18 + rand.rand(),
+									-30 + rand.rand(), 14 + rand.rand(), 14 + rand.rand()))
+
+
+def legacy_read_query(path):
+	'''The original reader from initial_setup.read_query: the whole query file in one dataframe'''
+
+	head = initial_setup.HEAD
+	return pd.read_csv(path, comment='#', sep=r'\s+', header=None, names=head, index_col=False,
+				dtype={'vsx_id': object, 'vsx_type': object})
+
+
+def peak_memory(func):
+	'''Returns the result of func and the peak memory it allocated in MB'''
+
+	tracemalloc.start()
+	result = func()
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	return result, peak / 1024 / 1024
+
+
+def bench_query(objects=1000000):
+	'''Compares reading a large query file whole with reading it in batches: the time until the first objects
+	can be worked on, when starting at the beginning and half way through, and the peak memory of going through
+	every object'''
+
+	print('Query file ({} objects)'.format(objects))
+	with tempfile.TemporaryDirectory() as tmp:
+		path = os.path.join(tmp, 'query.txt')
+		synthetic_query(path, objects)
+
+		# the program counts the objects first, which records the offsets a deep start seeks to
+		initial_setup.count_objects(path)
+		for start in (0, objects // 2):
+			first = next(initial_setup.read_batches(path, start))
+			whole = legacy_read_query(path).iloc[start:start + len(first)]
+			assert np.array_equal(first['StarID'].to_numpy(), whole['StarID'].to_numpy())
+			assert np.allclose(first['RA'].to_numpy(), whole['RA'].to_numpy())
+
+			old = time_it(lambda: legacy_read_query(path).iloc[start:], repeat=1)
+			new = time_it(lambda: next(initial_setup.read_batches(path, start)), repeat=1)
+			report('first batch from object {}'.format(start), old, new)
+
+		n_old, old = peak_memory(lambda: len(legacy_read_query(path)))
+		n_new, new = peak_memory(lambda: sum(len(batch) for batch in initial_setup.read_batches(path)))
+		assert n_old == n_new == objects
+		print('{:<40} old {:8.1f} MB   new {:8.1f} MB'.format('peak memory reading every object', old, new))
+	print('')
+
+
+
+# timings of the stages benchmark on a reference machine, and how much slower a stage may get before it is reported:
+# every case is the best of STAGE_REPEAT runs (LARGE_REPEAT for the million point ones, see best_of), and the
+# tolerance grows by twice the spread (median over best) seen now or when the baseline was recorded
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baselines.json')
+TOLERANCE = 0.25
+STAGE_REPEAT = 5
+LARGE_REPEAT = 3
+
+
+def best_of(func, repeat):
+	'''The best wall time in seconds of a call to func over repeat runs and their spread, the median over the best
+	less one. Fast functions are called in a loop of at least 0.2 s per run (see timeit.Timer.autorange), so timer
+	resolution and scheduling jitter do not swamp them; the loop counting that number is the first run'''
+
+	timer = timeit.Timer(func)
+	number, first = timer.autorange()
+	times = [first] + timer.repeat(repeat - 1, number)
+	times = [t / number for t in times]
+
+	return min(times), float(np.median(times) / min(times) - 1)
+
+
+def quiet(func):
+	'''Calls func without its printing and closes the figures it made'''
+
+	with contextlib.redirect_stdout(io.StringIO()):
+		result = func()
+	plt.close('all')
+
+	return result
+
+
+def stage_cases(sizes, plot_sizes):
+	'''Returns (case name, function) for every stage of the analysis at every size of synthetic light curve'''
+
+	page = open('./test_folder/test_page.html').read()
+	cases = [('parse_page test_page.html', lambda: object_info.parse_page(page))]
+	for n in sizes:
+		cases += size_cases(n, n in plot_sizes)
+
+	return cases
+
+
+def size_cases(n, plot):
+	'''The cases of every stage on a synthetic EB binary of n points'''
+
+	# the periodogram is searched on a fixed grid so its size does not grow with the number of points
+	ls_args = {'min_freq': 0.05, 'max_freq': 5, 'samples_per_peak': 5}
+
+	lc, params = synthetic.light_curve('EB', n, period=2.5, seed=n)
+	page = synthetic.html_page(synthetic.pre_block(lc), 'BUL_SC1', n)
+	good = object_info.parse_page(page)
+	phase = folded.fold(good.time, 1 / params['period'])
+	curve = lambda: folded.FoldedCurve(good, phase=phase.copy())
+	_, zeroed = phase_adjustments.set_min_to_zero(curve())
+	phased = phase_adjustments.add_phases(zeroed, '1')
+
+	cases = [('parse_page {}'.format(n), lambda: object_info.parse_page(page)),
+		('find_freq {}'.format(n), lambda: lombscargle.find_freq(good, 'bench', '1', ls_args)),
+		('set_min_to_zero {}'.format(n), lambda: phase_adjustments.set_min_to_zero(curve())),
+		('add_phases {}'.format(n), lambda: phase_adjustments.add_phases(zeroed, '1')),
+		('set_epoch {}'.format(n), lambda: phase_adjustments.set_epoch(phased, '1', 0.2)),
+		('find_min {}'.format(n), lambda: parameters.find_min(phased, '1')),
+		('find_max {}'.format(n), lambda: parameters.find_max(phased, '1'))]
+
+	if plot:
+		cases += [('plot_raw_data {}'.format(n), lambda: plotting.plot_raw_data(good, 'bench', '1')),
+			('final_phase_diagram {}'.format(n), lambda: plotting.final_phase_diagram(phased, 'bench', 2.5, '1'))]
+
+	return cases
+
+
+def analyze_synthetic(params, lc, ls_args):
+	'''Runs one synthetic binary through the analysis stages like stages.analyze_in_folder (without writing the csv
+	files) and returns whether the period found is the true one, or twice or half of it'''
+
+	good = object_info.parse_page(synthetic.html_page(synthetic.pre_block(lc), 'BUL_SC1', params['obj']))
+	freq, curve = lombscargle.find_freq(good, 'bench', '1', ls_args)
+	_, zeroed = phase_adjustments.set_min_to_zero(curve)
+	phased = phase_adjustments.add_phases(zeroed, '1')
+	phased.shift(phase_adjustments.set_epoch(phased, '1', 'auto'))
+	parameters.find_min(phased, '1')
+	parameters.find_max(phased, '1')
+	plotting.final_phase_diagram(phased, 'bench', 1 / freq, '1')
+
+	ratio = params['period'] * freq
+	return any(abs(ratio - r) < 0.01 * r for r in (0.5, 1, 2))
+
+
+def bench_stages(sizes=(1000, 100000, 1000000), plot_sizes=(1000, 100000), objects=100, points=1000):
+	'''Times every stage of the analysis on synthetic eclipsing binaries of several sizes and a population of
+	objects EA, EB and EW binaries through all of them, and reports the change from the stored baselines. With
+	--save the timings become the new baselines'''
+
+	print('Stages (synthetic light curves, plots written to a temporary folder)')
+	timings = {}
+	spreads = {}
+	home = os.getcwd()
+	with tempfile.TemporaryDirectory() as tmp:
+		cases = stage_cases(sizes, plot_sizes)
+		os.chdir(tmp)
+		try:
+			for name, func in cases:
+				timings[name], spreads[name] = best_of(lambda: quiet(func),
+									LARGE_REPEAT if name.endswith('000000') else STAGE_REPEAT)
+
+			# the whole analysis of a population of binaries, scored on the periods found
+			ls_args = {'min_freq': 0.05, 'max_freq': 5, 'samples_per_peak': 5}
+			found = []
+
+			def population():
+				found[:] = [quiet(lambda: analyze_synthetic(params, lc, ls_args))
+						for params, lc in synthetic.population(objects, points)]
+
+			name = 'population {} x {}'.format(objects, points)
+			timings[name], spreads[name] = best_of(population, LARGE_REPEAT)
+		finally:
+			os.chdir(home)
+
+	print('{} binaries of {} points: {:.0f} objects/hour, {:.0%} of the periods found'.format(objects, points,
+		objects * 3600 / timings[name], np.mean(found)))
+	regression_report(timings, spreads, *load_baselines())
+
+	if '--save' in sys.argv:
+		save_baselines(timings, spreads)
+		print('Baselines saved to ' + BASELINES)
+	print('')
+
+
+def load_baselines():
+	'''The baseline timings and their spreads (see best_of)'''
+
+	if not os.path.exists(BASELINES):
+		return {}, {}
+
+	with open(BASELINES) as f:
+		saved = json.load(f)
+
+	return saved['timings'], saved.get('spreads', {})
+
+
+def save_baselines(timings, spreads):
+	machine = {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+		'processor': platform.processor(), 'cpus': os.cpu_count()}
+	with open(BASELINES, 'w') as f:
+		json.dump({'machine': machine, 'repeat': {'stage': STAGE_REPEAT, 'large': LARGE_REPEAT}, 'timings': timings,
+			'spreads': spreads}, f, indent=1, sort_keys=True)
+		f.write('\n')
+
+
+def regression_report(timings, spreads, baselines, base_spreads, tolerance=TOLERANCE):
+	'''Prints every timing next to its baseline; cases slower than the baseline by more than their tolerance
+	(tolerance plus twice the larger spread of the timing and the baseline, see best_of) are marked REGRESSION and
+	cases faster by as much are marked faster'''
+
+	regressions = 0
+	for name, now in timings.items():
+		base = baselines.get(name)
+		if base is None:
+			print('{:<32} now {:10.4f} s   (no baseline)'.format(name, now))
+			continue
+
+		allowed = tolerance + 2 * max(spreads.get(name, 0), base_spreads.get(name, 0))
+		ratio = now / base
+		status = ''
+		if ratio > 1 + allowed:
+			status = 'REGRESSION'
+			regressions += 1
+		elif ratio < 1 / (1 + allowed):
+			status = 'faster'
+		print('{:<32} now {:10.4f} s   baseline {:10.4f} s   {:6.2f}x  (+/-{:.0%})  {}'.format(name, now, base, ratio,
+			allowed, status))
+
+	print('{} regressions (slower than the baseline by more than {:.0%} plus twice the spread of the runs)'.format(
+		regressions, tolerance))
+
+
+
+def replay_tasks(objects):
+	'''Records for the lookup stage of objects made up stars, not known to VSX and without cross-ids'''
+
+	for obj in range(objects):
+		yield {'obj': obj, 'total': objects, 'field': 'BUL_SC1', 'sid': str(obj), 'how_close': 1, 'auto': '2',
+			'known': ('1', None, None), 'xids': None, 'url': None, 'profile': None,
+			'url_template': services.SERVERS['ogle'] + '/~ogle/photdb/getobj.php?field={field}&starid={starid}'}
+
+
+def lookups(objects, workers):
+	'''Runs the lookup stage of objects made up stars on a pool of workers threads and returns the records'''
+
+	steps = [pipeline.Stage('lookup', stages.lookup, workers, 'thread')]
+
+	return quiet(lambda: list(pipeline.run(replay_tasks(objects), steps)))
+
+
+def bench_replay(objects=200, points=500, latency=0.05):
+	'''Downloads the synthetic photometry pages of objects stars from the local replay server with a latency
+	per request: one request at a time against several, with injected errors, and through the response cache'''
+
+	print('Replay server ({} objects, {} s latency)'.format(objects, latency))
+	with tempfile.TemporaryDirectory() as tmp:
+		store = replay.Store(os.path.join(tmp, 'replay.sqlite'))
+		template = next(replay_tasks(1))['url_template']
+		for obj in range(objects):
+			lc, _ = synthetic.light_curve(synthetic.KINDS[obj % 3], points, seed=obj)
+			path = template.format(field='BUL_SC1', starid=obj)[len(services.SERVERS['ogle']):]
+			store.put('ogle', 'GET', path, b'', 200, 'text/html', synthetic.html_page(synthetic.pre_block(lc),
+											'BUL_SC1', obj).encode('utf-8'))
+
+		server = replay.start(store, latency=latency, seed=0)
+		cache.configure(None)
+		try:
+			old = time_it(lambda: lookups(objects, 1), repeat=1)
+			new = time_it(lambda: lookups(objects, 16), repeat=1)
+			report('lookups 1 -> 16 threads', old, new)
+
+			# every connection to the server is new without the shared session; without latency the cost of
+			# connecting shows (on a real network a TLS handshake costs round trips more)
+			address = services.url('ogle', template.format(field='BUL_SC1', starid=0))
+			server.latency = 0
+			old = time_it(lambda: [requests.get(address).text for _ in range(500)])
+			new = time_it(lambda: [services.session().get(address).text for _ in range(500)])
+			report('500 requests, new connections -> pooled', old, new)
+			server.latency = latency
+
+			server.error_rate = 0.1
+			for retries in (0, services.RETRIES):
+				services.configure_client(retries=retries, backoff=0.01)
+				failed = sum(isinstance(rec, pipeline.Failed) for rec in lookups(objects, 16))
+				print('{} of {} lookups failed with 10% of the requests failing and {} retries'.format(failed, objects,
+															retries))
+			services.configure_client()
+			server.error_rate = 0
+
+			cache.configure(os.path.join(tmp, 'cache.sqlite'))
+			old = time_it(lambda: lookups(objects, 16), repeat=1)
+			requests_made = server.stats['replayed']
+			new = time_it(lambda: lookups(objects, 16), repeat=1)
+			assert server.stats['replayed'] == requests_made
+			report('lookups 16 threads, cold -> warm cache', old, new)
+		finally:
+			cache.configure(None)
+			replay.stop(server)
+			store.close()
+	print('')
+
+
+
+def legacy_vsx_nearest(html_doc):
+	'''The original parser from aavso.check_vsx: the whole page in BeautifulSoup, the first row of the results
+	table only'''
+
+	soup = BeautifulSoup(html_doc, 'lxml')
+	table = soup.find_all('table')[10]
+	results = table.find_all('tr')[2].get_text().lstrip(' ')
+	if results[3:8] == 'There':
+		return None
+
+	return float(results[3:7]), results[11:35].strip(), results[67:71].strip()
+
+
+def bench_vsx(neighbours=(1, 20, 200)):
+	'''Compares parsing VSX results pages with BeautifulSoup (first row only) and with aavso.parse_results (every
+	row), on the saved test page and on pages with more neighbours padded to the size of a real VSX page'''
+
+	print('VSX results pages')
+	pages = [('test_vsx.html', open('./test_folder/test_vsx.html').read())]
+	rand = np.random.RandomState(0)
+	for n in neighbours:
+		page = synthetic.vsx_page([(d, 'OGLE-BLG-ECL-{:06d}'.format(i), rand.choice(['EA', 'EB', 'EW', 'SR']))
+						for i, d in enumerate(rand.rand(n) * 3)])
+		menu = '<div><p>menu item</p><a href="x">link</a></div>\n' * 300
+		pages.append(('{} neighbours'.format(n), page.replace('<body>\n', '<body>\n' + menu)))
+
+	for label, page in pages:
+		first = legacy_vsx_nearest(page)
+		found = aavso.parse_results(page)
+		assert first in [neighbour[:3] for neighbour in found]
+
+		old = time_it(lambda: legacy_vsx_nearest(page))
+		new = time_it(lambda: aavso.parse_results(page))
+		report('{} ({} found, nearest {:.2f})'.format(label, len(found), found[0].dist), old, new)
+
+	print('')
+
+
+def vsx_search_page(index, ra, dec, radius):
+	'''The VSX results page of a search of the made up VSX catalog index within radius arcmin of ra, dec'''
+
+	found = index.within([ra], [dec], radius)[0]
+	dist = vsx_index.arcmin(np.linalg.norm(vsx_index.unit_vectors(index.ra[found], index.dec[found]) -
+						vsx_index.unit_vectors([ra], [dec]), axis=1))
+
+	return synthetic.vsx_page([(d, index.name[i], index.type[i], index.ra[i], index.dec[i]) for d, i in
+					sorted(zip(dist, found))])
+
+
+def bench_cones(objects=500, variables=300, cluster=cones.CLUSTER_RADIUS, latency=0.02):
+	'''Checks objects candidates of a crowded made up field against VSX on the local replay server, one search
+	per object against one search per cone of candidates (aavso.classify_cones), and compares both with the
+	answer of a local index of the same made up VSX catalog'''
+
+	ra, dec = cones.crowded_field(objects)
+	df = pd.DataFrame({'Field': 'BUL_SC1', 'StarID': np.arange(objects), 'RA': ra * 24 / 360, 'Decl': dec})
+	# the positions as classify_cones reads them back from the hours of the query file
+	ra = df['RA'].to_numpy() * 360 / 24
+	vra, vdec = cones.crowded_field(variables, seed=1)
+	index = vsx_index.VSXIndex(vra, vdec, ['V{:04d}'.format(i) for i in range(variables)],
+					np.random.RandomState(1).choice(['EA', 'EW', 'RRAB', 'SR'], variables))
+	radius = vsx_index.SEARCH_RADIUS
+	plan = cones.plan(ra, dec, radius, cluster)
+
+	print('VSX cone searches ({} candidates in {} cones, {} s latency)'.format(objects, len(plan), latency))
+	with tempfile.TemporaryDirectory() as tmp:
+		store = replay.Store(os.path.join(tmp, 'replay.sqlite'))
+		searches = [(r, d, radius) for r, d in zip(ra, dec)] + [(c.ra, c.dec, c.radius) for c in plan]
+		for r, d, size in searches:
+			path = (aavso.SEARCH_URL + str(r) + '+' + str(d) + '&size={:.4f}&unit=2'.format(size))[len(
+				services.SERVERS['vsx']):]
+			store.put('vsx', 'GET', path, b'', 200, 'text/html', vsx_search_page(index, r, d, size).encode('utf-8'))
+
+		server = replay.start(store, latency=latency, seed=0)
+		cache.configure(None)
+		try:
+			def one_by_one():
+				nearest = [(aavso.search(r, d, radius) or [aavso.Neighbour(np.inf, '', '', np.nan, np.nan)])[0]
+						for r, d in zip(ra, dec)]
+				return pd.DataFrame({'proceed': ['0' if n.dist < 1 else '1' for n in nearest],
+							'vsx_id': [n.name for n in nearest]}, index=df.index)
+
+			old = time_it(one_by_one, repeat=1)
+			new = time_it(lambda: quiet(lambda: aavso.classify_cones(df, 1, cluster)), repeat=1)
+			report('{} searches -> {}'.format(objects, len(plan)), old, new)
+
+			expected = aavso.classify_query(df, 1, index)
+			for label, result in (('one by one', one_by_one()), ('cones', aavso.classify_cones(df, 1, cluster))):
+				differ = (result['vsx_id'] != expected['vsx_id']).sum()
+				print('  {}: {} of {} nearest VSX objects differ from the local index'.format(label, differ, objects))
+		finally:
+			replay.stop(server)
+			store.close()
+
+	print('')
+
+
+def bench_triage(objects=60, points=1000, noise=(0.01, 0.015)):
+	'''Runs the triage on a population of synthetic binaries and as many constant stars (with errors that are right
+	and that underestimate the scatter), and compares the time it takes with the analysis it saves on the rejected
+	ones'''
+
+	print('Variability triage ({} binaries and {} constant stars of {} points)'.format(objects, objects, points))
+	ls_args = {'min_freq': 0.05, 'max_freq': 5, 'samples_per_peak': 5}
+	binaries = [(params, lc.good()) for params, lc in synthetic.population(objects, points)]
+	constants = [synthetic.constant(points, noise=noise[i % 2], seed=i).good() for i in range(objects)]
+
+	kept = sum(triage.reason(triage.statistics(lc)) is None for _, lc in binaries)
+	rejected = sum(triage.reason(triage.statistics(lc)) is not None for lc in constants)
+	print('  {} of {} binaries kept, {} of {} constant stars rejected'.format(kept, objects, rejected, objects))
+
+	home = os.getcwd()
+	with tempfile.TemporaryDirectory() as tmp:
+		os.chdir(tmp)
+		try:
+			params, lc = next(synthetic.population(1, points))
+			constant = synthetic.constant(points, seed=0)
+			params['obj'] = 0
+			old = time_it(lambda: quiet(lambda: analyze_synthetic(params, constant, ls_args)))
+		finally:
+			os.chdir(home)
+	new = time_it(lambda: [triage.reason(triage.statistics(lc)) for lc in constants]) / objects
+	report('analysis -> triage of a constant star', old, new)
+	print('  {:.1f} s of analysis saved on the {} rejected constant stars'.format(rejected * (old - new), rejected))
+	print('')
+
+
+def old_phase_diagram(phase, mag, nm, per):
+	'''The original plotting.final_phase_diagram in automatic mode: a new pyplot figure that is never closed'''
+
+	fig, ax = plt.subplots()
+	ax.yaxis.set_major_formatter(FormatStrFormatter('%0.2f'))
+	plt.scatter(phase, mag, color='black', s=5)
+	plt.gca().invert_yaxis()
+	plt.ylabel('Ic-mag')
+	plt.xlabel('Phase')
+	plt.title(nm + ' (P = ' + str(per) + ' d)')
+	plt.grid()
+	plt.tight_layout()
+	plt.savefig(nm + '_Phase_Diagram')
+
+
+def bench_render(sizes=(1000, 100000, 1000000), objects=30, points=1000):
+	'''Renders phase diagrams the old way (a new pyplot figure per plot, never closed, every point drawn) and with
+	render.draw (one reused figure, thinned points), compares the memory left after a run of objects plots, and the
+	time the analysis spends on its plots inline and when they are queued for a render.Renderer'''
+
+	print('Plot rendering')
+	home = os.getcwd()
+	with tempfile.TemporaryDirectory() as tmp:
+		os.chdir(tmp)
+		try:
+			for n in sizes:
+				lc, params = synthetic.light_curve('EA', n, seed=1)
+				curve = folded.FoldedCurve(lc, 1 / params['period'])
+				phase, mag = np.asarray(curve['Phase']), np.asarray(curve['mag'])
+				plot = render.job('phase', 'bench_Phase_Diagram.png', phase, mag, title='bench')
+				repeat = 1 if n >= 1000000 else 3
+				old = time_it(lambda: old_phase_diagram(phase, mag, 'bench', params['period']), repeat=repeat)
+				plt.close('all')
+				new = time_it(lambda: render.draw(plot), repeat=repeat)
+				report('phase diagram {}'.format(n), old, new)
+
+			lc, params = synthetic.light_curve('EA', points, seed=1)
+			curve = folded.FoldedCurve(lc, 1 / params['period'])
+			phase, mag = np.asarray(curve['Phase']), np.asarray(curve['mag'])
+			for label, draw in (('old', lambda i: old_phase_diagram(phase, mag, 'bench{}'.format(i), 1.0)),
+					('new', lambda i: render.draw(render.job('phase', 'bench{}.png'.format(i), phase, mag)))):
+				tracemalloc.start()
+				for i in range(objects):
+					draw(i)
+				current, peak = tracemalloc.get_traced_memory()
+				tracemalloc.stop()
+				print('  {} plots {}: {} pyplot figures open, {:.1f} MB still allocated, {:.1f} MB peak'.format(
+					objects, label, len(plt.get_fignums()), current / 1e6, peak / 1e6))
+				plt.close('all')
+
+			# what the analysis of an object waits for: drawing its three plots, or handing them to a Renderer
+			plots = [render.job('raw', 'raw.png', lc['HJD'], lc.mag), render.job('phase', 'phase.png', phase, mag),
+				render.job('periodogram', 'periodogram.png', phase, mag, best=0.5, phase=phase, mag=mag)]
+			for mode in ('inline', 'background'):
+				rec = {'render': mode}
+				emit = render.emitter(rec)
+				start = time.perf_counter()
+				for _ in range(objects):
+					for plot in plots:
+						emit(plot)
+				print('  {} mode: {:.4f} s of plotting per object in the analysis'.format(mode,
+					(time.perf_counter() - start) / objects))
+
+			renderer = render.Renderer()
+			start = time.perf_counter()
+			renderer.submit(rec['plots'])
+			rendered, failed = renderer.close()
+			print('  {} queued plots rendered on 2 processes in {:.2f} s ({} failed)'.format(rendered,
+				time.perf_counter() - start, failed))
+		finally:
+			os.chdir(home)
+	print('')
+
+
+def bench_periods(objects=10, points=300, min_freq=0.04, max_freq=5):
+	'''Compares Lomb-Scargle with the eclipse engines of periods.py for recovering the true period (within 1%) of
+	synthetic EA, EB and EW binaries on the same grid, times the vectorized phase dispersion against scoring the
+	frequencies one at a time with lombscargle.phase_dispersion, and the memory of a chunked search against folding
+	the whole grid at once'''
+
+	print('Period search engines ({} binaries of every type, {} points, {} to {} cycles/day)'.format(objects, points,
+		min_freq, max_freq))
+	curves = {kind: [synthetic.light_curve(kind, points, seed=100 + i) for i in range(objects)] for kind in synthetic.KINDS}
+
+	for engine in periods.ENGINES:
+		found = {}
+		half = 0
+		begin = time.perf_counter()
+		for kind, population in curves.items():
+			found[kind] = 0
+			for lc, params in population:
+				lc = lc.good()
+				t, y = lc.time, lc.mag.astype(np.float64)
+				frequency = periods.grid(t, min_freq, max_freq)
+				if engine == 'lombscargle':
+					power = LombScargle(t, y).power(frequency)
+					best = frequency[np.argmax(power)]
+				else:
+					best, _ = periods.search(engine, t, y, frequency, lc.mag_err)
+				found[kind] += abs(best * params['period'] - 1) < 0.01
+				half += abs(best * params['period'] - 2) < 0.02
+		elapsed = (time.perf_counter() - begin) / (objects * len(curves))
+		print('  {:<12} found {}, half the period for {}, {:.2f} s per curve'.format(engine,
+			', '.join('{} {}/{}'.format(kind, n, objects) for kind, n in found.items()), half, elapsed))
+
+	lc, _ = curves['EA'][0]
+	lc = lc.good()
+	t, y = lc.time, lc.mag.astype(np.float64)
+	frequency = periods.grid(t, min_freq, max_freq)
+	sample = frequency[::20]
+	old = time_it(lambda: [lombscargle.phase_dispersion(t, y, f) for f in sample], repeat=1) * 20
+	new = time_it(lambda: periods.pdm(t, y, frequency))
+	report('PDM of {} frequencies'.format(len(frequency)), old, new)
+
+	big, _ = synthetic.light_curve('EA', 100000, seed=1)
+	big = big.good()
+	t, y = big.time, big.mag.astype(np.float64)
+	frequency = periods.grid(t, min_freq, max_freq, samples_per_peak=1)[:500]
+	for label, cells in (('whole grid', len(frequency) * len(t)), ('chunked', periods.CELLS)):
+		tracemalloc.start()
+		begin = time.perf_counter()
+		periods.conditional_entropy(t, y, frequency, cells=cells)
+		elapsed = time.perf_counter() - begin
+		peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+		print('  conditional entropy of {} frequencies x {} points, {}: {:.2f} s, {:.0f} MB peak'.format(
+			len(frequency), len(t), label, elapsed, peak / 1e6))
+	print('')
+
+
+# the modules app_eclipseDataminer.py and stages.py used to import when they were loaded
+EAGER_APP = ['pandas', 'matplotlib.pyplot', 'object_info', 'aavso', 'lombscargle', 'cross_id', 'phase_adjustments',
+		'parameters', 'initial_setup', 'plotting', 'cache', 'vsx_index', 'pipeline', 'stages', 'batch', 'catalog',
+		'journal', 'instrument', 'services', 'triage']
+EAGER_STAGES = ['object_info', 'aavso', 'lombscargle', 'cross_id', 'phase_adjustments', 'parameters', 'plotting',
+		'cache', 'instrument', 'triage']
+
+
+def python_time(code, repeat=3):
+	'''Best wall time in seconds of a new Python process running the code, in this directory'''
+
+	return time_it(lambda: subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.DEVNULL),
+			repeat=repeat)
+
+
+def bench_imports():
+	'''Startup times of new processes: the command line help and report, and an analysis worker, with the modules
+	the program used to import up front loaded first against the lazy imports of now'''
+
+	print('Import times (new processes)')
+	eager_app = 'import ' + ', '.join(EAGER_APP) + '\n'
+	commands = [('--help', "import app_eclipseDataminer as app\ntry:\n\tapp.main(['--help'])\nexcept SystemExit:\n\tpass"),
+		('report', "import app_eclipseDataminer as app\napp.main(['report', '--journal', 'none.jsonl', '--metrics', "
+			"'none.jsonl'])")]
+	for label, code in commands:
+		report(label, python_time(eager_app + code), python_time(code))
+
+	# a worker of the analysis pool imports the main module and then what the analysis stage needs
+	worker = 'import app_eclipseDataminer, batch, stages\nimport object_info, lombscargle, phase_adjustments, ' \
+		'parameters, plotting'
+	report('analysis worker', python_time('import ' + ', '.join(EAGER_STAGES) + '\n' + eager_app + worker),
+		python_time(worker))
+
+	print('')
+
+
+if __name__ == '__main__':
+	main()
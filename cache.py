@@ -0,0 +1,191 @@
+#!/usr/bin/python3
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import instrument
+
+
+# coordinates are rounded to this many decimal degrees (~0.04 arcsec) before they become part of a cache key
+COORD_DECIMALS = 5
+
+DEFAULT_PATH = 'response_cache.sqlite'
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# the cache shared by every network-touching module; None means caching is turned off
+_cache = None
+
+
+class CacheMiss(LookupError):
+	'''Raised in offline mode when a response is not in the cache'''
+
+
+def main():
+	'''main function for testing this module'''
+
+	print('TESTING...')
+	print('')
+	test = ResponseCache(':memory:', max_bytes=100)
+	key = make_key('vsx', ra=272.417942, dec=-32.556141)
+	print(test.fetch(key, lambda: b'x' * 60))
+	print(test.fetch(key, lambda: b'y' * 60))
+	test.fetch(make_key('vsx', ra=1, dec=2), lambda: b'z' * 60)
+	print(test.stats())
+
+
+def make_key(kind, **params):
+	'''Builds a cache key from the kind of request and its normalized parameters'''
+
+	norm = {}
+	for k, v in params.items():
+		if isinstance(v, float):
+			v = round(v, COORD_DECIMALS)
+		elif isinstance(v, (list, tuple)):
+			v = list(v)
+		norm[k] = v
+
+	text = kind + ':' + json.dumps(norm, sort_keys=True)
+	return kind + ':' + hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+	'''SQLite backed store of raw responses with a time to live, least recently used eviction once the store
+	grows past max_bytes, hit/miss counters, and an offline mode that never calls the network'''
+
+	def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, offline=False):
+		self.path = path
+		self.ttl = ttl
+		self.max_bytes = max_bytes
+		self.offline = offline
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self._lock = threading.Lock()
+		self._db = sqlite3.connect(path, check_same_thread=False)
+		self._db.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value BLOB, size INTEGER, '
+				'created REAL, accessed REAL)')
+		self._db.execute('CREATE INDEX IF NOT EXISTS by_access ON responses (accessed)')
+		self._db.commit()
+		self._size = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+	def get(self, key):
+		'''Returns the stored bytes for key, or None if missing or older than the time to live. Expired entries are
+		still served in offline mode'''
+
+		now = time.time()
+		with self._lock:
+			row = self._db.execute('SELECT value, created FROM responses WHERE key = ?', (key,)).fetchone()
+			if row is None or (not self.offline and now - row[1] > self.ttl):
+				self.misses += 1
+				return None
+
+			self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+			self._db.commit()
+			self.hits += 1
+
+		return row[0]
+
+	def put(self, key, value):
+		'''Stores the bytes for key and evicts the least recently used entries if the store is too big'''
+
+		now = time.time()
+		with self._lock:
+			old = self._db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+			if old is not None:
+				self._size -= old[0]
+
+			self._db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)', (key, value, len(value), now, now))
+			self._size += len(value)
+
+			while self._size > self.max_bytes:
+				oldest = self._db.execute('SELECT key, size FROM responses ORDER BY accessed LIMIT 1').fetchone()
+				if oldest is None or oldest[0] == key:
+					break
+				self._db.execute('DELETE FROM responses WHERE key = ?', (oldest[0],))
+				self._size -= oldest[1]
+				self.evictions += 1
+
+			self._db.commit()
+
+	def fetch(self, key, download):
+		'''Returns the bytes for key from the cache, calling download() and storing its result on a miss'''
+
+		value = self.get(key)
+		if value is not None:
+			return value
+
+		if self.offline:
+			raise CacheMiss('Offline mode and nothing cached for ' + key)
+
+		value = download()
+		self.put(key, value)
+
+		return value
+
+	def stats(self):
+		'''Returns the hit/miss counters and the current size of the store'''
+
+		total = self.hits + self.misses
+		return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+			'hit_rate': self.hits / total if total else 0.0, 'bytes': self._size}
+
+	def close(self):
+		self._db.close()
+
+
+def configure(path=DEFAULT_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, offline=False):
+	'''Sets up the shared cache used by aavso, object_info and cross_id; a path of None turns caching off'''
+
+	global _cache
+
+	if _cache is not None:
+		_cache.close()
+
+	_cache = None if path is None else ResponseCache(os.path.expanduser(path), ttl, max_bytes, offline)
+
+	return _cache
+
+
+def get_cache():
+	'''Returns the shared cache, or None if caching is turned off'''
+
+	return _cache
+
+
+def cached_text(kind, download, **params):
+	'''Returns the text from download() for the given request parameters, going through the shared cache if any'''
+
+	if _cache is None:
+		return downloaded(download)
+
+	key = make_key(kind, **params)
+	return _cache.fetch(key, lambda: downloaded(download).encode('utf-8')).decode('utf-8')
+
+
+def downloaded(download):
+	'''Calls download() and counts the bytes of the text it returns (see instrument.count)'''
+
+	text = download()
+	instrument.count('bytes_downloaded', len(text.encode('utf-8')))
+
+	return text
+
+
+def cached_object(kind, compute, **params):
+	'''Returns the python object from compute() for the given request parameters, going through the shared cache if
+	any. Used for results that are not plain text, e.g. VizieR tables'''
+
+	if _cache is None:
+		return compute()
+
+	key = make_key(kind, **params)
+	return pickle.loads(_cache.fetch(key, lambda: pickle.dumps(compute())))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,193 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import pandas as pd
+
+# pyarrow is only needed when a results catalog is used
+try:
+	import pyarrow as pa
+	import pyarrow.dataset as ds
+	import pyarrow.parquet as pq
+except ImportError:
+	pa = None
+
+
+# objects (or cross-ids) kept in memory before they are appended to the catalog as a new Parquet file
+BATCH_SIZE = 1000
+
+# columns added to the query columns for every object
+RESULT_FIELDS = [('name', 'string'), ('status', 'string'), ('vsx_id', 'string'), ('vsx_type', 'string'),
+		('period', 'float64'), ('epoch', 'float64'), ('minimum', 'float64'), ('maximum', 'float64')]
+
+CROSS_ID_FIELDS = [('obj', 'int64'), ('name', 'string'), ('dist', 'float64'), ('ra', 'float64'), ('dec', 'float64')]
+
+# comparison operators understood by parse_filter
+OPERATORS = ['<=', '>=', '!=', '==', '<', '>', '=']
+
+
+def main():
+	'''Prints the objects of a results catalog, optionally filtered, e.g.
+	./catalog.py results 'period < 1' 'status == analyzed' '''
+
+	if len(sys.argv) < 2:
+		print('usage: catalog.py CATALOG [FILTER ...]')
+		return
+
+	filters = [parse_filter(f) for f in sys.argv[2:]] or None
+	with pd.option_context('display.max_rows', 200, 'display.width', 200):
+		print(read(sys.argv[1], filters=filters))
+
+
+class Catalog:
+	'''A results catalog: a directory of Parquet files holding one row per object of the query file (the query
+	columns, the VSX results and the parameters found) and a table of the possible cross-ids. Rows are buffered and
+	appended in batches as new files, so a long run keeps its results on disk as it goes without rewriting
+	anything, and a later run can append to the same catalog'''
+
+	def __init__(self, path, query, batch_size=BATCH_SIZE):
+		if pa is None:
+			raise ImportError('the results catalog needs pyarrow (pip install pyarrow)')
+
+		self.path = path
+		self.batch_size = batch_size
+		self.query_columns = [c for c in query.columns if c not in dict(RESULT_FIELDS)]
+		self.schemas = {'objects': query_schema(query[self.query_columns]), 'cross_ids': schema(CROSS_ID_FIELDS)}
+		self.buffers = {'objects': [], 'cross_ids': []}
+
+		for table in self.schemas:
+			os.makedirs(os.path.join(path, table), exist_ok=True)
+
+	def add(self, row, matches=None):
+		'''Adds an object (a dictionary of column values) and the dataframe of its possible cross-ids'''
+
+		self.buffers['objects'].append(row)
+		if matches is not None and len(matches):
+			for match in matches[['name', 'dist', 'ra', 'dec']].itertuples(index=False):
+				self.buffers['cross_ids'].append(dict(match._asdict(), obj=row['obj']))
+
+		if len(self.buffers['objects']) >= self.batch_size:
+			self.flush()
+
+	def flush(self):
+		'''Appends the buffered rows to the catalog as one new Parquet file per table'''
+
+		for table, rows in self.buffers.items():
+			if not rows:
+				continue
+
+			schema = self.schemas[table]
+			data = pd.DataFrame(rows).reindex(columns=schema.names)
+			arrow = pa.Table.from_pandas(data, schema=schema, preserve_index=False)
+			pq.write_table(arrow, next_part(os.path.join(self.path, table)))
+			rows.clear()
+
+	def close(self):
+		self.flush()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+
+def schema(fields):
+	return pa.schema([(name, pa.type_for_alias(kind)) for name, kind in fields])
+
+
+def query_schema(query):
+	'''Schema of the objects table: the query columns with their types (text columns as strings), the object's
+	position in the query, and the result columns'''
+
+	fields = [('obj', 'int64')]
+	for column, dtype in query.dtypes.items():
+		if pd.api.types.is_integer_dtype(dtype):
+			fields.append((column, 'int64'))
+		elif pd.api.types.is_float_dtype(dtype):
+			fields.append((column, 'float64'))
+		else:
+			fields.append((column, 'string'))
+
+	return schema(fields + RESULT_FIELDS)
+
+
+def next_part(directory):
+	'''Name of the next Parquet file of a table; numbering continues after the files already there'''
+
+	parts = [f for f in os.listdir(directory) if f.startswith('part-') and f.endswith('.parquet')]
+
+	return os.path.join(directory, 'part-{:06d}.parquet'.format(len(parts)))
+
+
+def object_row(df, rec, status):
+	'''The catalog row of an object: its query columns and what was found for it'''
+
+	row = df.loc[rec['obj']]
+	values = {'obj': rec['obj'], 'status': status}
+	for column in df.columns:
+		values[column] = row[column]
+
+	for column, _ in RESULT_FIELDS:
+		if column in rec:
+			values[column] = rec[column]
+
+	# the VSX columns may still be the missing values of the query dataframe
+	for column in ('vsx_id', 'vsx_type'):
+		if pd.isna(values.get(column)):
+			values[column] = None
+
+	return values
+
+
+def read(path, table='objects', filters=None, columns=None):
+	'''Reads a table of the catalog into a dataframe. filters are (column, operator, value) tuples that must all
+	hold, e.g. [('period', '<', 1)]; Parquet files whose column statistics rule them out are not read'''
+
+	if pa is None:
+		raise ImportError('the results catalog needs pyarrow (pip install pyarrow)')
+
+	dataset = ds.dataset(os.path.join(path, table), format='parquet')
+	expression = None
+	for column, op, value in filters or []:
+		term = compare(ds.field(column), op, value)
+		expression = term if expression is None else expression & term
+
+	return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def compare(field, op, value):
+	if op in ('==', '='):
+		return field == value
+	if op == '!=':
+		return field != value
+	if op == '<':
+		return field < value
+	if op == '<=':
+		return field <= value
+	if op == '>':
+		return field > value
+	if op == '>=':
+		return field >= value
+
+	raise ValueError('unknown operator ' + op)
+
+
+def parse_filter(text):
+	'''Turns a filter written as 'column operator value' (e.g. 'period < 1') into a (column, operator, value)
+	tuple; numbers are compared as numbers and anything else as text'''
+
+	for op in OPERATORS:
+		if op in text:
+			column, value = (part.strip() for part in text.split(op, 1))
+			try:
+				value = float(value)
+			except ValueError:
+				value = value.strip('\'"')
+			return column, op, value
+
+	raise ValueError('no comparison in filter ' + text)
+
+
+if __name__ == '__main__':
+	main()
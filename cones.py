@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+
+import collections
+import sys
+import numpy as np
+from scipy.spatial import cKDTree
+from vsx_index import unit_vectors, chord, arcmin
+
+
+# objects within this many arcmin of the object a cone starts from are covered by the same cone
+CLUSTER_RADIUS = 2.0
+
+# a cone of the plan: center in degrees, radius in arcmin, and the positions (in the input arrays) it covers
+Cone = collections.namedtuple('Cone', ['ra', 'dec', 'radius', 'members'])
+
+
+def main():
+	'''main function for testing: plans the cones for a crowded made up field and prints how many remote queries
+	they save, e.g. python3 cones.py 5000 2.0'''
+
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+	cluster = float(sys.argv[2]) if len(sys.argv) > 2 else CLUSTER_RADIUS
+
+	ra, dec = crowded_field(n)
+	cones = plan(ra, dec, 1.0, cluster)
+	print('{} positions in {} cones ({:.1f} per cone, largest radius {:.2f} arcmin)'.format(n, len(cones),
+		n / len(cones), max(cone.radius for cone in cones)))
+
+
+def crowded_field(n, ra=272.4, dec=-32.5, size=30.0, seed=0):
+	'''n made up positions (degrees) in a square of size arcmin around ra, dec, half of them in a few tight groups
+	like the crowded bulge fields of OGLE'''
+
+	rand = np.random.RandomState(seed)
+	groups = rand.rand(10, 2) * size / 60
+	grouped = groups[rand.randint(0, 10, n // 2)] + rand.randn(n // 2, 2) * 0.5 / 60
+	spread = rand.rand(n - n // 2, 2) * size / 60
+	pos = np.concatenate([grouped, spread]) - size / 120
+
+	return ra + pos[:, 0] / np.cos(np.radians(dec)), dec + pos[:, 1]
+
+
+def plan(ra, dec, radius, cluster=CLUSTER_RADIUS):
+	'''Groups positions (degrees) into cones so that one query of radius cone.radius (arcmin) around the center
+	of a cone finds everything within radius arcmin of each of its members. Cones start from the first position
+	not covered yet, in input order, and take every uncovered position within cluster arcmin of it'''
+
+	vectors = unit_vectors(ra, dec)
+	tree = cKDTree(vectors)
+	covered = np.zeros(len(vectors), dtype=bool)
+
+	cones = []
+	for first in range(len(vectors)):
+		if covered[first]:
+			continue
+
+		near = np.array(tree.query_ball_point(vectors[first], chord(cluster)), dtype=int)
+		members = np.sort(near[~covered[near]])
+		covered[members] = True
+
+		center = vectors[members].mean(axis=0)
+		center /= np.linalg.norm(center)
+		reach = arcmin(np.linalg.norm(vectors[members] - center, axis=1)).max()
+		cone_ra, cone_dec = position(center)
+		cones.append(Cone(cone_ra, cone_dec, float(reach + radius), members))
+
+	return cones
+
+
+def position(vector):
+	'''Right ascension and declination in degrees of a unit vector'''
+
+	x, y, z = vector
+
+	return float(np.degrees(np.arctan2(y, x)) % 360), float(np.degrees(np.arcsin(np.clip(z, -1, 1))))
+
+
+def matches(ra, dec, found_ra, found_dec, radius):
+	'''Exact pairs of positions and objects found (all in degrees) within radius arcmin of each other: arrays of the
+	position numbers, the object numbers and their separations in arcmin, by position'''
+
+	if len(ra) == 0 or len(found_ra) == 0:
+		return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+
+	vectors = unit_vectors(ra, dec)
+	found = unit_vectors(found_ra, found_dec)
+	near = cKDTree(found).query_ball_point(vectors, chord(radius), return_sorted=True)
+
+	pos = np.repeat(np.arange(len(vectors)), [len(n) for n in near])
+	obj = np.concatenate(near).astype(int) if len(pos) else np.zeros(0, dtype=int)
+
+	return pos, obj, arcmin(np.linalg.norm(vectors[pos] - found[obj], axis=1))
+
+
+if __name__ == '__main__':
+	main()
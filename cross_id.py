@@ -1,10 +1,12 @@
 #!/usr/bin/python3
 
-from astroquery.vizier import Vizier
+from astroquery.vizier import VizierClass
 import astropy.coordinates as coord
 import astropy.units as u
+import numpy as np
 import pandas as pd
-import re
+import requests
+import cache, cones, services
 
 
 # DIA OGLE      'J/AcA/52/129'  [_r, Field, Vno, RAJ2000, DEJ2000, Rad, VType, NFrames, NGood, Flags]
@@ -13,6 +15,17 @@ import re
 # UCAC4         'I/322A/out'    [_r, UCAC4, RAJ2000, DEJ2000, ePos, f.mag, h, Z, B, L, N, S]
 # USNO-B1.0     'I/284/out'     [_r, USNO-B1.0, RAJ2000, DEJ2000, e_RAJ2000, R1mag, B2mag, R2mag, Imag]
 # PPMXL         'I/317/sample'  [_r, RAJ2000, DEJ2000, pmRA, pmDE, r1mag, r2mag, imag, No, f1]
+CATALOGS = ['J/AcA/52/129', 'II/246/out', 'I/327/cmc15', 'I/322A/out', 'I/284/out', 'I/317/sample']
+
+# identifier column and designation prefix of each catalog other than OGLE DIA
+ID_COLUMNS = [('_2MASS', '2MASS J'), ('CMC15', 'CMC15 J'), ('UCAC4', 'UCAC4 '), ('USNO-B1.0', 'USNO-B1.0 '),
+		('PPMXL', 'PPMXL ')]
+
+# search radius in arcsec for a cross-id
+RADIUS = 1.0
+
+# number of positions sent in one multi-position query
+BATCH_SIZE = 500
 
 
 def main():
@@ -29,86 +42,165 @@ def viz(ra, dec, fn):
 
 	nw_nm = 'Found nothing'
 
-	# create new data frame that will hold the cross-id matches discovered
-	columns = ['name', 'dist', 'ra', 'dec']
-	matches = pd.DataFrame(columns=columns, index=range(0, 6))
+	# query the database, or reuse the tables from an earlier run at the same position
+	result = cache.cached_object('vizier', lambda: query_catalogs(ra, dec), ra=float(ra), dec=float(dec),
+					catalogs=CATALOGS, radius=RADIUS)
 
-	v = Vizier(columns=["**", "+_r"])        # '*' sort by columns, '+' for ascending, '_r' for distance column
+	# create new data frame that will hold the cross-id matches discovered, one row per catalog
+	rows = []
+	for table in result.values():
+		if len(table) == 0:
+			continue
 
-	# query the database
-	result = v.query_region(coord.SkyCoord(ra=ra, dec=dec,
-                                                unit=(u.deg, u.deg),
-                                                frame='icrs'),
-                                                radius=1.0*u.arcsec,
-                                                catalog=['J/AcA/52/129',
-                                                         'II/246/out',
-                                                         'I/327/cmc15',
-                                                         'I/322A/out',
-                                                         'I/284/out',
-                                                         'I/317/sample'])
-
-	for cat in range(0, int(len(result))):
-		if str(result) == 'Empty TableList':
-			break
-        
-		which_catalog = result[cat]
-		r = float(which_catalog[0]['_r'])
-		RA = float(which_catalog[0]['RAJ2000'])
-		DE = float(which_catalog[0]['DEJ2000'])
-
-		matches.iloc[cat][1] = r
-		matches.iloc[cat][2] = RA
-		matches.iloc[cat][3] = DE
-
-		if bool(re.search('Field', str(result[cat].columns))) == True:
-			field = int(result[cat]['Field'])
-			vno = int(result[cat]['Vno'])
-			nw_nm = 'OGLEII DIA ' + fn + '-SC' + str(field) + ' V' + str(vno)
+		name = match_name(table, 0, fn)
+		if name is None:
+			continue
+
+		rows.append([name, float(table['_r'][0]), float(table['RAJ2000'][0]), float(table['DEJ2000'][0])])
+
+		if 'Vno' in table.colnames:
+			nw_nm = name
 			print('The new name is ' + nw_nm)
-			matches.iloc[0][0] = nw_nm
 
-		elif  bool(re.search('2MASS', str(result[cat].columns))) == True and \
-                        bool(re.search('Rflg', str(result[cat].columns))) == True:
-			mass_name_1 = str(result[cat]['_2MASS'])
-			mass_name_2 = mass_name_1[33:50].strip()
-			mass_name_3 = '2MASS J' + mass_name_2
-			matches.iloc[cat][0] = mass_name_3
+	final_matches = pd.DataFrame(rows, columns=['name', 'dist', 'ra', 'dec'])
 
-		elif  bool(re.search('CMC15', str(result[cat].columns))) == True:
+	if __name__ == '__main__':
+		print('POSSIBLE MATCHES FOUND:')
+		print(final_matches)
 
-			cmc_name_1 = str(result[cat]['CMC15'])
-			cmc_name_2 = cmc_name_1[32:50].strip()
-			cmc_name_3 = 'CMC15 J' + cmc_name_2
-			matches.iloc[cat][0] = cmc_name_3
+	return nw_nm, final_matches
 
-		elif  bool(re.search('UCAC4', str(result[cat].columns))) == True:
 
-			uc_name_1 = str(result[cat]['UCAC4'])
-			uc_name_2 = uc_name_1[22:60].strip()
-			uc_name_3 = 'UCAC4 ' + uc_name_2
-			matches.iloc[cat][0] = uc_name_3
+def match_name(table, row, fn):
+	'''Builds the designation of one row of a VizieR result table from its identifier columns'''
 
-		elif  bool(re.search('USNO-B1.0', str(result[cat].columns))) == True:
+	if 'Vno' in table.colnames:
+		return 'OGLEII DIA ' + fn + '-SC' + str(int(table['Field'][row])) + ' V' + str(int(table['Vno'][row]))
 
-			usn_name_1 = str(result[cat]['USNO-B1.0'])
-			usn_name_2 = usn_name_1[26:50].strip()
-			usn_name_3 = 'USNO-B1.0 ' + usn_name_2
-			matches.iloc[cat][0] = usn_name_3
+	for column, prefix in ID_COLUMNS:
+		if column in table.colnames:
+			return prefix + str(table[column][row]).strip()
 
-		elif  bool(re.search('PPMXL', str(result[cat].columns))) == True:
+	return None
 
-			pm_name_1 = str(result[cat]['PPMXL'])
-			pm_name_2 = pm_name_1[40:70].strip()
-			pm_name_3 = 'PPMXL ' + pm_name_2
-			matches.iloc[cat][0] = pm_name_3
 
-	final_matches= matches.dropna(axis=0, how='any')
+def viz_batch(ra, dec, fn, chunk=BATCH_SIZE):
+	'''Cross-identifies many objects at once with a single multi-position VizieR query per catalog (split into
+	chunks of positions) and returns one table of all matches: the position of the object in the input arrays (obj),
+	the catalog, the designation, the distance in arcsec, and the coordinates of the match. fn is the field name
+	for every object or a single one for all'''
 
-	if __name__ == '__main__':
-		print('POSSIBLE MATCHES FOUND:')
-		print(final_matches)
+	ra = np.asarray(ra, dtype=np.float64)
+	dec = np.asarray(dec, dtype=np.float64)
+	fn = np.broadcast_to(np.asarray(fn, dtype=str), ra.shape)
+
+	frames = []
+	for begin in range(0, len(ra), chunk):
+		sl = slice(begin, begin + chunk)
+		for cat in CATALOGS:
+			result = cache.cached_object('vizier_batch', lambda: query_catalogs(ra[sl], dec[sl], [cat], row_limit=-1),
+							ra=ra[sl].round(cache.COORD_DECIMALS).tolist(),
+							dec=dec[sl].round(cache.COORD_DECIMALS).tolist(),
+							catalogs=[cat], radius=RADIUS)
+
+			for table in result.values():
+				if len(table) == 0:
+					continue
+
+				# '_q' is the 1-based position of the query coordinates that the row matched
+				obj = begin + np.asarray(table['_q'], dtype=int) - 1
+				names = [match_name(table, i, fn[o]) for i, o in enumerate(obj)]
+				frames.append(pd.DataFrame({'obj': obj, 'catalog': cat, 'name': names,
+						'dist': np.asarray(table['_r'], dtype=float),
+						'ra': np.asarray(table['RAJ2000'], dtype=float),
+						'dec': np.asarray(table['DEJ2000'], dtype=float)}))
+
+	if not frames:
+		return pd.DataFrame(columns=['obj', 'catalog', 'name', 'dist', 'ra', 'dec'])
+
+	matches = pd.concat(frames, ignore_index=True).dropna(subset=['name'])
+
+	return matches.sort_values(['obj', 'catalog', 'dist'], kind='stable').reset_index(drop=True)
+
+
+def viz_cones(ra, dec, fn, cluster=cones.CLUSTER_RADIUS):
+	'''Same table as viz_batch, from one VizieR query of all the catalogs per cone of objects (see cones.plan)
+	instead of one position per object: every row of a cone's result is matched back to the members of the cone
+	within RADIUS arcsec of it, by exact separation. Cones whose query fails are left out'''
+
+	ra = np.asarray(ra, dtype=np.float64)
+	dec = np.asarray(dec, dtype=np.float64)
+	fn = np.broadcast_to(np.asarray(fn, dtype=str), ra.shape)
+
+	frames = []
+	for cone in cones.plan(ra, dec, RADIUS / 60, cluster):
+		radius = cone.radius * 60
+		try:
+			result = cache.cached_object('vizier_cone',
+							lambda: query_catalogs(cone.ra, cone.dec, row_limit=-1, radius=radius),
+							ra=round(cone.ra, cache.COORD_DECIMALS), dec=round(cone.dec, cache.COORD_DECIMALS),
+							catalogs=CATALOGS, radius=round(radius, 3))
+		except (cache.CacheMiss, requests.RequestException) as e:
+			print('VizieR query of a cone of {} objects failed ({})'.format(len(cone.members), e))
+			continue
+
+		for key, table in zip(result.keys(), result.values()):
+			if len(table) == 0:
+				continue
+
+			members = cone.members
+			pos, row, dist = cones.matches(ra[members], dec[members], np.asarray(table['RAJ2000'], dtype=float),
+							np.asarray(table['DEJ2000'], dtype=float), RADIUS / 60)
+			if len(pos) == 0:
+				continue
+
+			obj = members[pos]
+			cat = next((c for c in CATALOGS if key.startswith(c)), key)
+			frames.append(pd.DataFrame({'obj': obj, 'catalog': cat,
+					'name': [match_name(table, r, fn[o]) for r, o in zip(row, obj)], 'dist': dist * 60,
+					'ra': np.asarray(table['RAJ2000'], dtype=float)[row],
+					'dec': np.asarray(table['DEJ2000'], dtype=float)[row]}))
+
+	if not frames:
+		return pd.DataFrame(columns=['obj', 'catalog', 'name', 'dist', 'ra', 'dec'])
+
+	matches = pd.concat(frames, ignore_index=True).dropna(subset=['name'])
+
+	return matches.sort_values(['obj', 'catalog', 'dist'], kind='stable').reset_index(drop=True)
+
+
+def new_names(matches):
+	'''Returns the OGLE DIA designation for each object of a viz_batch table that has one, indexed by obj'''
+
+	dia = matches.loc[matches['catalog'] == CATALOGS[0]]
+
+	return dia.drop_duplicates('obj').set_index('obj')['name']
+
+
+class ServiceVizier(VizierClass):
+	'''astroquery's Vizier sending its queries to the server configured for VizieR through the pooled connections,
+	timeouts and retries of the shared session (see services.py)'''
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		services.mount(self._session)
+
+	def _server_to_url(self, return_type='votable'):
+		return services.url('vizier', super()._server_to_url(return_type))
+
+
+def query_catalogs(ra, dec, catalogs=CATALOGS, row_limit=50, radius=RADIUS):
+	'''Queries the VizieR catalogs within radius arcsec of the coordinates given (a single position or arrays of
+	positions) and returns the TableList of results'''
+
+	v = ServiceVizier(columns=["**", "+_r"], row_limit=row_limit)        # '*' sort by columns, '+' for ascending, '_r' for distance column
+
+	return v.query_region(coord.SkyCoord(ra=ra, dec=dec,
+                                                unit=(u.deg, u.deg),
+                                                frame='icrs'),
+                                                radius=radius*u.arcsec,
+                                                catalog=catalogs)
 
-	return nw_nm, final_matches
 
 if __name__ == '__main__':
 	main()
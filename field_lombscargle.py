@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+
+import numpy as np
+
+
+# frequencies evaluated per pass; bounds the trig matrices to chunk x epochs values
+CHUNK = 1000
+
+
+def main():
+	'''main function for testing: compares the field engine with astropy on a few random sinusoids'''
+
+	from astropy.timeseries import LombScargle
+
+	rand = np.random.RandomState(42)
+	t = np.sort(100 * rand.rand(200))
+	freqs = 0.5 + rand.rand(5)
+	Y = np.sin(2 * np.pi * freqs[:, None] * t) + 0.1 * rand.randn(5, len(t))
+	Y[rand.rand(*Y.shape) < 0.1] = np.nan
+
+	frequency = autofrequency(t)
+	best, _ = best_frequencies(t, Y, frequency)
+	for i in range(len(Y)):
+		good = np.isfinite(Y[i])
+		p = LombScargle(t[good], Y[i, good]).power(frequency)
+		print('true {:.5f}   field engine {:.5f}   astropy {:.5f}'.format(freqs[i], best[i], frequency[np.argmax(p)]))
+
+
+def align(curves, tolerance=1e-3):
+	'''Puts the light curves of one field, given as (HJD, mag) array pairs, on a common time grid. Epochs of
+	different stars closer than tolerance days count as the same frame. Returns the grid times and a matrix with
+	one row of magnitudes per star and NaN where the star has no (good) point at that epoch'''
+
+	keys = [np.round(np.asarray(hjd, dtype=np.float64) / tolerance).astype(np.int64) for hjd, _ in curves]
+	grid, first = np.unique(np.concatenate(keys), return_index=True)
+	t = np.concatenate([np.asarray(hjd, dtype=np.float64) for hjd, _ in curves])[first]
+
+	Y = np.full((len(curves), len(grid)), np.nan)
+	for i, (key, (_, mag)) in enumerate(zip(keys, curves)):
+		Y[i, np.searchsorted(grid, key)] = mag
+
+	return t, Y
+
+
+def autofrequency(t, samples_per_peak=5, nyquist_factor=5, minimum_frequency=None, maximum_frequency=None):
+	'''Frequency grid built the same way as astropy's LombScargle.autofrequency'''
+
+	baseline = t.max() - t.min()
+	df = 1.0 / baseline / samples_per_peak
+
+	if minimum_frequency is None:
+		minimum_frequency = 0.5 * df
+	if maximum_frequency is None:
+		maximum_frequency = nyquist_factor * 0.5 * len(t) / baseline
+
+	return minimum_frequency + df * np.arange(1 + int(np.round((maximum_frequency - minimum_frequency) / df)))
+
+
+def _prepare(t, Y, dy, dtype):
+	'''Turns the magnitude matrix into normalized weights and weighted, centered magnitudes; missing points get
+	zero weight'''
+
+	good = np.isfinite(Y)
+	w = good / np.where(good, dy, 1.0) ** 2 if dy is not None else good.astype(np.float64)
+	w = w / w.sum(axis=1, keepdims=True)
+
+	y = np.where(good, Y, 0.0)
+	y = y - (w * y).sum(axis=1, keepdims=True)
+	yy = (w * y * y).sum(axis=1)
+
+	# times relative to the first epoch keep omega * t small enough for float32
+	return (t - t.min()).astype(dtype), w.astype(dtype), (w * y).astype(dtype), yy
+
+
+def _chunk_power(t, w, wy, yy, freq):
+	'''Standard normalized floating mean Lomb-Scargle power of every star at the frequencies of one chunk. The
+	trig terms depend only on the shared epochs, so they are computed once and shared by all the stars'''
+
+	wt = 2 * np.pi * np.outer(freq, t).astype(t.dtype)
+	cos, sin = np.cos(wt), np.sin(wt)
+	cos2, sin2 = np.cos(2 * wt), np.sin(2 * wt)
+
+	C = w @ cos.T
+	S = w @ sin.T
+	YC = wy @ cos.T
+	YS = wy @ sin.T
+	CC = 0.5 * (1 + w @ cos2.T) - C * C
+	SS = 0.5 * (1 - w @ cos2.T) - S * S
+	CS = 0.5 * (w @ sin2.T) - C * S
+	D = CC * SS - CS * CS
+
+	return (SS * YC * YC + CC * YS * YS - 2 * CS * YC * YS) / (yy[:, None] * D)
+
+
+def power(t, Y, frequency, dy=None, chunk=CHUNK, dtype=np.float64):
+	'''Lomb-Scargle power of every light curve (rows of Y on the time grid t, NaN for missing points) at every
+	frequency, as a stars x frequencies matrix. Matches astropy's LombScargle(t, y, dy).power(frequency)'''
+
+	t, w, wy, yy = _prepare(np.asarray(t, dtype=np.float64), Y, dy, dtype)
+
+	return np.hstack([_chunk_power(t, w, wy, yy, frequency[i:i + chunk]) for i in range(0, len(frequency), chunk)])
+
+
+def best_frequencies(t, Y, frequency, dy=None, chunk=CHUNK, dtype=np.float64):
+	'''Frequency with the highest Lomb-Scargle power for every light curve and that power. Only the running best
+	is kept, so memory does not grow with the number of frequencies'''
+
+	t, w, wy, yy = _prepare(np.asarray(t, dtype=np.float64), Y, dy, dtype)
+	best = np.zeros(len(Y))
+	best_power = np.full(len(Y), -np.inf)
+
+	for i in range(0, len(frequency), chunk):
+		p = _chunk_power(t, w, wy, yy, frequency[i:i + chunk])
+		j = np.argmax(p, axis=1)
+		top = p[np.arange(len(Y)), j]
+		better = top > best_power
+		best[better] = frequency[i + j[better]]
+		best_power[better] = top[better]
+
+	return best, best_power
+
+
+if __name__ == '__main__':
+	main()
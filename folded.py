@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+
+import time
+import numpy as np
+import pandas as pd
+from lightcurve import LightCurve
+
+
+def main():
+	'''main function for testing: folds the test light curve and times folding a large synthetic one'''
+
+	dat = LightCurve.from_frame(pd.read_csv('./test_folder/test_dat.csv', index_col=0))
+	curve = FoldedCurve(dat, 1 / 13.049)
+	epoch = curve.rezero()
+	extended = curve.extended()
+	print('{} points, {} in the extended phase range, epoch {}'.format(len(curve), len(extended), epoch))
+	print(extended.frame().describe())
+
+	n = 1000000
+	big = LightCurve(np.sort(np.random.rand(n)) * 5000, 14 + np.random.rand(n))
+	begin = time.perf_counter()
+	curve = FoldedCurve(big, 1 / 1.7)
+	curve.rezero()
+	extended = curve.extended()
+	extended.shift(0.001)
+	print('Folded, re-zeroed, extended and shifted {} points in {:.3f} s'.format(n, time.perf_counter() - begin))
+
+
+def fold(hjd, frequency):
+	'''Phases (0 to 1) of the observation times folded at the frequency'''
+
+	return np.mod(np.asarray(hjd, dtype=np.float64) * frequency, 1)
+
+
+class FoldedCurve:
+	'''A light curve folded at a frequency. The photometry stays in the lightcurve.LightCurve it came from and only
+	the phases are held as a separate array, so folding, moving the minima to phase 0 and shifting the epoch are each one
+	vectorized operation on that array. The -0.25 to 1.25 phase range used for the plots is a view made of an
+	index map into the points and a whole phase offset per row instead of copies of the rows (see extended).
+	Columns are read with curve['name'] like a dataframe; curve['Phase'] gives the phases'''
+
+	def __init__(self, data, frequency=None, phase=None, rows=None, offset=None):
+		self.data = data
+		self.phase0 = fold(data['HJD'], frequency) if phase is None else phase
+		self.rows = rows
+		self.offset = offset
+
+	@classmethod
+	def from_frame(cls, df):
+		'''Wraps a dataframe that already has a Phase column, like test_folded_df.csv. The phases are copied so
+		re-zeroing and shifting do not change the dataframe'''
+
+		if isinstance(df, cls):
+			return df
+
+		return cls(LightCurve.from_frame(df), phase=df['Phase'].to_numpy(dtype=np.float64, copy=True))
+
+	def __len__(self):
+		return len(self.phase0) if self.rows is None else len(self.rows)
+
+	def __getitem__(self, column):
+		if column == 'Phase':
+			return self.phase
+
+		values = np.asarray(self.data[column])
+
+		return values if self.rows is None else values[self.rows]
+
+	@property
+	def phase(self):
+		'''Phases of the rows; in the extended range these are computed from the index map'''
+
+		if self.rows is None:
+			return self.phase0
+
+		return self.phase0[self.rows] + self.offset
+
+	def rezero(self):
+		'''Moves the faintest point (largest magnitude, i.e., the primary eclipse minima) to phase 0 and wraps the
+		other phases back into 0 to 1. Returns the HJD of that point, the epoch of the minima'''
+
+		i = int(np.argmax(self.data.mag))
+		epoch = self.data.reference + self.data.time[i]
+
+		self.phase0 -= self.phase0[i]
+		self.phase0[self.phase0 < 0] += 1
+
+		return epoch
+
+	def shift(self, adjustment):
+		'''Subtracts the offset found for the eclipse center from every phase, in place'''
+
+		self.phase0 -= adjustment
+
+	def extended(self, margin=0.25):
+		'''The curve over the phase range -margin to 1 + margin: every point, then the points of the last margin
+		of the phase range moved one phase earlier, then those of the first margin moved one phase later. The
+		view shares the photometry and the phases with this curve'''
+
+		base = np.arange(len(self.phase0), dtype=np.intp)
+		last = np.flatnonzero(self.phase0 >= 1 - margin)
+		first = np.flatnonzero(self.phase0 <= margin)
+		offset = np.concatenate([np.zeros(len(base), np.int8), np.full(len(last), -1, np.int8),
+					np.ones(len(first), np.int8)])
+
+		return FoldedCurve(self.data, phase=self.phase0, rows=np.concatenate([base, last, first]), offset=offset)
+
+	def frame(self):
+		'''A dataframe copy of the rows with their phases, for writing to csv'''
+
+		df = self.data.to_frame()
+		if self.rows is not None:
+			df = df.iloc[self.rows].reset_index(drop=True)
+		df['Phase'] = self.phase
+
+		return df
+
+
+if __name__ == '__main__':
+	main()
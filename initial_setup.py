@@ -1,60 +1,185 @@
 #!/usr/bin/python3
 
-import pandas as pd
+import os
+import numpy as np
+
+
+# columns of the OGLE query file (vsx_id and vsx_type are added by this program) and the ones the program needs
+HEAD = ['Field', 'StarID', 'StarCat', 'RA', 'Decl', 'Pgood', 'I', 'Isig', 'Imed', 'Imederr', 'Ndetect', 'vsx_id', 'vsx_type']
+REQUIRED = ['Field', 'StarID', 'RA', 'Decl', 'vsx_id', 'vsx_type']
+
+# types given up front instead of inferred, so every batch gets the same types
+DTYPES = {'Field': object, 'StarID': 'int64', 'RA': 'float64', 'Decl': 'float64', 'vsx_id': object, 'vsx_type': object}
+
+# objects parsed at a time
+BATCH_SIZE = 10000
+
+# count_objects records the byte offset of every CHECKPOINT-th object, so skip_objects can seek close to a deep
+# start instead of reading every line before it
+CHECKPOINT = 10000
+
+# the offsets of every CHECKPOINT-th object of the query files counted, by path, size and modification time
+checkpoints = {}
 
 
 def main():
 	'''testing'''
 
 	print('testing...')
-	read_query()
+	txt_file, tot, begin, dist, auto = read_query()
+	for batch in read_batches(txt_file, begin, tot):
+		print(batch)
 
 
-def read_query():
-	'''Read the query file, create a new dataframe (df), and extract initial parameters'''
- 
-	head = ['Field', 'StarID', 'StarCat', 'RA', 'Decl', 'Pgood', 'I', 'Isig', 'Imed', 'Imederr', 'Ndetect', 'vsx_id', 'vsx_type']
+def read_query(txt_file=None, begin=None, dist=None, auto=None, stop=None):
+	'''Finds the query file and extracts initial parameters. Any parameter that is given (e.g. from the command line
+	or a config file) is used as is instead of asking for it, and a query file that was given but cannot be read
+	raises the OSError instead of asking for another. The objects themselves are read in batches by read_batches;
+	only the number of objects is counted here, without parsing the file'''
 
-	# read the query file and create a new dataframe -- init_df
+	# find the query file and count its objects
+	given = txt_file is not None
 	while True:
 		try:
 			if __name__ == '__main__':
 				txt_file = 'test_query.txt'
-			else:
+			elif txt_file is None:
 				txt_file = input('Enter the query text file name: ')
 
-			init_df = pd.read_csv(txt_file, comment='#', sep='\s+', header=None, names=head, index_col=False)
-			#init_df.set_index('Field', inplace=True, drop=False)
+			tot = count_objects(txt_file)
 			break
 
-		except ValueError:
+		except OSError:
+			if given:
+				raise
 			print('Sorry, that file does not exist. Please try again')
 			print('')
+			txt_file = None
  
 
-	tot = len(init_df)
 	print('There are {} objects in the query file'.format(str(tot)))
 	print('')
 
-	# defining the starting point allows users to split large files into multiple sessions
-	begin = int(input('Which object do you want to start on? '))
-	print('')
+	# defining the starting point (and optionally a stopping point) allows users to split large files into multiple sessions
+	if begin is None:
+		begin = int(input('Which object do you want to start on? '))
+		print('')
+
+	if stop is not None:
+		tot = min(tot, stop)
 
 	# the 'dist' parameter can be configured to determine if an object has already been classified
-	dist = int(input('What distance in arcmin would you like to use to decide if the object is already classified? '))
-	print('')
+	if dist is None:
+		dist = int(input('What distance in arcmin would you like to use to decide if the object is already classified? '))
+		print('')
 
 	# The fully automatic mode selects the default for all choices while they can be tweaked in the user input mode
-	# FULLY AUTOMATIC FEATURE IS NOT FUNCTIONING YET
-	auto = input('Do you want to run the analysis [1] fully automated or [any other key] with user input? ').strip()
+	if auto is None:
+		auto = input('Do you want to run the analysis [1] fully automated or [any other key] with user input? ').strip()
+
+	return txt_file, tot, begin, dist, auto
+
+
+def read_batches(txt_file, start=0, stop=None, batch_size=BATCH_SIZE, usecols=None):
+	'''Reads the objects start to stop - 1 of the query file lazily as dataframes of at most batch_size rows,
+	indexed by the position of the object in the file. The objects before start are skipped without being parsed
+	(see skip_objects), and the rest is parsed by pandas' C parser one batch at a time, so memory stays flat however
+	large the file is. usecols limits the columns read (the columns the program needs are always read)'''
+
+	# pandas is only imported once there is a query to read, so the command line starts quickly
+	import pandas as pd
+
+	with open(txt_file, 'rb') as f:
+		skip_objects(f, start)
+		if stop is not None and stop <= start:
+			return
+
+		# the query file may come without the vsx columns of an earlier output, so the names follow the number of
+		# fields of the first object
+		names = HEAD[:count_fields(f)]
+		if usecols is not None:
+			usecols = [c for c in names if c in set(usecols) | set(REQUIRED)]
+
+		reader = pd.read_csv(f, comment='#', sep=r'\s+', header=None, names=names, index_col=False, usecols=usecols,
+					dtype={c: t for c, t in DTYPES.items() if c in names}, engine='c',
+					chunksize=batch_size, nrows=None if stop is None else stop - start)
+
+		first = start
+		for batch in reader:
+			batch.index = pd.RangeIndex(first, first + len(batch))
+			first += len(batch)
+			for column in ('vsx_id', 'vsx_type'):
+				if column not in batch:
+					batch[column] = pd.Series(np.nan, index=batch.index, dtype=object)
+			yield batch
 
-	# REMOVE THIS ONCE FULLY AUTOMATIC FEATURE IS WORKING:
-	if auto == '1':
-		print('Sorry, fully automated is not available at this time. Defaulting to user input mode.')
-		print('')
-		auto_choice = '2'
 
-	return init_df, tot, begin, dist, auto
+def is_object(line):
+	'''True for a line of the query file that holds an object (not blank and not a comment)'''
+
+	line = line.strip()
+
+	return len(line) > 0 and not line.startswith(b'#')
+
+
+def count_objects(txt_file):
+	'''Counts the objects in the query file without parsing it, recording the byte offset of every CHECKPOINT-th
+	object on the way (see skip_objects)'''
+
+	offsets = []
+	n = 0
+	position = 0
+	with open(txt_file, 'rb') as f:
+		for line in f:
+			if is_object(line):
+				if n % CHECKPOINT == 0:
+					offsets.append(position)
+				n += 1
+			position += len(line)
+
+	checkpoints[file_key(txt_file)] = offsets
+
+	return n
+
+
+def file_key(txt_file):
+	'''Identifies a version of a file: its absolute path, size and modification time'''
+
+	stat = os.stat(txt_file)
+
+	return os.path.abspath(txt_file), stat.st_size, stat.st_mtime_ns
+
+
+def count_fields(f):
+	'''Number of fields of the next object of the binary file f, which is left where it was'''
+
+	position = f.tell()
+	line = b''
+	for line in f:
+		if is_object(line):
+			break
+	f.seek(position)
+
+	return len(line.split()) if is_object(line) else len(HEAD)
+
+
+def skip_objects(f, n):
+	'''Moves the binary file f past its next n objects. From the beginning of a file counted by count_objects it
+	seeks to the last checkpoint before the object first; the objects left, or all n in a file not counted, are
+	skipped as raw lines without parsing them, which takes time linear in their number'''
+
+	offsets = checkpoints.get(file_key(f.name)) if n > 0 and f.tell() == 0 else None
+	if offsets:
+		i = min(n // CHECKPOINT, len(offsets) - 1)
+		f.seek(offsets[i])
+		n -= i * CHECKPOINT
+
+	while n > 0:
+		line = f.readline()
+		if not line:
+			break
+		if is_object(line):
+			n -= 1
  
 
 if __name__ == '__main__':
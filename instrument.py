@@ -0,0 +1,223 @@
+#!/usr/bin/python3
+
+import cProfile
+import collections
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+
+# objects the rolling rate is computed over, and how often (in objects) the progress is printed
+WINDOW = 50
+PROGRESS_EVERY = 10
+
+# the record a stage is working on, per thread, so the counts made deep inside a stage (e.g. bytes downloaded by the
+# cache) go to the right object
+_local = threading.local()
+
+
+def main():
+	'''main function for testing: times the steps of a few made up objects and prints the metrics'''
+
+	@tracked('work')
+	def work(rec):
+		with timer('sleep'):
+			time.sleep(0.01 * rec['obj'])
+		count('points', 100 * rec['obj'])
+		return rec
+
+	monitor = Monitor(None, 5, every=1)
+	for obj in range(5):
+		rec = work({'obj': obj, 'profile': None})
+		print(metrics(rec, 'analyzed'))
+		monitor.record(rec, 'analyzed')
+
+
+def tracked(stage):
+	'''Decorator for the function of a pipeline stage (taking and returning the record): the time the stage takes
+	goes to the record's stages under the stage's name, the steps timed with timer go to its timings and the counts
+	made while it runs to its counts, and the stage runs under cProfile if the record has a profile directory (see
+	sampled). All of it travels with the record, so stages on thread or process pools report the same way'''
+
+	def decorate(func):
+		@functools.wraps(func)
+		def wrapper(rec, *args, **kwargs):
+			with track(rec, stage):
+				return func(rec, *args, **kwargs)
+		return wrapper
+
+	return decorate
+
+
+@contextlib.contextmanager
+def track(rec, stage):
+	'''Makes rec the record of the current thread for the duration of a stage and adds the time the stage took to
+	the record's stages'''
+
+	previous = getattr(_local, 'rec', None)
+	_local.rec = rec
+
+	profiler = None
+	if rec.get('profile'):
+		profiler = cProfile.Profile()
+		try:
+			profiler.enable()
+		except ValueError:
+			# only one profiler can run at a time; the objects of other threads go without
+			profiler = None
+
+	begin = time.perf_counter()
+	try:
+		yield rec
+	finally:
+		elapsed = time.perf_counter() - begin
+		if profiler is not None:
+			profiler.disable()
+			os.makedirs(rec['profile'], exist_ok=True)
+			profiler.dump_stats(os.path.join(rec['profile'], '{}_{}.prof'.format(rec['obj'], stage)))
+
+		stages = rec.setdefault('stages', {})
+		stages[stage] = stages.get(stage, 0) + elapsed
+		_local.rec = previous
+
+
+@contextlib.contextmanager
+def timer(step):
+	'''Adds the time the block takes to the timings of the record of the stage running in this thread, e.g.
+	with timer('find_freq'): ...'''
+
+	begin = time.perf_counter()
+	try:
+		yield
+	finally:
+		rec = getattr(_local, 'rec', None)
+		if rec is not None:
+			timings = rec.setdefault('timings', {})
+			timings[step] = timings.get(step, 0) + time.perf_counter() - begin
+
+
+def count(name, n):
+	'''Adds n to a count (e.g. bytes downloaded, points processed) of the record of the stage running in this
+	thread; outside a stage it is ignored'''
+
+	rec = getattr(_local, 'rec', None)
+	if rec is not None:
+		counts = rec.setdefault('counts', {})
+		counts[name] = counts.get(name, 0) + n
+
+
+def sampled(obj, every, directory):
+	'''The absolute profile directory for an object if it is one of every 'every' objects, otherwise None'''
+
+	if not every or obj % every:
+		return None
+
+	return os.path.abspath(directory)
+
+
+def metrics(rec, status):
+	'''The metrics line of a finished object'''
+
+	return {'obj': int(rec['obj']), 'field': rec.get('field'), 'sid': rec.get('sid'), 'status': status,
+		'time': time.time(), 'stages': rounded(rec.get('stages', {})), 'timings': rounded(rec.get('timings', {})),
+		'counts': rec.get('counts', {})}
+
+
+def rounded(timings):
+	return {name: round(t, 6) for name, t in timings.items()}
+
+
+class Monitor:
+	'''Collects the metrics of the finished objects: appends them as JSON lines to path (if not None) and prints
+	the rolling rate in objects per hour over the last WINDOW objects and the time left for todo objects every
+	'every' objects, along with the steps the time went to. The objects of every status and the time their stages
+	took are totalled too'''
+
+	def __init__(self, path, todo, window=WINDOW, every=PROGRESS_EVERY):
+		self.file = open(path, 'a', encoding='utf-8') if path is not None else None
+		self.todo = todo
+		self.every = every
+		self.done = 0
+		self.finished = collections.deque([time.perf_counter()], maxlen=window + 1)
+		self.totals = collections.Counter()
+		self.statuses = collections.Counter()
+		self.stage_totals = collections.defaultdict(collections.Counter)
+
+	def record(self, rec, status):
+		entry = metrics(rec, status)
+		if self.file is not None:
+			self.file.write(json.dumps(entry) + '\n')
+			self.file.flush()
+
+		self.done += 1
+		self.finished.append(time.perf_counter())
+		self.totals.update(entry['timings'])
+		self.statuses[status] += 1
+		self.stage_totals[status].update(entry['stages'])
+
+		if self.every and self.done % self.every == 0:
+			print(self.progress())
+
+	def rate(self):
+		'''Objects per hour over the last objects'''
+
+		span = self.finished[-1] - self.finished[0]
+
+		return (len(self.finished) - 1) * 3600 / span if span > 0 else float('inf')
+
+	def progress(self):
+		rate = self.rate()
+		left = max(self.todo - self.done, 0)
+		eta = left / rate * 3600 if rate > 0 else float('inf')
+		top = ', '.join('{} {:.1f} s'.format(name, t) for name, t in self.totals.most_common(4))
+
+		return '[{} of {} objects, {:.0f} objects/hour, ETA {}] time in {}'.format(self.done, self.todo, rate,
+											hms(eta), top)
+
+	def close(self):
+		if self.file is not None:
+			self.file.close()
+
+
+def summarize(path):
+	'''Totals of a metrics file: the number of objects and their rate in objects per hour from the first to the
+	last, the objects of every status, and the total time of every stage and step and the total counts'''
+
+	summary = {'objects': 0, 'rate': 0.0, 'statuses': collections.Counter(), 'stages': collections.Counter(),
+			'timings': collections.Counter(), 'counts': collections.Counter()}
+	first = last = None
+
+	with open(path, encoding='utf-8') as f:
+		for line in f:
+			try:
+				entry = json.loads(line)
+			except ValueError:
+				continue
+
+			summary['objects'] += 1
+			summary['statuses'][entry['status']] += 1
+			for name in ('stages', 'timings', 'counts'):
+				summary[name].update(entry.get(name, {}))
+			first = entry['time'] if first is None else min(first, entry['time'])
+			last = entry['time'] if last is None else max(last, entry['time'])
+
+	if summary['objects'] > 1 and last > first:
+		summary['rate'] = (summary['objects'] - 1) * 3600 / (last - first)
+
+	return summary
+
+
+def hms(seconds):
+	if seconds == float('inf'):
+		return 'unknown'
+
+	seconds = int(seconds)
+
+	return '{}:{:02d}:{:02d}'.format(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+if __name__ == '__main__':
+	main()
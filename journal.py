@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import numpy as np
+
+
+# file the outcomes of a run are journaled to, in the directory the program runs in
+DEFAULT_PATH = 'journal.jsonl'
+
+# fields of a record kept in the journal
+LOOKUP_FIELDS = ['proceed', 'vsx_id', 'vsx_type']
+RESULT_FIELDS = ['rejected', 'name', 'period', 'epoch', 'minimum', 'maximum']
+
+
+def main():
+	'''Prints a summary of a journal: how many objects reached each stage'''
+
+	path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH
+	stages = {}
+	for entry in load(path).values():
+		stages[entry['stage']] = stages.get(entry['stage'], 0) + 1
+
+	print('{}: {}'.format(path, ', '.join('{} {}'.format(n, stage) for stage, n in sorted(stages.items()))))
+
+
+class Journal:
+	'''Append-only record of what happened to every object of a run, one JSON line per stage outcome: 'lookup'
+	when the VSX check is done, then 'done' (with the parameters found) or 'failed'. Every line is flushed and
+	synced to disk before the program goes on, so after a crash the journal holds everything finished up to that
+	moment and the next run resumes from it (see load). Every line carries the keys of the lookup and analysis
+	options its decisions were made with (see settings_key), if given. Safe to write from the threads of the
+	pipeline'''
+
+	def __init__(self, path=DEFAULT_PATH, fresh=False, lookup_key=None, analysis_key=None):
+		self.path = path
+		self.keys = {'lookup_key': lookup_key, 'analysis_key': analysis_key}
+		self.lock = threading.Lock()
+		self.file = open(path, 'w' if fresh else 'a', encoding='utf-8')
+
+		# a line cut short by a crash is closed so the next entry starts on a line of its own
+		if self.file.tell() > 0:
+			with open(path, 'rb') as f:
+				f.seek(-1, os.SEEK_END)
+				if f.read(1) != b'\n':
+					self.file.write('\n')
+
+	def write(self, rec, stage, fields=(), **extra):
+		'''Appends one line for the object of the record'''
+
+		entry = {'obj': int(rec['obj']), 'stage': stage}
+		entry.update((f, rec[f]) for f in ('field', 'sid') + tuple(fields) if f in rec)
+		entry.update(extra)
+		entry.update((name, key) for name, key in self.keys.items() if key is not None)
+		line = json.dumps(entry, default=to_json) + '\n'
+
+		with self.lock:
+			self.file.write(line)
+			self.file.flush()
+			os.fsync(self.file.fileno())
+
+	def lookup(self, rec):
+		self.write(rec, 'lookup', LOOKUP_FIELDS)
+
+	def done(self, rec, status):
+		self.write(rec, 'done', LOOKUP_FIELDS + RESULT_FIELDS, status=status)
+
+	def failed(self, rec, stage, error):
+		self.write(rec, 'failed', LOOKUP_FIELDS, failed_in=stage, error=repr(error))
+
+	def close(self):
+		self.file.close()
+
+
+def to_json(value):
+	'''Converts the NumPy scalars of a record for json'''
+
+	if isinstance(value, np.generic):
+		return value.item()
+
+	raise TypeError('cannot journal {!r}'.format(value))
+
+
+def settings_key(options):
+	'''Short hash of the options a stage outcome depends on (distance of a VSX match, triage thresholds, period
+	search arguments...), so a run only resumes from decisions made with the same options'''
+
+	text = json.dumps(options, sort_keys=True, default=str)
+
+	return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def load(path=DEFAULT_PATH, lookup_key=None, analysis_key=None, stale=None):
+	'''Reads a journal and returns the latest state of every object by its position in the query, with the fields
+	of all its lines merged. A last line cut short by a crash is ignored. If the keys are given (see settings_key),
+	lines written with other lookup options are ignored too, and outcomes of the analysis with other analysis
+	options only keep the VSX check they record, so the object is analyzed again without being looked up again.
+	The positions of the objects left to do again because of such lines are added to the set stale, if given'''
+
+	objects = {}
+	if not os.path.exists(path):
+		return objects
+
+	with open(path, encoding='utf-8') as f:
+		for line in f:
+			try:
+				entry = json.loads(line)
+			except ValueError:
+				continue
+
+			if lookup_key is not None and entry.get('lookup_key') != lookup_key:
+				if stale is not None:
+					stale.add(entry['obj'])
+				continue
+
+			if analysis_key is not None and entry['stage'] != 'lookup' and entry.get('analysis_key') != analysis_key:
+				if stale is not None:
+					stale.add(entry['obj'])
+				if 'proceed' not in entry:
+					continue
+				entry = {f: entry[f] for f in ('obj', 'field', 'sid', 'lookup_key') + tuple(LOOKUP_FIELDS) if f in entry}
+				entry['stage'] = 'lookup'
+				objects.pop(entry['obj'], None)
+
+			objects.setdefault(entry['obj'], {}).update(entry)
+
+	# objects finished again with these options since are not stale
+	if stale is not None:
+		stale.difference_update(obj for obj, state in objects.items() if state['stage'] == 'done')
+
+	return objects
+
+
+def resume(states, df):
+	'''The journaled states (see load) of the objects of the query dataframe df, or of a batch of it. Entries whose
+	field and star id do not match the object at that position (i.e., from another query file) are left out'''
+
+	matching = {}
+	for obj in df.index:
+		entry = states.get(obj)
+		if entry is None:
+			continue
+
+		row = df.loc[obj]
+		if entry.get('field') != str(row['Field']) or entry.get('sid') != str(row['StarID']):
+			continue
+
+		matching[obj] = entry
+
+	return matching
+
+
+if __name__ == '__main__':
+	main()
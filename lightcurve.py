@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+
+import pickle
+import numpy as np
+import pandas as pd
+
+
+# columns of the OGLE photometry table and the frame grades that are kept for analysis
+COLUMNS = ['HJD', 'mag', 'mag_err', 'photometry_flag', 'frame_grade']
+GRADES = ['A', 'B', 'C', 'D', 'E', 'F']
+GOOD_GRADES = ['A', 'B', 'C']
+
+# times are kept as days since this HJD, the usual OGLE convention (HJD - 2450000)
+REFERENCE_HJD = 2450000.0
+
+# largest phase error (in cycles) accepted from computing a periodogram in float32
+FLOAT32_TOLERANCE = 1e-3
+
+
+def main():
+	'''main function for testing: compares the memory used by the test light curve as a dataframe and as a
+	LightCurve'''
+
+	df = pd.read_csv('./test_folder/test_dat.csv', index_col=0)
+	lc = LightCurve.from_frame(df)
+	print(lc)
+	print('dataframe  {:6.1f} bytes per epoch'.format(df.memory_usage(deep=True).sum() / len(df)))
+	print('LightCurve {:6.1f} bytes per epoch'.format(lc.nbytes / len(lc)))
+	print('pickled    {:6.1f} / {:6.1f} bytes per epoch'.format(len(pickle.dumps(df)) / len(df),
+								len(pickle.dumps(lc)) / len(lc)))
+
+
+class LightCurve:
+	'''OGLE photometry of one star held as compact typed arrays: the times as float64 days since a reference HJD
+	(exact for the 5 decimal OGLE times, and small enough to fold and search without losing precision), the
+	magnitudes and errors as float32 (OGLE gives 3 decimals), and the photometry flag and frame grade as small
+	integer codes. Columns are read with lc['name'] like a dataframe; lc['HJD'] adds the reference back'''
+
+	__slots__ = ('reference', 'time', 'mag', 'mag_err', 'flag', 'grade', 'index')
+
+	def __init__(self, time, mag, mag_err=None, flag=None, grade=None, index=None, reference=REFERENCE_HJD):
+		n = len(time)
+		self.reference = float(reference)
+		self.time = np.asarray(time, dtype=np.float64)
+		self.mag = np.asarray(mag, dtype=np.float32)
+		self.mag_err = np.asarray(mag_err if mag_err is not None else np.zeros(n), dtype=np.float32)
+		self.flag = np.asarray(flag if flag is not None else np.zeros(n), dtype=flag_dtype(flag))
+		self.grade = np.asarray(grade if grade is not None else np.zeros(n), dtype=np.uint8)
+		self.index = np.asarray(index if index is not None else np.arange(n), dtype=np.int32)
+
+	@classmethod
+	def from_hjd(cls, hjd, mag, mag_err=None, flag=None, grades=None, index=None, reference=REFERENCE_HJD):
+		'''Builds a light curve from absolute HJDs and grade letters'''
+
+		codes = pd.Categorical(grades, categories=GRADES).codes if grades is not None else None
+
+		return cls(np.asarray(hjd, dtype=np.float64) - reference, mag, mag_err, flag, codes, index, reference)
+
+	@classmethod
+	def from_frame(cls, df, reference=REFERENCE_HJD):
+		'''Builds a light curve from a photometry dataframe like RAW_DATA.csv; missing optional columns get
+		defaults'''
+
+		return cls.from_hjd(df['HJD'].to_numpy(), df['mag'].to_numpy(), df.get('mag_err'), df.get('photometry_flag'),
+					df.get('frame_grade'), df.index.to_numpy(), reference)
+
+	@classmethod
+	def empty(cls):
+		'''A light curve without points'''
+
+		return cls(np.zeros(0), np.zeros(0))
+
+	def __len__(self):
+		return len(self.time)
+
+	def __repr__(self):
+		return 'LightCurve({} points, HJD {:.1f} + {:.1f} to {:.1f})'.format(len(self), self.reference,
+								self.time.min() if len(self) else 0, self.time.max() if len(self) else 0)
+
+	def __getitem__(self, column):
+		if column == 'HJD':
+			return self.reference + self.time
+		if column == 'mag':
+			return self.mag
+		if column == 'mag_err':
+			return self.mag_err
+		if column == 'photometry_flag':
+			return self.flag
+		if column == 'frame_grade':
+			return pd.Categorical.from_codes(self.grade, categories=GRADES)
+
+		raise KeyError(column)
+
+	@property
+	def is_empty(self):
+		return len(self.time) == 0
+
+	@property
+	def nbytes(self):
+		'''Bytes held by the arrays'''
+
+		return sum(getattr(self, name).nbytes for name in ('time', 'mag', 'mag_err', 'flag', 'grade', 'index'))
+
+	def select(self, mask):
+		'''The light curve of the points where mask is True (or of the given positions)'''
+
+		return LightCurve(self.time[mask], self.mag[mask], self.mag_err[mask], self.flag[mask], self.grade[mask],
+				self.index[mask], self.reference)
+
+	def good(self):
+		'''The light curve of the points graded A, B or C'''
+
+		return self.select(self.grade < len(GOOD_GRADES))
+
+	def to_frame(self):
+		'''The photometry as a dataframe with the OGLE columns, for writing to csv'''
+
+		return pd.DataFrame({column: self[column] for column in COLUMNS}, index=self.index)
+
+
+def flag_dtype(flag):
+	'''Smallest unsigned integer type that holds the photometry flags'''
+
+	if flag is None or len(flag) == 0:
+		return np.uint8
+
+	return np.min_scalar_type(max(int(np.max(flag)), 0))
+
+
+def compute_dtype(span, max_frequency, tolerance=FLOAT32_TOLERANCE):
+	'''Precision for a periodogram of a light curve covering span days up to max_frequency: float32 when its
+	rounding of the phases (about span * max_frequency cycles) stays within tolerance cycles, otherwise float64'''
+
+	if span * max_frequency * np.finfo(np.float32).eps < tolerance:
+		return np.float32
+
+	return np.float64
+
+
+if __name__ == '__main__':
+	main()
@@ -7,9 +7,11 @@
 from astropy.timeseries import LombScargle
 
 import matplotlib.pyplot as plt
-import astropy.units as u
 import numpy as np
-import pandas as pd
+import folded
+import periods
+import render
+from lightcurve import LightCurve
 
 
 def main():
@@ -19,21 +21,23 @@ def main():
 	rand = np.random.RandomState(42)
 	t = 100 * rand.rand(100)
 	y = np.sin(2 * np.pi * t) + 0.1 * rand.randn(100)
-	col_1 = pd.DataFrame(t)
-	col_2 = pd.DataFrame(y)
-	dt = pd.concat([col_1, col_2], axis=1)
-	dt.columns = ['HJD', 'mag']
-	find_freq(dt, n)
+	find_freq(LightCurve(t, y), n, '2')
 
 
-def find_freq(dt, n, automatic):
+def find_freq(dt, n, automatic, ls_args=None, plot=None):
 	'''Uses astropy's LombScargle method to search for frequency with the highest power and then visually check
-	if it produces a viable phase plot.  For more see http://docs.astropy.org/en/stable/stats/lombscargle.html'''
+	if it produces a viable phase plot.  For more see http://docs.astropy.org/en/stable/stats/lombscargle.html
+	In automatic mode the arguments in ls_args (method, nterms, nyquist, min_freq, max_freq, samples_per_peak)
+	replace the defaults, a frequency in ls_args (e.g. from field_lombscargle) is used without a search, and
+	search='topk' uses search_peaks instead of the dense grid. engine (see periods.ENGINES) scores the same grid
+	with Box Least Squares, phase dispersion or conditional entropy instead of Lomb-Scargle. dt is a lightcurve.LightCurve; returns the frequency
+	and the light curve folded at it (a folded.FoldedCurve). In automatic mode the periodogram and the folded curve
+	are handed to plot (see render.emitter) or else drawn by render.draw'''
 
-	t = dt['HJD']
-	t_days = t * u.day
-	y = dt['mag']
-	y_mags = y * u.mag
+	# days since the light curve's reference HJD keep the time values small; the magnitudes are stored in float32
+	# but the periodogram is computed in float64
+	t = dt.time
+	y = dt.mag.astype(np.float64)
 
 	while True:
 		print('########################################')
@@ -47,6 +51,29 @@ def find_freq(dt, n, automatic):
 		nyq = 5
 		spp = 5
 		mod = 0
+		engine = 'lombscargle'
+		min_freq = max_freq = None
+		fine_spp = 20
+
+		# arguments configured up front for unattended runs
+		if automatic == '1' and ls_args:
+			engine = ls_args.get('engine') or engine
+			method = ls_args.get('method') or method
+			numterms = ls_args.get('nterms') or numterms
+			spp = ls_args.get('samples_per_peak') or spp
+			fine_spp = ls_args.get('samples_per_peak') or fine_spp
+			if ls_args.get('min_freq') is not None and ls_args.get('max_freq') is not None:
+				min_freq = ls_args['min_freq']
+				max_freq = ls_args['max_freq']
+				mod = 1
+			elif ls_args.get('nyquist') is not None:
+				nyq = ls_args['nyquist']
+				mod = 2
+			if ls_args.get('search') == 'topk':
+				mod = 4
+			if ls_args.get('frequency') is not None:
+				best_frequency = ls_args['frequency']
+				mod = 3
 
 		while True:
 			if automatic == '1':
@@ -62,6 +89,8 @@ def find_freq(dt, n, automatic):
 				print('3 = Specify min & max frequency,')
 				print('4 = Specify Nyquist factor')
 				print('5 = Specify the frequency')
+				print('6 = Coarse-to-fine search of the top peaks with a check of P, 2P and P/2')
+				print('7 = Specify the period search engine')
 				print('')
 				choice2 = input('What is your choice? ')
 
@@ -82,6 +111,7 @@ def find_freq(dt, n, automatic):
 					min_freq = float(input('What is the minimum frequency? ').strip())
 					max_freq = float(input('What is the maximum frequency? ').strip())
 					spp = float(input('How many samples per peak? ').strip())
+					fine_spp = spp
 					mod = 1
 
 				# Nyquist
@@ -96,63 +126,156 @@ def find_freq(dt, n, automatic):
 					mod = 3
 					break
 
+				# coarse-to-fine top-K search
+				if choice2.strip() == '6':
+					mod = 4
+					break
+
+				# Box Least Squares, phase dispersion or conditional entropy for the dense grid
+				if choice2.strip() == '7':
+					engine = input("What engine do you want to use? ('lombscargle', 'bls' for Box Least Squares, "
+						"'pdm' for phase dispersion or 'ce' for conditional entropy) ").strip().lower()
+					if engine not in periods.ENGINES:
+						print('Unknown engine; using lombscargle')
+						engine = 'lombscargle'
+
 			else:
-				# frequency, power = LombScargle(t_days, y_mags, nterms=2).autopower(method='chi2')
+				# frequency, power = LombScargle(t, y, nterms=2).autopower(method='chi2')
 				# power_sorted = power.argsort()
 				# best_frequency = frequency[power_sorted[-2]]
 				# best_frequency = frequency[np.argmax(power)]  # most likely frequency is where the power is highest
 				break
 
-		if mod == 0:
-			frequency, power = LombScargle(t_days, y_mags, nterms=numterms).autopower(method=method)
+		# a given frequency and the top-K search are scored with Lomb-Scargle whatever the engine, and their plot is
+		# labelled so
+		if mod in (3, 4):
+			engine = 'lombscargle'
+
+		# the eclipse engines score the grid Lomb-Scargle would use (see periods.grid)
+		if engine != 'lombscargle' and mod in (0, 1, 2):
+			frequency = periods.grid(t, min_freq if mod == 1 else None, max_freq if mod == 1 else None,
+						spp if mod == 1 else 5, nyq if mod == 2 else 5)
+			best_frequency, power = periods.search(engine, t, y, frequency, dt.mag_err)
 
-		if mod == 1:
-			frequency, power = LombScargle(t_days, y_mags, nterms=numterms).autopower(method=method,
+		elif mod == 0:
+			frequency, power = LombScargle(t, y, nterms=numterms).autopower(method=method)
+
+		elif mod == 1:
+			frequency, power = LombScargle(t, y, nterms=numterms).autopower(method=method,
 												minimum_frequency=min_freq,
 												maximum_frequency = max_freq,
 												samples_per_peak = spp)
 
-		if mod == 2:
-			frequency, power = LombScargle(t_days, y_mags).autopower(nyquist_factor=nyq)
+		elif mod == 2:
+			frequency, power = LombScargle(t, y).autopower(nyquist_factor=nyq)
 
 		if mod == 3:
-			frequency, power = LombScargle(t_days, y_mags).power(best_frequency)
+			frequency = np.atleast_1d(best_frequency)
+			power = LombScargle(t, y).power(frequency)
+
+		if mod == 4:
+			best_frequency, frequency, power = search_peaks(t, y, top=(ls_args or {}).get('top') or 5, fine_spp=fine_spp,
+									nyquist=nyq, min_freq=min_freq, max_freq=max_freq)
 
 		# power_sorted = power.argsort()
 		# best_frequency = frequency[power_sorted[-1]]
-		best_frequency = frequency[np.argmax(power)]  # the most likely frequency is where the power is highest
-		plt.figure(1)
+		if mod != 4 and engine == 'lombscargle':
+			best_frequency = frequency[np.argmax(power)]  # the most likely frequency is where the power is highest
+
+		# fold the light curve at the frequency to get the phase values
+		folded_curve = folded.FoldedCurve(dt, best_frequency)
+		figname = n + 'Periodiagram'
+
+		if automatic == '1':
+			(plot or render.draw)(render.job('periodogram', figname + '.png', frequency, power, best=best_frequency,
+							phase=folded_curve['Phase'], mag=folded_curve['mag'],
+							title='Frequency = ' + str(best_frequency), ylabel=periods.LABELS[engine]))
+			break
+
+		fig = plt.figure()
 		plt.subplot(211)
 		plt.plot(frequency, power, color='black')
 		plt.axvline(x=best_frequency, color='blue', linestyle='dashed')  # plot vertical line at best frequency
 		plt.xlabel('Frequency')
-		plt.ylabel('Lomb-Scargle Power')
+		plt.ylabel(periods.LABELS[engine])
 		plt.title('Frequency = ' + str(best_frequency))
-		figname = n + 'Periodiagram'
 		plt.savefig(figname)
 
-		# create a new column in the dataframe to hold the phase values generated from the frequency
-		dt.loc[:, 'Phase'] = dt.loc[:, 'HJD'].apply(lambda x: x*best_frequency%1)
-
 		plt.subplot(212)
-		plt.scatter(dt['Phase'], dt['mag'], color='black', s=5)  # 's' is for marker size
+		plt.scatter(folded_curve['Phase'], folded_curve['mag'], color='black', s=5)  # 's' is for marker size
 		plt.gca().invert_yaxis()
 		plt.ylabel('Ic-mag')
 		plt.xlabel('Phase')
 
-		if automatic == '1':
-			satisf = '1'
-
-		else:
-			plt.show()
-			print('')
-			satisf = input('Is the phase plot satisfactory? [1]=Yes, [any other key]=No ').strip()
-			print('')
+		plt.show()
+		plt.close(fig)
+		print('')
+		satisf = input('Is the phase plot satisfactory? [1]=Yes, [any other key]=No ').strip()
+		print('')
 
 		if satisf == '1':
 			break
 
-	return best_frequency, dt
+	return best_frequency, folded_curve
+
+
+def search_peaks(t, y, top=5, coarse_spp=1, fine_spp=20, nyquist=5, bins=50, min_freq=None, max_freq=None):
+	'''Coarse-to-fine period search: a coarse Lomb-Scargle grid (between min_freq and max_freq, if given, or up to
+	the nyquist factor), the top peaks of it refined on fine local grids, and then the periods P, 2P and P/2 of each
+	peak scored by phase dispersion of the folded curve. Eclipsing binaries often peak at half their true period, so
+	2P is preferred over P when the two fold about equally well. Returns the best frequency and the coarse grid and
+	power (for plotting)'''
+
+	ls = LombScargle(t, y)
+	frequency, power = ls.autopower(samples_per_peak=coarse_spp, nyquist_factor=nyquist, minimum_frequency=min_freq,
+					maximum_frequency=max_freq)
+	step = frequency[1] - frequency[0] if len(frequency) > 1 else frequency[0]
+
+	# local maxima of the coarse periodogram, highest first
+	inner = np.r_[False, (power[1:-1] >= power[:-2]) & (power[1:-1] >= power[2:]), False]
+	if len(power) > 1:
+		inner[0] = power[0] >= power[1]
+		inner[-1] = power[-1] >= power[-2]
+	peaks = np.flatnonzero(inner)
+	peaks = peaks[np.argsort(power[peaks])[::-1][:top]]
+
+	candidates = []
+	for f in frequency[peaks]:
+		fine = np.linspace(max(f - step, step / 10), f + step, 2 * int(fine_spp / coarse_spp) + 1)
+		best = fine[np.argmax(ls.power(fine))]
+		candidates.extend([best, best / 2, best * 2])
+
+	candidates = np.array(candidates)
+	theta = np.array([phase_dispersion(t, y, f, bins) for f in candidates])
+
+	# prefer the longer period (half the frequency) when it folds within 5% as well as the winner
+	choice = np.argmin(theta)
+	longer = np.flatnonzero(np.isclose(candidates, candidates[choice] / 2, rtol=1e-9))
+	if len(longer) and theta[longer[0]] <= 1.05 * theta[choice]:
+		choice = longer[0]
+
+	return candidates[choice], frequency, power
+
+
+def phase_dispersion(t, y, frequency, bins=50, covers=2):
+	'''Phase dispersion minimization statistic (theta) of the curve folded at the frequency: the pooled variance
+	within phase bins divided by the total variance, averaged over several bin sets shifted by a fraction of a bin
+	so a narrow eclipse split by a bin edge is not penalized. Lower is a better fold'''
+
+	phase = (t * frequency) % 1
+	var = np.var(y, ddof=1)
+	theta = 0.0
+
+	for c in range(covers):
+		idx = ((phase * bins + c / covers) % bins).astype(int)
+		n = np.bincount(idx, minlength=bins)
+		s1 = np.bincount(idx, weights=y, minlength=bins)
+		s2 = np.bincount(idx, weights=y * y, minlength=bins)
+
+		used = n > 0
+		theta += (s2[used] - s1[used] ** 2 / n[used]).sum() / max(len(y) - used.sum(), 1) / var
+
+	return theta / covers
 
 
 if __name__ == '__main__':
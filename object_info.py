@@ -1,10 +1,11 @@
 #!/usr/bin/python3
 
 import os
+import numpy as np
 import pandas as pd
 from sys import platform
-import requests
-from bs4 import BeautifulSoup
+import cache
+from lightcurve import LightCurve, COLUMNS as PHOT_COLUMNS
 
 
 def main():
@@ -18,13 +19,18 @@ def main():
 	get_data_from_web(nme)
 
 
-def set_name(field, star_id):
-	'''store basic information about the object of interest'''
+def set_name(field, star_id, url_id=None, url_template=None):
+	'''store basic information about the object of interest. The url is either given (e.g. from a url file), built
+	from a template with {field} and {starid} placeholders, or pasted in by the user'''
     
 	path_id = 'OGLEII_' + field + '_' + star_id
 
-	# New way of setting URL must be done manually
-	url_id = input("Copy and paste the appropriate URL here: ")
+	# New way of setting URL must be done manually, unless it was already looked up in a url file or has a template
+	if url_id is None and url_template is not None:
+		url_id = url_template.format(field=field, starid=star_id)
+
+	if url_id is None:
+		url_id = input("Copy and paste the appropriate URL here: ")
 
 	# Old way of setting the URL no longer works due to OGLE database encryption
 	# url_id = 'field={}&starid={}&db=DIA&points=good'.format(field, star_id)
@@ -55,8 +61,20 @@ def make_folder(path_id):
 	return new_df, newpath
 
 
-def get_data_from_web(the_name):
-	'''Takes the object name and returns a .dat file with photometry data from OGLE database as a dataframe'''
+def read_url_file(url_file):
+	'''Reads a csv file with Field, StarID and url columns and returns a dictionary of the urls by (field, star id)'''
+
+	urls = pd.read_csv(url_file, dtype=str)
+
+	return dict(zip(zip(urls['Field'], urls['StarID']), urls['url']))
+
+
+def get_data_from_web(the_name, raw_file='RAW_DATA.csv'):
+	'''Takes the object name and returns the photometry data from OGLE database as a lightcurve.LightCurve (empty if
+	there is none). The data is also written to raw_file unless it is None'''
+
+	# the network modules are only loaded by the lookup stage, not by the analysis processes that use make_folder
+	import services
 
 	while True:    
 		# NEW method
@@ -67,37 +85,54 @@ def get_data_from_web(the_name):
 		# url = base + the_name
 
 		print('The url is ' + url)
-		r = requests.get(url)
-		html_doc = r.text
-		soup = BeautifulSoup(html_doc, 'lxml')
-    
-		try:
-			table = soup.find('pre').contents[0]
+		html_doc = cache.cached_text('ogle', lambda: services.get_text('ogle', url), url=url)
+		lc = parse_page(html_doc)
 
-		except AttributeError:
+		if lc is None:
 			print('***No good DIA photometry for this object***')
 			print('')
 			print('MOVING TO NEXT OBJECT...')
-			df = pd.DataFrame(columns=['1', '2', '3'], index=range(0, 1))
+			lc = LightCurve.empty()
 			break
 
-		long_str = table.split()
-		col = ['HJD', 'mag', 'mag_err', 'photometry_flag', 'frame_grade']
-		total = len(long_str)
-		rows = int(total / 5)
-		df = pd.DataFrame(columns=col, index=range(0, rows))    
-
-		for row in range(0, rows):
-			for i in range(0, 5):
-				df.iloc[row][i] = long_str[row * 5 + i]
-
-		df = df.apply(pd.to_numeric, errors='ignore')
-		df = df.loc[df['frame_grade'].isin(['A', 'B', 'C'])]
-		df.to_csv('RAW_DATA.csv')
+		if raw_file is not None:
+			lc.to_frame().to_csv(raw_file)
         
 		break
 
-	return df
+	return lc
+
+
+def parse_page(html_doc):
+	'''Finds the <pre> block of an OGLE photometry page and returns its good points as a LightCurve, or None if
+	the page has no photometry'''
+
+	from bs4 import BeautifulSoup
+
+	soup = BeautifulSoup(html_doc, 'lxml')
+
+	try:
+		table = soup.find('pre').contents[0]
+	except AttributeError:
+		return None
+
+	return parse_photometry(table)
+
+
+def parse_photometry(table):
+	'''Converts the text of the OGLE <pre> block into a LightCurve in a single pass and keeps only those data points
+	graded as A, B, or C'''
+
+	# every observation is 5 whitespace separated fields, so the flat list of fields reshapes into rows
+	fields = np.array(table.split())
+	rows = len(fields) // len(PHOT_COLUMNS)
+	fields = fields[:rows * len(PHOT_COLUMNS)].reshape(rows, len(PHOT_COLUMNS))
+
+	lc = LightCurve.from_hjd(fields[:, 0].astype(np.float64), fields[:, 1].astype(np.float64),
+				fields[:, 2].astype(np.float64), fields[:, 3].astype(np.int64), fields[:, 4])
+
+	# select only those data points graded as A, B, or C and exclude D, E, and F
+	return lc.good()
 
 
 if __name__ == '__main__':
@@ -2,6 +2,7 @@
 
 import matplotlib.pyplot as plt
 from matplotlib.ticker import FormatStrFormatter
+import numpy as np
 import pandas as pd
 import os
 
@@ -18,23 +19,24 @@ def main():
 def find_min(dtn, fully_auto):
 	'''Finds and returns the average value near eclipse minima to control for measurement error'''
 
-	dtn = dtn.loc[dtn.loc[:, 'Phase'] < 0.01]
-	dtn = dtn.loc[dtn.loc[:, 'Phase'] > -0.01]
-	avg = round(dtn['mag'].mean(), 2)
-
-	fig, ax = plt.subplots()
-	ax.yaxis.set_major_formatter(FormatStrFormatter('%0.2f'))
-	plt.scatter(dtn['Phase'], dtn['mag'])
-	plt.gca().invert_yaxis()
-	plt.ylabel('Ic-mag')
-	plt.xlabel('Phase')
-	plt.title('Red line should appear at average of data points')
-	plt.axhline(y=avg, color='red')  # plot horizontal line at the average near minima
-
-	plt.grid()
+	phase, mag = np.asarray(dtn['Phase']), np.asarray(dtn['mag'], dtype=np.float64)
+	near = (phase < 0.01) & (phase > -0.01)
+	avg = round(mag[near].mean(), 2)
 
+	# the check plot is only for a user; automatic mode never shows or saves it
 	if fully_auto != '1':
+		fig, ax = plt.subplots()
+		ax.yaxis.set_major_formatter(FormatStrFormatter('%0.2f'))
+		plt.scatter(phase[near], mag[near])
+		plt.gca().invert_yaxis()
+		plt.ylabel('Ic-mag')
+		plt.xlabel('Phase')
+		plt.title('Red line should appear at average of data points')
+		plt.axhline(y=avg, color='red')  # plot horizontal line at the average near minima
+
+		plt.grid()
 		plt.show()
+		plt.close(fig)
 
 	return avg
 
@@ -42,20 +44,21 @@ def find_min(dtn, fully_auto):
 def find_max(dfx, full_auto):
 	'''finds the max'''
 
-	dfx = dfx.loc[dfx.loc[:, 'Phase'] < 0.26]
-	dfx = dfx.loc[dfx.loc[:, 'Phase'] > 0.24]
-	av = round(dfx['mag'].mean(), 2)
-
-	plt.scatter(dfx['Phase'], dfx['mag'])
-	plt.gca().invert_yaxis()
-	plt.ylabel('Ic-mag')
-	plt.xlabel('Phase')
-	plt.title('Red line should appear at average of data points')
-	plt.axhline(y=av, color='red')  # plot horizontal line at the average near minima
-	plt.grid()
+	phase, mag = np.asarray(dfx['Phase']), np.asarray(dfx['mag'], dtype=np.float64)
+	near = (phase < 0.26) & (phase > 0.24)
+	av = round(mag[near].mean(), 2)
 
 	if full_auto != '1':
+		fig = plt.figure()
+		plt.scatter(phase[near], mag[near])
+		plt.gca().invert_yaxis()
+		plt.ylabel('Ic-mag')
+		plt.xlabel('Phase')
+		plt.title('Red line should appear at average of data points')
+		plt.axhline(y=av, color='red')  # plot horizontal line at the average near minima
+		plt.grid()
 		plt.show()
+		plt.close(fig)
 
 	return av
 
@@ -67,11 +70,7 @@ def final_csv(frequency, epc, adjustment, phased_df, choice, nme, fin_df):
 	epc = round(epc + period * adjustment, 3)
 	minimum = find_min(phased_df, choice)
 	maximum = find_max(phased_df, choice)
-	fin_df.iloc[0][0] = nme
-	fin_df.iloc[0][1] = period
-	fin_df.iloc[0][2] = epc
-	fin_df.iloc[0][3] = minimum
-	fin_df.iloc[0][4] = maximum
+	fin_df.iloc[0] = [nme, period, epc, minimum, maximum]
 	fin_df.to_csv(nme + '_Parameters.csv')
 
 	return period
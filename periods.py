@@ -0,0 +1,229 @@
+#!/usr/bin/python3
+
+import sys
+import time
+import numpy as np
+
+
+# period search engines for eclipses, besides the Lomb-Scargle periodogram of lombscargle.find_freq: Box Least
+# Squares, phase dispersion minimization and conditional entropy. Every engine scores a grid of frequencies with a
+# power that is higher for a better fold
+ENGINES = ['lombscargle', 'bls', 'pdm', 'ce']
+LABELS = {'lombscargle': 'Lomb-Scargle Power', 'bls': 'BLS Power', 'pdm': 'PDM 1 - theta',
+	'ce': 'Conditional Entropy Power'}
+
+# the grid starts at this many cycles over the baseline: folds of fewer cycles line up the observing seasons and
+# their gaps, which every engine here mistakes for structure
+MIN_CYCLES = 3
+
+# the frequencies are scored in chunks of about this many folded points (frequencies times observations), so the
+# memory of a search stays near CELLS * 8 bytes however fine the grid
+CELLS = 1 << 21
+
+# phase bins of the box search and the eclipse durations (in phase) it tries, see bls
+BLS_BINS = 200
+BLS_DURATIONS = (0.01, 0.02, 0.04, 0.08, 0.12)
+
+# phase and magnitude bins of the conditional entropy (Graham et al. 2013 used 10 and 5; narrow eclipses need more
+# phase bins), see conditional_entropy
+CE_PHASE_BINS = 20
+CE_MAG_BINS = 5
+
+
+def main():
+	'''main function for testing: searches synthetic binaries of every type with every engine, e.g.
+	python3 periods.py 1000'''
+
+	import synthetic
+
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+	for kind in synthetic.KINDS:
+		lc, params = synthetic.light_curve(kind, n, seed=1)
+		lc = lc.good()
+		frequency = grid(lc.time, samples_per_peak=10, nyquist=5)
+		for engine in ENGINES[1:]:
+			begin = time.perf_counter()
+			best, _ = search(engine, lc.time, lc.mag, frequency, lc.mag_err)
+			print('{} {:<4} true period {:.4f} found {:.4f} in {:.2f} s ({} frequencies)'.format(kind, engine,
+				params['period'], 1 / best, time.perf_counter() - begin, len(frequency)))
+
+
+def grid(t, min_freq=None, max_freq=None, samples_per_peak=5, nyquist=5):
+	'''A frequency grid the way astropy's LombScargle.autofrequency makes it: steps of 1 / (samples_per_peak *
+	baseline) up to nyquist times the average Nyquist frequency (or max_freq), but from MIN_CYCLES cycles over the
+	baseline (or min_freq) instead of half a step'''
+
+	baseline = np.ptp(t)
+	step = 1 / (samples_per_peak * baseline)
+	low = MIN_CYCLES / baseline if min_freq is None else min_freq
+	high = nyquist * 0.5 * len(t) / baseline if max_freq is None else max_freq
+
+	return low + step * np.arange(int(np.ceil((high - low) / step)) + 1)
+
+
+def chunks(frequency, n, cells=CELLS):
+	'''Yields the slices of the frequency grid that fold about cells points of a curve of n points at a time'''
+
+	size = max(cells // max(n, 1), 1)
+	for start in range(0, len(frequency), size):
+		yield slice(start, start + size)
+
+
+def folded_bins(t, frequency, bins):
+	'''The phase bin of every point folded at every frequency, numbered per frequency row so one bincount counts
+	them all: an array of len(frequency) by len(t)'''
+
+	phase = np.outer(frequency, t)
+	phase -= np.floor(phase)
+	idx = (phase * bins).astype(np.int64)
+	np.minimum(idx, bins - 1, out=idx)
+	idx += (np.arange(len(frequency)) * bins)[:, None]
+
+	return idx
+
+
+def binned(idx, rows, bins, weights=None):
+	'''Sums of the weights (or counts) of the points in every phase bin of every row, rows by bins'''
+
+	return np.bincount(idx.ravel(), weights=None if weights is None else np.broadcast_to(weights, idx.shape).ravel(),
+			minlength=rows * bins).reshape(rows, bins)
+
+
+def bls(t, y, frequency, err=None, durations=BLS_DURATIONS, bins=BLS_BINS, cells=CELLS):
+	'''Box Least Squares (Kovacs et al. 2002) on phase bins: the signal residue s^2 / (r (1 - r)) of the best box of
+	each duration, where r is the weight and s the weighted magnitude excess of the points in the box, as a fraction
+	of the weighted variance. Only boxes fainter than the mean count, so the power finds eclipses and not bright
+	outliers'''
+
+	w = np.ones_like(y) if err is None else 1 / np.maximum(err, 1e-3) ** 2
+	w = w / w.sum()
+	dy = (y - np.sum(w * y)) * w
+	total = np.sum(dy * (y - np.sum(w * y))) or 1
+	widths = sorted({max(int(round(d * bins)), 1) for d in durations})
+	power = np.zeros(len(frequency))
+
+	for part in chunks(frequency, len(t), cells):
+		rows = len(frequency[part])
+		idx = folded_bins(t, frequency[part], bins)
+		r = binned(idx, rows, bins, w)
+		s = binned(idx, rows, bins, dy)
+		del idx
+
+		# sums over every box of width bins starting in every bin, wrapping around phase 1
+		cr = np.concatenate([np.zeros((rows, 1)), np.cumsum(np.concatenate([r, r[:, :widths[-1]]], axis=1), axis=1)],
+					axis=1)
+		cs = np.concatenate([np.zeros((rows, 1)), np.cumsum(np.concatenate([s, s[:, :widths[-1]]], axis=1), axis=1)],
+					axis=1)
+		best = np.zeros(rows)
+		for width in widths:
+			box_r = cr[:, width:width + bins] - cr[:, :bins]
+			box_s = cs[:, width:width + bins] - cs[:, :bins]
+			inside = (box_s > 0) & (box_r > 0) & (box_r < 1)
+			residue = np.where(inside, box_s ** 2 / np.where(inside, box_r * (1 - box_r), 1), 0)
+			np.maximum(best, residue.max(axis=1), out=best)
+		power[part] = best / total
+
+	return power
+
+
+def pdm(t, y, frequency, err=None, bins=50, covers=2, cells=CELLS):
+	'''Phase dispersion minimization (Stellingwerf 1978) over the grid, the same statistic as
+	lombscargle.phase_dispersion: returns 1 - theta, where theta is the pooled variance within phase bins over the
+	total variance averaged over covers bin sets shifted by a fraction of a bin'''
+
+	var = np.var(y, ddof=1)
+	power = np.zeros(len(frequency))
+
+	for part in chunks(frequency, len(t), cells):
+		rows = len(frequency[part])
+		phase = np.outer(frequency[part], t)
+		phase -= np.floor(phase)
+		theta = np.zeros(rows)
+		for c in range(covers):
+			idx = ((phase * bins + c / covers) % bins).astype(np.int64)
+			idx += (np.arange(rows) * bins)[:, None]
+			n = binned(idx, rows, bins)
+			s1 = binned(idx, rows, bins, y)
+			s2 = binned(idx, rows, bins, y * y)
+			used = n > 0
+			within = np.where(used, s2 - s1 ** 2 / np.where(used, n, 1), 0).sum(axis=1)
+			theta += within / np.maximum(len(y) - used.sum(axis=1), 1) / var
+		power[part] = 1 - theta / covers
+
+	return power
+
+
+def conditional_entropy(t, y, frequency, err=None, phase_bins=CE_PHASE_BINS, mag_bins=CE_MAG_BINS, cells=CELLS):
+	'''Conditional entropy (Graham et al. 2013) of the magnitude given the phase of the folded curve, with the
+	magnitudes scaled to their range: returns 1 - H / ln(mag_bins), 1 for a curve whose phase fixes its magnitude
+	bin and 0 for no relation at all'''
+
+	low, high = np.min(y), np.max(y)
+	level = np.minimum(((y - low) / ((high - low) or 1) * mag_bins).astype(np.int64), mag_bins - 1)
+	cells_per_row = phase_bins * mag_bins
+	power = np.zeros(len(frequency))
+
+	for part in chunks(frequency, len(t), cells):
+		rows = len(frequency[part])
+		idx = folded_bins(t, frequency[part], phase_bins)
+		# phase bin p of row k becomes the cells p * mag_bins to p * mag_bins + mag_bins - 1
+		idx *= mag_bins
+		idx += level
+		joint = binned(idx, rows, cells_per_row).reshape(rows, phase_bins, mag_bins) / len(t)
+		del idx
+		marginal = joint.sum(axis=2, keepdims=True)
+		entropy = np.where(joint > 0, joint * np.log(np.where(joint > 0, marginal / np.where(joint > 0, joint, 1), 1)),
+					0).sum(axis=(1, 2))
+		power[part] = 1 - entropy / np.log(mag_bins)
+
+	return power
+
+
+def search(engine, t, y, frequency, err=None, top=5, fine=10, cells=CELLS):
+	'''Scores the frequency grid with the engine ('bls', 'pdm' or 'ce'), then the top highest peaks again on local
+	grids fine times finer (a narrow eclipse can fall between the points of the grid). Returns the best frequency,
+	halved when the fold at twice its period is the smoother one (see doubled), and the power of the grid'''
+
+	score = {'bls': bls, 'pdm': pdm, 'ce': conditional_entropy}[engine]
+	t = np.asarray(t, dtype=np.float64)
+	y = np.asarray(y, dtype=np.float64)
+	err = None if err is None else np.asarray(err, dtype=np.float64)
+	power = score(t, y, frequency, err, cells=cells)
+
+	if len(frequency) < 3 or not top:
+		return frequency[np.argmax(power)], power
+
+	# local maxima of the grid, highest first, each refined between its neighbours
+	inner = np.flatnonzero((power[1:-1] >= power[:-2]) & (power[1:-1] >= power[2:])) + 1
+	peaks = inner[np.argsort(power[inner])[::-1][:top]]
+	step = frequency[1] - frequency[0]
+	local = (frequency[peaks][:, None] + np.linspace(-step, step, 2 * fine + 1)).ravel()
+	local_power = score(t, y, local, err, cells=cells)
+
+	best = local[np.argmax(local_power)]
+	if power.max() > local_power.max():
+		best = frequency[np.argmax(power)]
+
+	return best / 2 if doubled(t, y, best) else best, power
+
+
+def doubled(t, y, frequency):
+	'''Whether the true period is twice 1 / frequency: a fold at half the period lays the primary eclipse on the
+	secondary, so the curve folded at twice the period is smoother (has the shorter string length) than the one
+	folded at the period found'''
+
+	return string_length(t, y, frequency / 2) < string_length(t, y, frequency)
+
+
+def string_length(t, y, frequency):
+	'''Lafler and Kinman's string length of the curve folded at the frequency: the sum of the squared differences of
+	magnitudes neighbouring in phase, around the whole cycle'''
+
+	phase = (t * frequency) % 1
+	mag = y[np.argsort(phase, kind='stable')]
+
+	return np.sum(np.diff(mag) ** 2) + (mag[0] - mag[-1]) ** 2
+
+
+if __name__ == '__main__':
+	main()
@@ -1,9 +1,11 @@
 #!/usr/bin/python3
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 from matplotlib.ticker import FormatStrFormatter
 import os
+from folded import FoldedCurve
 
 
 def main():
@@ -21,20 +23,13 @@ def main():
 
 def set_min_to_zero(folded):
 	'''Finds the primary eclipse minima (i.e., largest magnitude) and sets that as phase 0 and adjusts other phase values
-	accordingly'''
+	accordingly. folded is the dataframe from lombscargle.find_freq (or a folded.FoldedCurve); the re-zeroed curve
+	is returned as a folded.FoldedCurve'''
 	
-	# sort the magnitudes from biggest to smallest
-	zero = folded.sort_values('mag', ascending=False)
-	
-	# grab the phase of the largest mag (minima)
-	min_phase = zero.iloc[0][5] 
-	
-	# grab the Julian Date of the largest mag (minima)
-	epc = zero.iloc[0][0]                               
+	# grab the Julian Date of the largest mag (minima) and make its phase 0; adjust all other phase values accordingly
+	zero = FoldedCurve.from_frame(folded)
+	epc = zero.rezero()
 
-	# Make the minimum magnitude phase 0 by subtracting min_phase; adjust all other phase values accordingly
-	zero.loc[:, 'Phase'] = zero.loc[:, 'Phase'].apply(lambda x: x - min_phase if x - min_phase >= 0 else x - min_phase + 1)
-	
 	# Plot here, if testing
 	if __name__ == '__main__':
 
@@ -65,33 +60,25 @@ def set_min_to_zero(folded):
 
 def add_phases(zd, atc):
 	'''In order to show full eclipse eclipse behavior, adds phases -0.25 to 0 and 1 to 1.25 (full range now
-	-0.25 to 1.25 instead of just 0 to 1). To do this, must copy and paste relevant parts of the curve'''
-
-	pd.options.mode.chained_assignment = None  # default='warn', turned off
-
-	# make new df by selecting data points for phase 0.75 to 1 and make them -0.25 to 0 by subtracting 1
-	select_last_quartile = zd.loc[zd.loc[:, 'Phase'] >= 0.75]
-	select_last_quartile.loc[:, 'Phase'] = select_last_quartile.loc[:, 'Phase'].apply(lambda x: x - 1)
-
-	# make new df by selecting data points for phase 0 to 0.25 and make them 1 to 1.25 by adding 1
-	select_first_quartile = zd.loc[zd.loc[:, 'Phase'] <= 0.25]
-	select_first_quartile.loc[:, 'Phase'] = select_first_quartile.loc[:, 'Phase'].apply(lambda x: x + 1)
-
-	# append the new -0.25 to 0 and 1 to 1.25 dataframes to the original 0 to 1 phase data
-	update1 = zd.append(select_last_quartile, ignore_index=True)
-	update2 = update1.append(select_first_quartile, ignore_index=True)
-
-	plt.scatter(update2['Phase'], update2['mag'], s=10)
-	plt.gca().invert_yaxis()
-	plt.ylabel('Ic-mag')
-	plt.xlabel('Phase')
-	plt.minorticks_on()
-	plt.grid(b=True, which='major', color='red', linestyle='-')
-	plt.grid(b=True, which='minor', color='green', linestyle='-')
-	plt.title('ESTIMATE THE DURATION OF THE PRIMARY ECLIPSE')
-	
+	-0.25 to 1.25 instead of just 0 to 1). Takes and returns a folded.FoldedCurve'''
+
+	# the points of phase 0.75 to 1 are repeated at -0.25 to 0 and those of 0 to 0.25 at 1 to 1.25 through an
+	# index map into the curve rather than copies of the rows
+	update2 = zd.extended(0.25)
+
+	# the plot only helps a user estimate the duration; automatic mode never shows or saves it
 	if atc != '1':
+		fig = plt.figure()
+		plt.scatter(update2['Phase'], update2['mag'], s=10)
+		plt.gca().invert_yaxis()
+		plt.ylabel('Ic-mag')
+		plt.xlabel('Phase')
+		plt.minorticks_on()
+		plt.grid(True, which='major', color='red', linestyle='-')
+		plt.grid(True, which='minor', color='green', linestyle='-')
+		plt.title('ESTIMATE THE DURATION OF THE PRIMARY ECLIPSE')
 		plt.show()
+		plt.close(fig)
 
 	# If TESTING, call next function
 	if __name__ == '__main__':
@@ -100,12 +87,13 @@ def add_phases(zd, atc):
 	return update2
 
 
-def set_epoch(theDf, autoc):
+def set_epoch(theDf, autoc, duration=0.2):
 	'''Plots just the primary eclipse data points. Because the minimum magnitude observed does not necessarily
 	match the true minimum at phase 0, the data points need to be adjusted by looking at the offset of the shape of
 	the eclipse from phase 0. To do this, two nearly equivalent magnitude points are located on opposite sides of
 	the parabola and the midway point between them is calculated.  This value represents the needed offset. This
-	offset is returned'''
+	offset is returned. In automatic mode the eclipse duration is not asked for and 'duration' is used; a duration
+	of 'auto' is estimated from the folded curve (see estimate_duration)'''
 
 	# See if it's possible to use an if-statement to bypass the duration question, i.e., ask for EA, EB, or EW
 	while True:
@@ -113,66 +101,42 @@ def set_epoch(theDf, autoc):
 		# Get the duration of the eclipse (n/a for EB and EW types; defaults to 0.2 in automatic mode)
 		while True:
 			if autoc == '1':
-				dur = float(0.2)
-				break
+				dur = duration
 			else:
-				dur = input('What is the duration of the phase of the primary eclipse? ')
-				if float(dur) > 0 and float(dur) < 1:
-					break
-				else:
-					print('Please enter a valid duration that is greater than 0 and less than 1')
-					print('')
+				dur = input("What is the duration of the phase of the primary eclipse? ('auto' to estimate it) ").strip()
 
-		# sort the data frame by phase (i.e., -0.25 to 1.25)
-		theDf = theDf.sort_values('Phase')
+			if dur == 'auto':
+				dur = estimate_duration(theDf)
+				print('The estimated duration of the primary eclipse is {:.3f}'.format(dur))
+				break
+			if float(dur) > 0 and float(dur) < 1:
+				break
+			else:
+				print('Please enter a valid duration that is greater than 0 and less than 1')
+				print('')
 
 		# The primary eclipse is centered near phase = 0, so given the eclipse duration (dur) the primary eclipse
-		# data points are between -dur/2 and +dur/2 
-		primary_eclipse_1 = theDf.loc[theDf.loc[:, 'Phase'] < float(dur)/2]
-		primary_eclipse = primary_eclipse_1.loc[primary_eclipse_1.loc[:, 'Phase'] > -float(dur)/2]
-
-		# re-order the index starting at 0
-		primary_eclipse.reset_index(drop=True, inplace=True)    
-
-		# min_dp is the index of the minima of the eclipse, i.e., maximum value since magnitude scale is inverted
-		min_dp = primary_eclipse.mag.idxmax()   
-
-		# initialize variable for the offset that will be returned
-		offset = 0                              
-
-		# flag variable will signal when to break out of loop once match is found	
-		flag = 0                                
-
-		# mk_1 will hold the row location for the first match of the pair and mk_2 will do the same for the second match
-		mk_1 = 0                                 
-		mk_2 = 0                                
-
-		# check data points from index 0 (start of eclipse) up to the index of the minima (i.e., the left descending side of the eclipse)
-		for i in range(0, min_dp + 1):         
-			if flag == 1:  break
-
-			# for each point on the left descending of the eclipse, check every point on the right ascending side
-			for j in range(0, len(primary_eclipse.index) - min_dp): 
-				if flag == 1: break
-				mag_diff = abs(primary_eclipse.iloc[i][1] - primary_eclipse.iloc[-j-1][1])
+		# data points are between -dur/2 and +dur/2; sort them by phase
+		phase, mag = np.asarray(theDf['Phase']), np.asarray(theDf['mag'], dtype=np.float64)
+		inside = np.flatnonzero((phase < float(dur)/2) & (phase > -float(dur)/2))
+		inside = inside[np.argsort(phase[inside], kind='stable')]
+		ecl_phase, ecl_mag = phase[inside], mag[inside]
 
-				# if the difference in mag is this small, you've found matching points on both sides
-				if mag_diff < 0.02:    
-					offset = primary_eclipse.iloc[i][5] + \
-					((primary_eclipse.iloc[len(primary_eclipse.index) - j - 1][5] - primary_eclipse.iloc[i][5])/2)
-					mk_1 = i
-					mk_2 = len(primary_eclipse.index) - j - 1
-					flag = 1
+		# find the pair of matching points on opposite sides of the minima and the offset half way between them
+		offset, mk_1, mk_2 = eclipse_offset(ecl_phase, ecl_mag)
 
 		if offset == 0:
 			print('No match found')
 
+		if autoc == '1':
+			break
+
 		# Plot the eclipse portion of the light curve with the selected points highlighted in yellow with a red line between them
 		fig, ax = plt.subplots()
 		ax.yaxis.set_major_formatter(FormatStrFormatter('%0.2f'))
-		plt.scatter(primary_eclipse['Phase'], primary_eclipse['mag'])
-		plt.scatter(primary_eclipse.iloc[mk_1][5], primary_eclipse.iloc[mk_1][1], color='yellow')
-		plt.scatter(primary_eclipse.iloc[mk_2][5], primary_eclipse.iloc[mk_2][1], color='yellow')
+		plt.scatter(ecl_phase, ecl_mag)
+		if len(inside) > 0:
+			plt.scatter(ecl_phase[[mk_1, mk_2]], ecl_mag[[mk_1, mk_2]], color='yellow')
 		plt.gca().invert_yaxis()
 		plt.ylabel('Ic-mag')
 		plt.xlabel('Phase')
@@ -180,10 +144,9 @@ def set_epoch(theDf, autoc):
 		plt.axvline(x=offset, color='red')
 		plt.grid()
 		
-		if autoc == '1':
-			satisfactory = '1'
 		if autoc != '1':
 			plt.show()
+			plt.close(fig)
 			satisfactory = input('Is the location of the vertical offset line satisfactory? [1]=Yes or [any other '
 			'key]=No ').strip()
 			print('')
@@ -193,5 +156,72 @@ def set_epoch(theDf, autoc):
 	return offset
 
 
+def eclipse_offset(phase, mag, tol=0.02):
+	'''Given the primary eclipse points sorted by phase, finds the first point on the left descending side (from the
+	start of the eclipse up to the minima) that has a point within tol mag on the right ascending side, pairs it with
+	the outermost such point, and returns the phase half way between them along with the positions of the pair.
+	Each left point is matched against the right side sorted by magnitude with a binary search instead of checking
+	every pair, so this takes O(n log n) rather than O(n^2)'''
+
+	if len(mag) == 0:
+		return 0, 0, 0
+
+	# min_dp is the index of the minima of the eclipse, i.e., maximum value since magnitude scale is inverted
+	min_dp = int(np.argmax(mag))
+
+	# the right side runs from the minima to the end of the eclipse. A minima already at phase 0 pairs the first
+	# point of the eclipse with the right side, which is checked without sorting anything
+	right = mag[min_dp:]
+	first = np.flatnonzero(np.abs(mag[0] - right) < tol)
+	if len(first):
+		k = min_dp + int(first.max())
+		return phase[0] + (phase[k] - phase[0]) / 2, 0, k
+
+	# otherwise the right side is sorted by magnitude for a binary search per left point
+	order = np.argsort(right, kind='stable')
+	right_sorted = right[order]
+
+	# range of right points whose magnitude is within tol of each left point (widened slightly; the exact test
+	# below decides)
+	left = mag[:min_dp + 1]
+	eps = 1e-9
+	lo = np.searchsorted(right_sorted, left - tol - eps, side='left')
+	hi = np.searchsorted(right_sorted, left + tol + eps, side='right')
+
+	for i in np.flatnonzero(hi > lo):
+		match = order[lo[i]:hi[i]][np.abs(left[i] - right_sorted[lo[i]:hi[i]]) < tol]
+		if len(match):
+			k = min_dp + int(match.max())
+			return phase[i] + (phase[k] - phase[i]) / 2, int(i), k
+
+	return 0, 0, 0
+
+
+def estimate_duration(folded, bins=100, level=0.1, pad=1.2, shortest=0.02, longest=0.5):
+	'''Estimates the phase duration of the primary eclipse from a folded curve with the minima at phase 0: the median
+	magnitude in phase bins is compared with the out-of-eclipse level (the median of the bins), and the eclipse
+	extends on both sides of phase 0 while the curve is more than 'level' of the eclipse depth below it. The width
+	found is padded by 'pad' and kept between shortest and longest'''
+
+	phase = np.asarray(folded['Phase']) % 1
+	mag = np.asarray(folded['mag'])
+
+	idx = np.minimum((phase * bins).astype(int), bins - 1)
+	binned = pd.Series(mag).groupby(idx).median().reindex(range(bins))
+	binned = binned.interpolate(limit_direction='both').to_numpy()
+
+	baseline = np.median(binned)
+	depth = max(binned[0], binned[-1]) - baseline
+	if not depth > 0:
+		return longest
+
+	# walk away from phase 0 in both directions while still in the eclipse
+	inside = binned > baseline + level * depth
+	after = np.argmin(inside) if not inside.all() else bins
+	before = np.argmin(inside[::-1]) if not inside.all() else bins
+
+	return float(np.clip((after + before) / bins * pad, shortest, longest))
+
+
 if __name__ == '__main__':
 	main()
@@ -0,0 +1,171 @@
+#!/usr/bin/python3
+
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+
+# marks the end of the stream of items in a queue
+_DONE = object()
+
+
+def main():
+	'''main function for testing this module'''
+
+	print('TESTING...')
+	print('')
+	stages = [Stage('sleep', slow_square, workers=8, kind='thread'),
+		Stage('add', add_one, workers=2, kind='process')]
+	begin = time.time()
+	print(list(run(range(16), stages)))
+	print('Took {:.2f} s (serial would take 1.6 s)'.format(time.time() - begin))
+
+
+def slow_square(x):
+	time.sleep(0.1)
+	return x * x
+
+
+def add_one(x):
+	return x + 1
+
+
+class Stage:
+	'''One step of the pipeline. func is called on every item by a pool of workers of the given kind: 'thread' for
+	I/O bound work, 'process' for CPU bound work (func and items must pickle), or 'inline' to run in the thread that
+	dispatches the stage. Items for which when(item) is False skip the stage unchanged'''
+
+	def __init__(self, name, func, workers=1, kind='inline', when=None):
+		self.name = name
+		self.func = func
+		self.workers = max(1, int(workers))
+		self.kind = kind
+		self.when = when
+
+
+class Failed:
+	'''Stands in for the result of an item whose stage raised an exception; later stages pass it through'''
+
+	def __init__(self, stage, item, error):
+		self.stage = stage
+		self.item = item
+		self.error = error
+
+	def __repr__(self):
+		return 'Failed({!r} in stage {}: {!r})'.format(self.item, self.stage, self.error)
+
+
+def run(items, stages, queue_size=16):
+	'''Passes every item through the stages and yields the results in the order of the items. Each stage runs on
+	its own pool and the stages are connected by queues holding at most queue_size items, so a slow stage holds
+	back the ones before it instead of piling up work. The caller consumes the results in its own thread, which
+	makes it the single writer of the output. If every stage is 'inline' the items are processed one at a time in
+	the calling thread, which keeps interactive prompts and GUI windows on the main thread'''
+
+	if all(stage.kind == 'inline' for stage in stages):
+		for item in items:
+			for stage in stages:
+				item = _call(stage, item)
+			yield item
+		return
+
+	queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+	threads = [threading.Thread(target=_feed, args=(items, queues[0]), daemon=True)]
+	for stage, q_in, q_out in zip(stages, queues, queues[1:]):
+		threads.append(threading.Thread(target=_dispatch, args=(stage, q_in, q_out), daemon=True))
+
+	for t in threads:
+		t.start()
+
+	# results come out of the last stage in any order, so hold them back until their turn comes
+	waiting = {}
+	turn = 0
+	while True:
+		msg = queues[-1].get()
+		if msg is _DONE:
+			break
+
+		seq, result = msg
+		waiting[seq] = result
+		while turn in waiting:
+			yield waiting.pop(turn)
+			turn += 1
+
+
+def _call(stage, item):
+	'''Runs one item through a stage in the current thread'''
+
+	if isinstance(item, Failed) or (stage.when is not None and not stage.when(item)):
+		return item
+
+	try:
+		return stage.func(item)
+	except Exception as e:
+		return Failed(stage.name, item, e)
+
+
+def _feed(items, q_out):
+	'''Numbers the items and puts them in the first queue'''
+
+	for seq, item in enumerate(items):
+		q_out.put((seq, item))
+
+	q_out.put(_DONE)
+
+
+def _dispatch(stage, q_in, q_out):
+	'''Takes items from q_in, runs them through the stage's pool, and puts the results in q_out'''
+
+	if stage.kind == 'inline':
+		while True:
+			msg = q_in.get()
+			if msg is _DONE:
+				break
+			q_out.put((msg[0], _call(stage, msg[1])))
+		q_out.put(_DONE)
+		return
+
+	# worker processes are spawned rather than forked because other pipeline threads are already running
+	if stage.kind == 'process':
+		executor = ProcessPoolExecutor(max_workers=stage.workers, mp_context=multiprocessing.get_context('spawn'))
+	else:
+		executor = ThreadPoolExecutor(max_workers=stage.workers)
+
+	# at most 'workers' items are handed to the pool at once; the rest wait in q_in
+	slots = threading.BoundedSemaphore(stage.workers)
+
+	with executor:
+		while True:
+			msg = q_in.get()
+			if msg is _DONE:
+				break
+
+			seq, item = msg
+			if isinstance(item, Failed) or (stage.when is not None and not stage.when(item)):
+				q_out.put(msg)
+				continue
+
+			slots.acquire()
+			future = executor.submit(stage.func, item)
+			future.add_done_callback(partial(_collect, stage, seq, item, q_out, slots))
+
+	q_out.put(_DONE)
+
+
+def _collect(stage, seq, item, q_out, slots, future):
+	'''Forwards the result of a finished item to the next queue and frees its slot in the pool'''
+
+	try:
+		result = future.result()
+	except Exception as e:
+		result = Failed(stage.name, item, e)
+
+	q_out.put((seq, result))
+	slots.release()
+
+
+if __name__ == '__main__':
+	main()
@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from matplotlib.ticker import FormatStrFormatter
 import os
+import render
 
 
 def main():
@@ -16,8 +17,14 @@ def main():
 	plot_raw_data(test, name, auto)
  
 
-def plot_raw_data(df, nme, ac):
-	'''plots the raw data as a test to ensure data was imported properly'''
+def plot_raw_data(df, nme, ac, plot=None, folder=''):
+	'''plots the raw data as a test to ensure data was imported properly. In automatic mode the plot is handed to
+	plot (see render.emitter) or else drawn by render.draw, and saved in folder'''
+
+	plot_name = os.path.join(folder, nme + '_Raw_Data.png')
+	if ac == '1':
+		(plot or render.draw)(render.job('raw', plot_name, df['HJD'], df['mag'], title=nme + ' Raw Data'))
+		return
 
 	fig, ax = plt.subplots()
 	ax.yaxis.set_major_formatter(FormatStrFormatter('%0.2f'))
@@ -28,14 +35,19 @@ def plot_raw_data(df, nme, ac):
 	plt.title(nme + ' Raw Data')
 	plt.xlabel('HJD')
 	plt.ylabel('mag')
-	plot_name = nme + '_Raw_Data.png'
 	plt.savefig(plot_name)
-	if ac != '1':
-		plt.show()
+	plt.show()
+	plt.close(fig)
+
 
+def final_phase_diagram(phase_d, nm, per, a_c, plot=None):
+	''' plots the final phase diagram; in automatic mode through plot like plot_raw_data'''
 
-def final_phase_diagram(phase_d, nm, per, a_c):
-	''' plots the final phase diagram'''
+	plt_name = nm + '_Phase_Diagram'
+	if a_c == '1':
+		(plot or render.draw)(render.job('phase', plt_name + '.png', phase_d['Phase'], phase_d['mag'],
+						title=nm + ' (P = ' + str(per) + ' d)'))
+		return
 
 	fig, ax = plt.subplots()
 	ax.yaxis.set_major_formatter(FormatStrFormatter('%0.2f'))
@@ -45,11 +57,10 @@ def final_phase_diagram(phase_d, nm, per, a_c):
 	plt.xlabel('Phase')
 	plt.title(nm + ' (P = ' + str(per) + ' d)')
 	plt.grid()
-	plt_name = nm + '_Phase_Diagram'
 	plt.tight_layout()
 	plt.savefig(plt_name)
-	if a_c != '1':
-		plt.show()
+	plt.show()
+	plt.close(fig)
 
 	return
 
@@ -0,0 +1,239 @@
+#!/usr/bin/python3
+
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.ticker import FormatStrFormatter
+
+
+# what happens to the plots of the automatic analysis: drawn at once by the analysis, queued with the record for a
+# Renderer off the critical path, or not made at all
+MODES = ['inline', 'background', 'skip']
+
+# dense plots are thinned to about this many points (see thin); 0 keeps every point
+MAX_POINTS = 20000
+
+# plots queued on a Renderer at most; the results loop waits for a free slot beyond that
+PENDING = 64
+
+# the figures made in this thread, one per kind of plot, reused for every plot of that kind
+_local = threading.local()
+
+
+def main():
+	'''main function for testing: draws every kind of plot of a synthetic binary of n points (default a million)
+	into the current directory, e.g. python3 render.py 1000000'''
+
+	import synthetic
+	import folded
+
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+	lc, params = synthetic.light_curve('EA', n, seed=1)
+	curve = folded.FoldedCurve(lc, 1 / params['period'])
+	frequency = np.linspace(0.01, 5, 100000)
+	power = np.exp(-((frequency - 1 / params['period']) * 200) ** 2)
+
+	for plot in (job('raw', 'Render_Test_Raw_Data.png', lc['HJD'], lc.mag, title='Render Test Raw Data'),
+			job('periodogram', 'Render_Test_Periodiagram.png', frequency, power, best=1 / params['period'],
+				phase=curve['Phase'], mag=curve['mag'], title='Frequency = {}'.format(1 / params['period'])),
+			job('phase', 'Render_Test_Phase_Diagram.png', curve['Phase'], curve['mag'],
+				title='Render Test (P = {:.4f} d)'.format(params['period']))):
+		draw(plot)
+		print('Drew', plot['path'])
+
+
+def job(kind, path, x, y, **extra):
+	'''A plot to render: the kind ('raw', 'periodogram' or 'phase'), the file it goes to (made absolute, so the plot
+	can be drawn from anywhere), the points and the title and other data of the kind (a periodogram's best
+	frequency, folded curve and power label)'''
+
+	plot = {'kind': kind, 'path': os.path.abspath(path), 'x': np.asarray(x), 'y': np.asarray(y)}
+	plot.update(extra)
+
+	return plot
+
+
+def thin(x, y, max_points=MAX_POINTS):
+	'''At most about max_points of the points of a dense plot, in x order: an even sample of half of them, for the
+	density, and the smallest and largest y (the brightest and faintest magnitude, or the lowest and highest power)
+	in each of max_points / 4 bins in x, so eclipse depths and periodogram peaks look the same as with every point'''
+
+	x = np.asarray(x)
+	y = np.asarray(y)
+	if not max_points or len(x) <= max_points:
+		return x, y
+
+	bins = max(max_points // 4, 1)
+	low, span = np.nanmin(x), np.nanmax(x) - np.nanmin(x)
+	number = np.zeros(len(x), dtype=np.int64)
+	if span > 0:
+		number = np.clip(((x - low) / span * bins).astype(np.int64), 0, bins - 1)
+
+	order = np.lexsort((y, number))
+	sorted_number = number[order]
+	first = np.flatnonzero(np.concatenate([[True], sorted_number[1:] != sorted_number[:-1]]))
+	last = np.concatenate([first[1:], [len(order)]]) - 1
+	sample = np.arange(0, len(x), -(-len(x) * 2 // max_points))
+	keep = np.unique(np.concatenate([order[first], order[last], sample]))
+	keep = keep[np.argsort(x[keep], kind='stable')]
+
+	return x[keep], y[keep]
+
+
+def thinned(plot, max_points=MAX_POINTS):
+	'''The plot with its points (and the folded curve of a periodogram) thinned, see thin'''
+
+	plot = dict(plot)
+	plot['x'], plot['y'] = thin(plot['x'], plot['y'], max_points)
+	if 'phase' in plot:
+		plot['phase'], plot['mag'] = thin(plot['phase'], plot['mag'], max_points)
+
+	return plot
+
+
+def emitter(rec):
+	'''The function the analysis of a record hands its plots to, as the record's render mode says (see MODES):
+	thinned to the record's max_points, they are drawn at once, queued in the record's plots for a Renderer, or
+	dropped'''
+
+	mode = rec.get('render') or 'inline'
+	max_points = rec.get('max_points')
+	max_points = MAX_POINTS if max_points is None else max_points
+
+	def emit(plot):
+		if mode == 'skip':
+			return
+		plot = thinned(plot, max_points)
+		if mode == 'background':
+			rec.setdefault('plots', []).append(plot)
+		else:
+			draw(plot, max_points)
+
+	return emit
+
+
+class Canvas:
+	'''A figure with the axes and artists of one kind of plot, made once and updated for every plot of that kind
+	instead of building a new figure each time. The figure is not registered with pyplot, so nothing has to be
+	closed and it goes away with the thread'''
+
+	def __init__(self, kind):
+		self.figure = Figure()
+		FigureCanvasAgg(self.figure)
+
+		if kind == 'periodogram':
+			top, bottom = self.figure.subplots(2, 1)
+			self.line, = top.plot([], [], color='black')
+			self.best = top.axvline(x=0, color='blue', linestyle='dashed')
+			top.set_xlabel('Frequency')
+			top.set_ylabel('Lomb-Scargle Power')
+			self.folded = bottom.scatter([], [], color='black', s=5)
+			bottom.set_xlabel('Phase')
+			bottom.set_ylabel('Ic-mag')
+			self.axes = [top, bottom]
+		else:
+			ax = self.figure.subplots()
+			ax.yaxis.set_major_formatter(FormatStrFormatter('%0.2f'))
+			self.points = ax.scatter([], [], color='black', s=5)
+			ax.set_xlabel('HJD' if kind == 'raw' else 'Phase')
+			ax.set_ylabel('mag' if kind == 'raw' else 'Ic-mag')
+			if kind == 'phase':
+				ax.grid()
+			self.axes = [ax]
+
+		self.title = self.axes[0].set_title(' ')
+		self.figure.tight_layout()
+
+
+def canvas(kind):
+	'''The figure of this thread for a kind of plot'''
+
+	if not hasattr(_local, 'canvases'):
+		_local.canvases = {}
+	if kind not in _local.canvases:
+		_local.canvases[kind] = Canvas(kind)
+
+	return _local.canvases[kind]
+
+
+def fit(ax, x, y, invert=False, margin=0.05):
+	'''Sets the limits of the axes to the points with a margin (scatters are not autoscaled when their points are
+	replaced); magnitudes grow downward with invert'''
+
+	x = np.asarray(x, dtype=np.float64)
+	y = np.asarray(y, dtype=np.float64)
+	if not len(x):
+		return
+
+	for values, setter, flip in ((x, ax.set_xlim, False), (y, ax.set_ylim, invert)):
+		low, high = np.nanmin(values), np.nanmax(values)
+		pad = (high - low) * margin or 0.5
+		setter((high + pad, low - pad) if flip else (low - pad, high + pad))
+
+
+def draw(plot, max_points=MAX_POINTS):
+	'''Renders a plot (see job) to its file with the figure this thread keeps for its kind'''
+
+	plot = thinned(plot, max_points)
+	c = canvas(plot['kind'])
+	c.title.set_text(plot.get('title', ''))
+
+	if plot['kind'] == 'periodogram':
+		top, bottom = c.axes
+		top.set_ylabel(plot.get('ylabel', 'Lomb-Scargle Power'))
+		c.line.set_data(plot['x'], plot['y'])
+		c.best.set_xdata([plot['best'], plot['best']])
+		fit(top, plot['x'], plot['y'])
+		c.folded.set_offsets(np.column_stack([plot['phase'], plot['mag']]))
+		fit(bottom, plot['phase'], plot['mag'], invert=True)
+	else:
+		c.points.set_offsets(np.column_stack([plot['x'], plot['y']]))
+		fit(c.axes[0], plot['x'], plot['y'], invert=True)
+
+	c.figure.savefig(plot['path'])
+
+	return plot['path']
+
+
+class Renderer:
+	'''Renders the plots queued with the records (see emitter) on a pool of workers processes while the analysis
+	goes on. At most pending plots wait at a time, so a slow disk or many plots hold up the results loop instead
+	of filling the memory'''
+
+	def __init__(self, workers=2, pending=PENDING):
+		self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+		self.slots = threading.BoundedSemaphore(pending)
+		self.lock = threading.Lock()
+		self.rendered = 0
+		self.failed = 0
+
+	def submit(self, plots):
+		for plot in plots:
+			self.slots.acquire()
+			self.pool.submit(draw, plot, 0).add_done_callback(self.done)
+
+	def done(self, future):
+		self.slots.release()
+		error = future.exception()
+		with self.lock:
+			if error is None:
+				self.rendered += 1
+			else:
+				self.failed += 1
+				print('A plot failed to render: {!r}'.format(error))
+
+	def close(self):
+		'''Waits for the queued plots'''
+
+		self.pool.shutdown(wait=True)
+
+		return self.rendered, self.failed
+
+
+if __name__ == '__main__':
+	main()
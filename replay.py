@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+
+import argparse
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import services
+
+
+# where the stand-in server listens and keeps its recordings by default
+DEFAULT_PORT = 8642
+DEFAULT_STORE = 'replay.sqlite'
+
+
+def main():
+	'''Runs the stand-in server for VSX, OGLE and VizieR, e.g.
+
+	./replay.py --record                          record the real responses while a run goes through the server
+	./replay.py --latency 0.5 --error-rate 0.05   replay them slowly, with 5% of the requests failing
+
+	and point a run at it with ./app_eclipseDataminer.py --services http://localhost:8642'''
+
+	parser = argparse.ArgumentParser(description='Records and replays the responses of VSX, OGLE and VizieR')
+	parser.add_argument('--store', default=DEFAULT_STORE, help='SQLite file of the recorded responses')
+	parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+	parser.add_argument('--record', action='store_true',
+				help='forward requests that were not recorded yet to the real services and record the responses')
+	parser.add_argument('--latency', type=float, default=0, help='seconds every response is held back')
+	parser.add_argument('--jitter', type=float, default=0, help='up to this many seconds more, at random')
+	parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with an HTTP 503')
+	parser.add_argument('--seed', type=int, help='seed of the latency and errors, for reproducible runs')
+	args = parser.parse_args()
+
+	server = make_server(Store(args.store), args.port, args.record, args.latency, args.jitter, args.error_rate,
+				args.seed)
+	print('{} {} recorded responses on {} (Ctrl-C to stop)'.format('Recording to' if args.record else 'Replaying',
+									len(server.store), server.url))
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		print(server.stats)
+
+
+class Store:
+	'''The recorded responses in a SQLite file, by request key (see request_key). Safe to use from the threads of
+	the server'''
+
+	def __init__(self, path=DEFAULT_STORE):
+		self.lock = threading.Lock()
+		self.db = sqlite3.connect(path, check_same_thread=False)
+		self.db.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, service TEXT, method TEXT, '
+				'url TEXT, status INTEGER, content_type TEXT, body BLOB)')
+		self.db.commit()
+
+	def __len__(self):
+		with self.lock:
+			return self.db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+	def get(self, key):
+		'''The (status, content type, body) recorded for the key, or None'''
+
+		with self.lock:
+			return self.db.execute('SELECT status, content_type, body FROM responses WHERE key = ?', (key,)).fetchone()
+
+	def put(self, service, method, path, body, status, content_type, content):
+		'''Records the response to a request on the server (path is the path on the service with the query)'''
+
+		with self.lock:
+			self.db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+					(request_key(service, method, path, body), service, method, path, status, content_type,
+					content))
+			self.db.commit()
+
+	def close(self):
+		self.db.close()
+
+
+def request_key(service, method, path, body=b''):
+	'''Key of a request: the service, the method, the path with the query, and the body (VizieR queries are POSTs)'''
+
+	digest = hashlib.sha256()
+	for part in (service, method, path):
+		digest.update(part.encode('utf-8') + b'\0')
+	digest.update(body or b'')
+
+	return digest.hexdigest()
+
+
+class Handler(BaseHTTPRequestHandler):
+	'''Answers /vsx/..., /ogle/... and /vizier/... requests with the responses recorded for the same path on the
+	real service, after the configured latency. A request that is neither recorded nor recordable gets a 404 and
+	an injected error a 503'''
+
+	# connections are kept alive, so small writes must not wait for the client's delayed acknowledgement
+	protocol_version = 'HTTP/1.1'
+	disable_nagle_algorithm = True
+
+	def do_GET(self):
+		self.answer('GET')
+
+	def do_POST(self):
+		self.answer('POST')
+
+	def answer(self, method):
+		server = self.server
+		length = int(self.headers.get('Content-Length') or 0)
+		body = self.rfile.read(length) if length else b''
+
+		service, _, path = self.path.lstrip('/').partition('/')
+		path = '/' + path
+		if service not in services.SERVERS:
+			return self.reply(404, 'text/plain', b'unknown service ' + service.encode('utf-8'), 'unknown')
+
+		with server.lock:
+			delay = server.latency + server.jitter * server.random.random()
+			failed = server.random.random() < server.error_rate
+		time.sleep(delay)
+
+		if failed:
+			return self.reply(503, 'text/plain', b'injected error', 'errors')
+
+		recorded = server.store.get(request_key(service, method, path, body))
+		if recorded is not None:
+			return self.reply(*recorded, 'replayed')
+
+		if not server.record:
+			return self.reply(404, 'text/plain', b'not recorded', 'missing')
+
+		# forward to the real service and keep its answer
+		response = services.session().request(method, services.SERVERS[service] + path, data=body or None,
+						headers={'Content-Type': self.headers.get('Content-Type', 'text/plain')})
+		content_type = response.headers.get('Content-Type', 'text/plain')
+		if response.ok:
+			server.store.put(service, method, path, body, response.status_code, content_type, response.content)
+		self.reply(response.status_code, content_type, response.content, 'recorded')
+
+	def reply(self, status, content_type, content, outcome):
+		with self.server.lock:
+			self.server.stats[outcome] = self.server.stats.get(outcome, 0) + 1
+
+		self.send_response(status)
+		self.send_header('Content-Type', content_type)
+		self.send_header('Content-Length', str(len(content)))
+		self.end_headers()
+		self.wfile.write(content)
+
+	def log_message(self, format, *args):
+		pass
+
+
+def make_server(store, port=DEFAULT_PORT, record=False, latency=0, jitter=0, error_rate=0, seed=None):
+	'''Creates the stand-in server (one thread per connection) on localhost; port 0 picks a free port'''
+
+	server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+	server.daemon_threads = True
+	server.store = store
+	server.record = record
+	server.latency = latency
+	server.jitter = jitter
+	server.error_rate = error_rate
+	server.random = random.Random(seed)
+	server.lock = threading.Lock()
+	server.stats = {}
+	server.url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+	return server
+
+
+def start(store, **options):
+	'''Starts a stand-in server in a background thread and points the services at it; stop it with stop'''
+
+	server = make_server(store, port=options.pop('port', 0), **options)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	services.use(server.url)
+
+	return server
+
+
+def stop(server):
+	'''Stops a server from start and points the services back at the real ones'''
+
+	server.shutdown()
+	server.server_close()
+	services.reset()
+
+
+if __name__ == '__main__':
+	main()
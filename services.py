@@ -0,0 +1,223 @@
+#!/usr/bin/python3
+
+import collections
+import threading
+import time
+from urllib.parse import urlsplit
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import instrument
+
+
+# the servers of the astronomy services the program talks to
+SERVERS = {'vsx': 'http://www.aavso.org', 'ogle': 'http://ogledb.astrouw.edu.pl', 'vizier': 'https://vizier.cds.unistra.fr'}
+
+# the servers requests actually go to; a stand-in like the local replay server (see replay.py) can take the place
+# of any of them
+_servers = dict(SERVERS)
+
+# connect and read timeouts in seconds, retries of a failed request (connection errors, timeouts, 429 and 5xx
+# answers) with a backoff of BACKOFF seconds doubling every retry plus up to as much again at random, requests
+# to one host at a time, and connections kept alive per host
+TIMEOUT = (10, 60)
+RETRIES = 4
+BACKOFF = 0.5
+BACKOFF_MAX = 30
+PER_HOST = 4
+POOL_SIZE = 16
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# latencies kept per host for the percentiles of stats
+LATENCIES = 10000
+
+# the shared session of the whole program, made by session
+_session = None
+_lock = threading.Lock()
+
+
+def main():
+	'''main function for testing: points the services at a local server and prints where requests would go'''
+
+	use('http://localhost:8642')
+	for service, server in SERVERS.items():
+		print(service, url(service, server + '/some/path?x=1'))
+	reset()
+
+	configure_client(retries=1, backoff=0.1)
+	try:
+		get_text('vsx', 'http://localhost:1/nothing')
+	except requests.ConnectionError as e:
+		print('Failed as expected: {}'.format(type(e).__name__))
+	print(stats())
+
+
+def configure(vsx=None, ogle=None, vizier=None):
+	'''Sets the base URLs the services are reached at; None keeps a service where it is'''
+
+	for service, base in (('vsx', vsx), ('ogle', ogle), ('vizier', vizier)):
+		if base is not None:
+			_servers[service] = base.rstrip('/')
+
+
+def use(base):
+	'''Sends the requests of every service to one server, under base/vsx, base/ogle and base/vizier'''
+
+	configure(**{service: base.rstrip('/') + '/' + service for service in SERVERS})
+
+
+def reset():
+	'''Sends the requests to the real services again'''
+
+	_servers.update(SERVERS)
+
+
+def url(service, address):
+	'''The address of a request to the service as it should be sent: an address on the service's own server (http
+	or https) is moved to the base URL configured for it, anything else is left alone'''
+
+	if _servers[service] == SERVERS[service]:
+		return address
+
+	parts = urlsplit(address)
+	if parts.netloc != urlsplit(SERVERS[service]).netloc:
+		return address
+
+	return _servers[service] + parts.path + ('?' + parts.query if parts.query else '')
+
+
+def get_text(service, address):
+	'''Downloads the text at the address from the service; error responses raise requests.HTTPError instead of
+	being taken for a page'''
+
+	response = session().get(url(service, address))
+	response.raise_for_status()
+
+	return response.text
+
+
+class Metrics:
+	'''Latency, retries and errors of the requests per host'''
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.hosts = {}
+
+	def host(self, name):
+		if name not in self.hosts:
+			self.hosts[name] = {'requests': 0, 'retries': 0, 'errors': 0,
+						'latency': collections.deque(maxlen=LATENCIES)}
+		return self.hosts[name]
+
+	def request(self, host, latency, failed):
+		with self.lock:
+			entry = self.host(host)
+			entry['requests'] += 1
+			entry['errors'] += failed
+			entry['latency'].append(latency)
+
+	def retry(self, host):
+		with self.lock:
+			self.host(host)['retries'] += 1
+
+	def stats(self):
+		'''Requests, retries, errors and latency (mean, median, 95th percentile and maximum, in seconds) per host'''
+
+		with self.lock:
+			report = {}
+			for name, entry in self.hosts.items():
+				latency = np.array(entry['latency'])
+				report[name] = {'requests': entry['requests'], 'retries': entry['retries'], 'errors': entry['errors']}
+				if len(latency):
+					report[name].update(mean=round(float(latency.mean()), 3),
+							p50=round(float(np.percentile(latency, 50)), 3),
+							p95=round(float(np.percentile(latency, 95)), 3), max=round(float(latency.max()), 3))
+			return report
+
+
+metrics = Metrics()
+
+
+class CountedRetry(Retry):
+	'''urllib3's Retry that counts every retry in the metrics and in the record of the running stage'''
+
+	def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+		# once the retries run out this raises instead
+		retry = super().increment(method, url, response, error, _pool, _stacktrace)
+
+		if _pool is not None:
+			metrics.retry(_pool.host)
+		instrument.count('http_retries', 1)
+
+		return retry
+
+
+class PooledAdapter(HTTPAdapter):
+	'''Keeps the connections to every host alive for reuse, lets at most per_host requests run at once on a host,
+	gives every request the default timeout unless it has one, and records the latency of every request'''
+
+	def __init__(self, per_host=PER_HOST, timeout=TIMEOUT, retries=RETRIES, backoff=BACKOFF, pool_size=POOL_SIZE):
+		retry = CountedRetry(total=retries, status_forcelist=RETRY_STATUS, allowed_methods=('GET', 'POST'),
+					backoff_factor=backoff, backoff_max=BACKOFF_MAX, backoff_jitter=backoff,
+					raise_on_status=False)
+		super().__init__(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+		self.per_host = per_host
+		self.timeout = timeout
+		self.limits = collections.defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+		self.limits_lock = threading.Lock()
+
+	def send(self, request, **kwargs):
+		if kwargs.get('timeout') is None:
+			kwargs['timeout'] = self.timeout
+
+		host = urlsplit(request.url).hostname
+		with self.limits_lock:
+			limit = self.limits[host]
+
+		with limit:
+			begin = time.perf_counter()
+			try:
+				response = super().send(request, **kwargs)
+			except requests.RequestException:
+				metrics.request(host, time.perf_counter() - begin, True)
+				raise
+
+		metrics.request(host, time.perf_counter() - begin, response.status_code >= 400)
+
+		return response
+
+
+def session():
+	'''The shared session all the network requests go through (see PooledAdapter)'''
+
+	global _session
+
+	with _lock:
+		if _session is None:
+			_session = requests.Session()
+			_session.headers['Accept-Encoding'] = 'gzip, deflate'
+			mount(_session, PooledAdapter())
+		return _session
+
+
+def mount(other, adapter=None):
+	'''Sends the requests of another session (e.g. astroquery's) through the adapter of the shared session'''
+
+	adapter = adapter or session().get_adapter('http://')
+	other.mount('http://', adapter)
+	other.mount('https://', adapter)
+
+
+def configure_client(per_host=PER_HOST, timeout=TIMEOUT, retries=RETRIES, backoff=BACKOFF, pool_size=POOL_SIZE):
+	'''Replaces the adapter of the shared session by one with these settings (see PooledAdapter)'''
+
+	mount(session(), PooledAdapter(per_host, timeout, retries, backoff, pool_size))
+
+
+def stats():
+	return metrics.stats()
+
+
+if __name__ == '__main__':
+	main()
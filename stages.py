@@ -0,0 +1,259 @@
+#!/usr/bin/python3
+
+import os
+import tempfile
+from pathlib import Path
+import cache, instrument, triage
+
+
+# The analysis of one object is split into stages so the pipeline can overlap them across objects:
+#   lookup  - network: VSX check, photometry download, variability triage and cross-ids (thread pool)
+#   analyze - CPU: period search, phase adjustments, parameters and plots (process pool, see also batch.py)
+#   record  - output: copy the results into the query dataframe (main thread, the single writer)
+# Every stage takes and returns a dictionary (the record) describing the object. The time every stage and its steps
+# take and what they count (see instrument.py) travel with the record. Every stage imports the modules it needs when
+# it first runs, so the lookup threads never load the analysis modules (astropy, matplotlib) and the analysis
+# processes never load the network ones (astroquery, lxml).
+
+
+def make_tasks(df, start, total, how_close, auto, known=None, xids=None, urls=None, settings=None, resume=None):
+	'''Creates the records of the objects start to total - 1 of the query dataframe (or of a batch of it, see
+	initial_setup.read_batches; objects are identified by their index in the dataframe). resume holds the journaled
+	state of objects from an earlier run (see journal.resume): finished objects are skipped and objects already
+	checked against VSX are not checked again. settings holds the options
+	for unattended runs: url_template, ls_args (see lombscargle.find_freq), duration (see
+	phase_adjustments.set_epoch), folders (False to keep no per-object folders, e.g. with a results catalog) and
+	profile_every and profile_dir (run every profile_every-th object under cProfile, see instrument.sampled),
+	triage (thresholds of the variability triage of the light curves, see triage.reason, or None) and triage_query
+	(screen the objects on the query file's columns before downloading them, see triage.screen_query), render and
+	max_points (how the plots of the automatic analysis are made and how many points they keep, see render.emitter)'''
+
+	settings = settings or {}
+	screened = triage.screen_query(df, settings.get('triage')) if settings.get('triage_query') else None
+
+	resume = resume or {}
+
+	for obj in df.index:
+		state = resume.get(obj, {})
+		if not start <= obj < total or state.get('stage') == 'done':
+			continue
+
+		row = df.loc[obj]
+		task = {'obj': obj, 'total': total, 'field': str(row['Field']), 'sid': str(row['StarID']),
+			'ra_d': float(row['RA']) * 360 / 24, 'dec_d': float(row['Decl']), 'how_close': how_close,
+			'auto': auto, 'known': None, 'xids': None, 'url': None, 'url_template': settings.get('url_template'),
+			'ls_args': settings.get('ls_args'), 'duration': settings.get('duration', 0.2),
+			'folders': settings.get('folders', True),
+			'profile': instrument.sampled(obj, settings.get('profile_every'), settings.get('profile_dir', 'profiles')),
+			'triage': settings.get('triage'), 'screened': screened.get(obj) if screened is not None else None,
+			'render': settings.get('plots'), 'max_points': settings.get('max_points')}
+
+		# objects a batched check left out (see aavso.classify_cones) are checked one by one
+		if known is not None and obj in known.index:
+			task['known'] = tuple(known.loc[obj, ['proceed', 'vsx_id', 'vsx_type']])
+
+		if 'proceed' in state:
+			task['known'] = (state['proceed'], state.get('vsx_id'), state.get('vsx_type'))
+
+		if xids is not None:
+			task['xids'] = xids.loc[xids['obj'] == obj]
+
+		if urls is not None:
+			task['url'] = urls.get((task['field'], task['sid']))
+
+		yield task
+
+
+@instrument.tracked('lookup')
+def lookup(rec, journal=None):
+	'''Network stage: checks VSX, downloads the photometry, and cross-identifies the object. The outcome of the VSX
+	check is written to the journal, if given, as soon as it is known'''
+
+	import aavso, object_info
+
+	print('Now checking object {} of {}...'.format(str(rec['obj']), str(rec['total'])))
+
+	# check AAVSO's index (VSX) to see if variable star already exists at given position; check_vsx returns '1' if none found
+	if rec['known'] is not None:
+		rec['proceed'], rec['vsx_id'], rec['vsx_type'] = rec['known']
+	else:
+		with instrument.timer('check_vsx'):
+			rec['proceed'], rec['vsx_id'], rec['vsx_type'] = aavso.check_vsx(rec['ra_d'], rec['dec_d'],
+											rec['how_close'])
+
+	if journal is not None:
+		journal.lookup(rec)
+
+	# If there is already a nearby variable (nearby defined by 'how_close'), there is nothing more to look up
+	if rec['proceed'] != '1':
+		return rec
+
+	# objects the query file already shows to be hopeless are not downloaded
+	if rec.get('screened'):
+		print('Object {} is not worth downloading: {}'.format(rec['obj'], rec['screened']))
+		rec['rejected'] = rec['screened']
+		return rec
+
+	print('The field name is ' + rec['field'] + ' and the star_id is ' + rec['sid'])
+	rec['name'], url = object_info.set_name(rec['field'], rec['sid'], rec['url'], rec['url_template'])
+
+	# get the data from the url just generated with the object's name
+	with instrument.timer('get_data_from_web'):
+		dat = object_info.get_data_from_web(url, raw_file=None)
+	if dat.is_empty:
+		return rec
+
+	# plainly non-variable light curves go no further than the download
+	if rec.get('triage') is not None:
+		with instrument.timer('triage'):
+			rec['rejected'] = triage.reason(triage.statistics(dat), rec['triage'])
+		if rec['rejected']:
+			print('Object {} is not worth a period search: {}'.format(rec['obj'], rec['rejected']))
+			return rec
+		del rec['rejected']
+
+	# only the data points graded as A, B, or C are kept; the light curve travels to the analysis stage as the
+	# compact arrays of a LightCurve
+	rec['curve'] = dat
+
+	# only objects that are analyzed need cross-ids
+	if rec['auto'] != '1':
+		return rec
+
+	# check VizieR to cross match with objects in other catalogs...if in OGLE DIA, change to that name
+	import cross_id
+	try:
+		with instrument.timer('viz'):
+			if rec['xids'] is not None:
+				rec['x_matches'] = rec['xids'][['name', 'dist', 'ra', 'dec']]
+				rec['new_name'] = cross_id.new_names(rec['xids']).get(rec['obj'], 'Found nothing')
+			else:
+				rec['new_name'], rec['x_matches'] = cross_id.viz(rec['ra_d'], rec['dec_d'], rec['field'])
+	except cache.CacheMiss:
+		print('Offline mode and the cross-ids are not cached')
+		rec['new_name'], rec['x_matches'] = 'Found nothing', None
+
+	return rec
+
+
+def has_data(rec):
+	'''True if the lookup stage found photometry for the object'''
+
+	return isinstance(rec, dict) and 'curve' in rec
+
+
+@instrument.tracked('analyze')
+def analyze(rec):
+	'''Compute stage: plots the raw data and, in automatic mode, finds the period and epoch, adjusts the phase plot,
+	and writes the parameters and plots into a folder for the object. Without per-object folders (rec['folders']
+	is False) the analysis runs in a scratch directory that is removed afterwards and only the record keeps the
+	results, and no plots are made'''
+
+	if rec.get('folders', True):
+		return analyze_in_folder(rec)
+
+	rec['render'] = 'skip'
+
+	home = os.getcwd()
+	with tempfile.TemporaryDirectory() as scratch:
+		os.chdir(scratch)
+		try:
+			return analyze_in_folder(rec)
+		finally:
+			os.chdir(home)
+
+
+def analyze_in_folder(rec):
+	'''Runs the analysis of one object in a new folder under the current directory'''
+
+	import object_info, lombscargle, phase_adjustments, parameters, plotting, render
+
+	dat = rec.pop('curve')
+	name = rec['name']
+	auto_choice = rec['auto']
+
+	instrument.count('points', len(dat))
+
+	# At this point the user can decide whether or not to proceed based on their visual interpretation of the data
+	# In the future, the fully automatic feature will make this decision based on machine learning
+	# Skipping analysis in user input mode to generate csv file with vsx id and type
+	if auto_choice != '1':
+		with instrument.timer('plotting'):
+			plotting.plot_raw_data(dat, name, auto_choice)
+		print('')
+		os.remove(name + '_Raw_Data.png')
+		return rec
+
+	# the plots go where the record's render mode says, see render.emitter
+	plot = render.emitter(rec)
+
+	# create a new folder for the object and generate an empty dataframe to hold the analysis parameters
+	final_df, path = object_info.make_folder(name)
+
+	# write the csv and plot the raw data that was just pulled from the web into the newly created folder
+	if not Path(path + '/RAW_DATA.csv').is_file():
+		dat.to_frame().to_csv(os.path.join(path, 'RAW_DATA.csv'))
+		with instrument.timer('plotting'):
+			plotting.plot_raw_data(dat, name, auto_choice, plot, folder=path)
+	print('')
+
+	home = os.getcwd()
+	os.chdir(path)
+
+	try:
+		if rec['x_matches'] is not None:
+			rec['x_matches'].to_csv('Possible_cross_ids.csv')
+
+		if rec['new_name'] != 'Found nothing':
+			name = rec['new_name']
+
+		print('New name is ' + rec['new_name'])
+
+		# search for a frequency that yields an acceptable phase plot
+		with instrument.timer('find_freq'):
+			freq, folded_df = lombscargle.find_freq(dat, name, auto_choice, rec['ls_args'], plot)
+		folded_df.frame().to_csv('test_folded_df.csv')
+
+		# make adjustments to phase plot
+		with instrument.timer('phase_adjustments'):
+			epoch, zeroed = phase_adjustments.set_min_to_zero(folded_df)
+			phased = phase_adjustments.add_phases(zeroed, auto_choice)
+
+			adj = phase_adjustments.set_epoch(phased, auto_choice, rec['duration'])
+			phased.shift(adj)
+
+		# calculate relevant parameters, place in data frame, and then write to file
+		with instrument.timer('final_csv'):
+			period = parameters.final_csv(freq, epoch, adj, phased, auto_choice, name, final_df)
+		rec['name'], rec['period'], rec['epoch'], rec['minimum'], rec['maximum'] = final_df.iloc[0]
+
+		print('The name is ' + name)
+		# plot finalized phase diagram
+		with instrument.timer('plotting'):
+			plotting.final_phase_diagram(phased, name, period, auto_choice, plot)
+
+	finally:
+		os.chdir(home)
+
+	return rec
+
+
+def status_of(rec):
+	'''Short description of how far the analysis of an object got'''
+
+	if rec.get('proceed', '1') != '1':
+		return 'known'
+	if rec.get('rejected'):
+		return 'screened' if rec.get('screened') else 'rejected'
+	if 'period' in rec:
+		return 'analyzed'
+
+	return 'not analyzed'
+
+
+def record(df, rec):
+	'''Output stage: copies the VSX results and the parameters found for the object into the query dataframe'''
+
+	for column in ('vsx_id', 'vsx_type', 'rejected', 'period', 'epoch', 'minimum', 'maximum'):
+		if column in rec:
+			df.loc[rec['obj'], column] = rec[column]
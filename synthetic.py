@@ -0,0 +1,168 @@
+#!/usr/bin/python3
+
+import sys
+import numpy as np
+from lightcurve import LightCurve, GRADES
+
+
+# eclipsing binary types made by light_curve and the ranges their parameters are drawn from: period (days), out of
+# eclipse variation (mag), primary and secondary eclipse depths (mag) and eclipse width (sigma in phase)
+KINDS = ['EA', 'EB', 'EW']
+RANGES = {'EA': {'period': (1.0, 20.0), 'variation': (0.0, 0.01), 'primary': (0.3, 1.0), 'secondary': (0.05, 0.3),
+		'width': (0.01, 0.03)},
+	'EB': {'period': (0.4, 5.0), 'variation': (0.1, 0.3), 'primary': (0.2, 0.5), 'secondary': (0.05, 0.2),
+		'width': (0.04, 0.08)},
+	'EW': {'period': (0.25, 1.0), 'variation': (0.2, 0.6), 'primary': (0.0, 0.1), 'secondary': (0.0, 0.0),
+		'width': (0.1, 0.1)}}
+
+# OGLE-II like sampling: observing seasons of SEASON days every year from the first HJD, for YEARS years
+FIRST_HJD = 2450500.0
+SEASON = 240
+YEARS = 4
+
+
+def main():
+	'''main function for testing: makes one light curve of every type and a large one, and prints the page of a
+	light curve as it would come from the OGLE database'''
+
+	for kind in KINDS:
+		lc, params = light_curve(kind, 1000, seed=1)
+		print(kind, lc, {k: round(v, 3) if isinstance(v, float) else v for k, v in params.items()})
+
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+	print(light_curve('EA', n)[0])
+	print(html_page(pre_block(light_curve('EW', 5)[0]), 'BUL_SC1', 1))
+
+
+def light_curve(kind='EA', n=1000, period=None, noise=0.01, bad=0.05, seed=None):
+	'''A light curve of n observations of an eclipsing binary of the kind EA (detached, flat outside the eclipses),
+	EB (ellipsoidal variation and eclipses of clearly different depths) or EW (contact, continuous variation with
+	nearly equal minima). Times follow the OGLE-II seasons, magnitudes get gaussian noise of about noise mag, and a
+	fraction bad of the points is graded D to F. The primary minimum (largest magnitude) is at phase 0 of the epoch.
+	Returns the lightcurve.LightCurve and the parameters used'''
+
+	rand = np.random.RandomState(seed)
+	params = draw_params(kind, rand)
+	if period is not None:
+		params['period'] = period
+
+	# observation times within the seasons, in order
+	year = rand.randint(0, YEARS, n)
+	hjd = np.sort(FIRST_HJD + year * 365.25 + rand.rand(n) * SEASON)
+	phase = np.mod((hjd - params['epoch']) / params['period'], 1)
+
+	mag = model(phase, params) + rand.randn(n) * noise
+	err = noise * (0.8 + 0.4 * rand.rand(n))
+	flag = rand.choice([0, 40], n)
+	grade = np.where(rand.rand(n) < bad, rand.choice(GRADES[3:], n), rand.choice(GRADES[:3], n, p=[0.6, 0.3, 0.1]))
+
+	return LightCurve.from_hjd(hjd, np.round(mag, 3), np.round(err, 3), flag, grade), params
+
+
+def constant(n=1000, mag=15.0, noise=0.01, bad=0.05, seed=None):
+	'''A light curve of n observations of a constant star, sampled like light_curve, with gaussian noise of about
+	noise mag'''
+
+	lc, _ = light_curve('EA', n, noise=noise, bad=bad, seed=seed)
+	rand = np.random.RandomState(seed)
+
+	return LightCurve(lc.time, np.round(mag + rand.randn(n) * noise, 3), lc.mag_err, lc.flag, lc.grade, lc.index,
+				lc.reference)
+
+
+def draw_params(kind, rand):
+	'''Draws the parameters of a binary of the kind from RANGES'''
+
+	if kind not in RANGES:
+		raise ValueError('unknown eclipsing binary type {}; use one of {}'.format(kind, ', '.join(KINDS)))
+
+	params = {'kind': kind, 'mag': 13 + 4 * rand.rand()}
+	for name, (low, high) in RANGES[kind].items():
+		params[name] = low + (high - low) * rand.rand()
+	params['epoch'] = FIRST_HJD + params['period'] * rand.rand()
+
+	return params
+
+
+def model(phase, params):
+	'''Magnitudes at the phases (0 to 1, primary minimum at 0) for the parameters of a binary'''
+
+	# distance in phase to the nearest primary (0 or 1) and secondary (0.5) eclipse
+	to_primary = np.minimum(phase, 1 - phase)
+	to_secondary = np.abs(phase - 0.5)
+	width = params['width']
+
+	if params['kind'] == 'EW':
+		# contact binaries vary continuously with two minima per period, the primary slightly deeper
+		variation = params['variation'] * (1 + np.cos(4 * np.pi * phase)) / 2
+		return params['mag'] + variation + params['primary'] * (1 + np.cos(2 * np.pi * phase)) / 2
+
+	# ellipsoidal variation (the stars are faintest end on, at the eclipses) and the two eclipses
+	variation = params['variation'] * (1 + np.cos(4 * np.pi * phase)) / 2
+	eclipses = params['primary'] * np.exp(-0.5 * (to_primary / width) ** 2) + \
+		params['secondary'] * np.exp(-0.5 * (to_secondary / width) ** 2)
+
+	return params['mag'] + variation + eclipses
+
+
+def population(objects, n=1000, kinds=KINDS, seed=0):
+	'''Yields (parameters, light curve) for objects binaries of the kinds in turn, with n observations each, made
+	one at a time so any number of them can be run through the stages'''
+
+	for i in range(objects):
+		lc, params = light_curve(kinds[i % len(kinds)], n, seed=seed + i)
+		params['obj'] = i
+		yield params, lc
+
+
+def pre_block(lc):
+	'''Text of the <pre> block of an OGLE photometry page for the light curve: one line of HJD, mag, mag_err,
+	photometry flag and frame grade per observation'''
+
+	columns = [np.char.mod('%.5f', lc['HJD']), np.char.mod('%.3f', lc.mag), np.char.mod('%.3f', lc.mag_err),
+		np.char.mod('%d', lc.flag), np.asarray(lc['frame_grade'], dtype=str)]
+
+	return '\n'.join(map(' '.join, zip(*columns)))
+
+
+def html_page(table, field, star_id):
+	'''An OGLE database photometry page around the text of a <pre> block'''
+
+	return ('<html>\n<head><title>OGLE-II DIA photometry: {0} {1}</title></head>\n<body>\n'
+		'<h2>OGLE-II DIA photometry of {0} star {1}</h2>\n'
+		'<p>Columns: HJD, I-band magnitude, magnitude error, photometry flag, frame grade</p>\n'
+		'<pre>\n{2}\n</pre>\n</body>\n</html>\n').format(field, star_id, table)
+
+
+def vsx_page(neighbours):
+	'''A VSX search results page (format=d) listing the neighbours, (distance in arcmin, name, type) tuples or
+	(distance, name, type, ra, dec) ones with the position in degrees, in the given order: ten tables of page
+	layout, then the results table with a title row, a header row naming the columns (see
+	aavso.RESULTS_COLUMNS) and one row per neighbour of padded cells, so the row text also has the distance,
+	name, coordinates and type at the character positions the original parser read'''
+
+	layout = ''.join('<table><tr><td>layout {}</td></tr></table>\n'.format(i) for i in range(10))
+	rows = ['<tr><td>VSX search results</td></tr>', '<tr><td></td><td>Dist.</td><td>Name</td><td>Coords</td><td>Type</td></tr>']
+	for dist, name, kind, *position in neighbours:
+		coords = sexagesimal(*position) if position else '18 09 40.30 -32 33 22.1'
+		rows.append('<tr><td> Go </td><td>{:4.2f}\'   </td><td>{:<24}</td><td>{:<32}</td><td>{:<10}</td></tr>'.format(
+			dist, name, coords, kind))
+	if not neighbours:
+		rows.append('<tr><td> 1. There were no records found within the search radius.</td></tr>')
+
+	return ('<html>\n<head><title>AAVSO VSX search results</title></head>\n<body>\n{}<table>\n{}\n</table>\n'
+		'</body>\n</html>\n').format(layout, '\n'.join(rows))
+
+
+def sexagesimal(ra, dec):
+	'''Coordinates in degrees written the way VSX lists them, e.g. 18 09 40.30 -32 33 22.1'''
+
+	seconds = round(ra / 15 * 3600, 2) % 86400
+	arcsec = round(abs(dec) * 3600, 1)
+
+	return '{:02d} {:02d} {:05.2f} {}{:02d} {:02d} {:04.1f}'.format(int(seconds // 3600), int(seconds // 60 % 60),
+		seconds % 60, '-' if dec < 0 else '+', int(arcsec // 3600), int(arcsec // 60 % 60), arcsec % 60)
+
+
+if __name__ == '__main__':
+	main()
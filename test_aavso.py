@@ -0,0 +1,22 @@
+import os
+import aavso
+import synthetic
+
+
+TEST_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_folder')
+
+
+def test_parse_results_reads_whole_cells():
+	with open(os.path.join(TEST_FOLDER, 'test_vsx.html')) as f:
+		found = aavso.parse_results(f.read())
+
+	assert [neighbour.dist for neighbour in found] == [0.32, 0.85, 1.91, 12.47]
+	assert found[0].name == 'OGLE BUL-SC1 101'
+	assert found[-1].name == 'V1234 Sgr'
+	assert found[-1].type == 'EA/SD'
+	assert abs(found[-1].ra - (18 + 10 / 60 + 2.15 / 3600) * 15) < 1e-6
+	assert abs(found[-1].dec + (32 + 40 / 60 + 11.9 / 3600)) < 1e-6
+
+
+def test_parse_results_without_records():
+	assert aavso.parse_results(synthetic.vsx_page([])) == []
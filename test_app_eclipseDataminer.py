@@ -0,0 +1,38 @@
+import pytest
+import app_eclipseDataminer
+
+
+def write_config(tmp_path, text):
+	path = tmp_path / 'run.ini'
+	path.write_text('[eclipse_dataminer]\n' + text)
+	return str(path)
+
+
+def test_config_splits_nargs_options(tmp_path):
+	config = write_config(tmp_path, 'query_columns = Isig Ndetect\nquery_batch = 500\ntriage = yes\n')
+	args = app_eclipseDataminer.parse_args(['--config', config])
+
+	assert args.query_columns == ['Isig', 'Ndetect']
+	assert args.query_batch == 500
+	assert args.triage
+
+
+def test_command_line_wins_over_config(tmp_path):
+	config = write_config(tmp_path, 'query_columns = Isig Ndetect\nplots = skip\n')
+	args = app_eclipseDataminer.parse_args(['--config', config, '--query-columns', 'Imederr', '--plots', 'inline'])
+
+	assert args.query_columns == ['Imederr']
+	assert args.plots == 'inline'
+
+
+def test_config_checks_choices(tmp_path):
+	config = write_config(tmp_path, 'plots = bogus\n')
+	with pytest.raises(SystemExit):
+		app_eclipseDataminer.parse_args(['--config', config])
+
+	assert app_eclipseDataminer.parse_args(['--config', write_config(tmp_path, 'plots = skip\n')]).plots == 'skip'
+
+
+def test_config_rejects_unknown_options(tmp_path):
+	with pytest.raises(SystemExit):
+		app_eclipseDataminer.parse_args(['--config', write_config(tmp_path, 'bogus = 1\n')])
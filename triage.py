@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+
+import numpy as np
+
+
+# a light curve is worth a period search if any of these says it varies: reduced chi-square against a constant
+# magnitude, Stetson's J, or the spread between the 1st and 99th percentile magnitudes in median errors. Curves with
+# fewer than MIN_POINTS good points, or skewed toward bright magnitudes (outbursts and outliers, not eclipses) by
+# more than MIN_SKEW, are rejected too
+MIN_CHI2 = 3.0
+MIN_STETSON_J = 0.3
+MIN_AMPLITUDE = 8.0
+MIN_SKEW = -0.5
+MIN_POINTS = 20
+
+# observations closer than this (days) are paired for Stetson's J, and errors are taken to be at least ERR_FLOOR mag
+PAIR_DAYS = 0.02
+ERR_FLOOR = 0.002
+
+# the query file screen: objects with fewer than MIN_POINTS detections, or whose scatter (Isig) is within
+# MIN_SCATTER times their median error (Imederr), are not downloaded
+MIN_SCATTER = 1.5
+
+# thresholds used unless others are given, see reason
+DEFAULTS = {'min_chi2': MIN_CHI2, 'min_stetson_j': MIN_STETSON_J, 'min_amplitude': MIN_AMPLITUDE,
+		'min_skew': MIN_SKEW, 'min_points': MIN_POINTS}
+
+
+def main():
+	'''main function for testing: the statistics and verdict of synthetic binaries and of constant stars'''
+
+	import synthetic
+
+	for kind in synthetic.KINDS:
+		lc, _ = synthetic.light_curve(kind, 1000, seed=1)
+		lc = lc.good()
+		print(kind, rounded(statistics(lc)), reason(statistics(lc)))
+
+	lc = synthetic.constant(1000, seed=1).good()
+	print('constant', rounded(statistics(lc)), reason(statistics(lc)))
+
+
+def statistics(lc):
+	'''Variability statistics of a light curve (lightcurve.LightCurve), computed on its arrays at once: number of
+	points, reduced chi-square against the weighted mean magnitude, Stetson's J and K, skewness (positive toward
+	faint magnitudes, as eclipses make it) and the 1st to 99th percentile amplitude in units of the median error'''
+
+	n = len(lc)
+	if n < 2:
+		return {'n': n, 'chi2': 0.0, 'stetson_j': 0.0, 'stetson_k': 0.0, 'skew': 0.0, 'amplitude': 0.0}
+
+	mag = lc.mag.astype(np.float64)
+	err = np.maximum(lc.mag_err.astype(np.float64), ERR_FLOOR)
+	weight = 1 / err ** 2
+	mean = np.sum(mag * weight) / np.sum(weight)
+	residual = mag - mean
+
+	chi2 = np.sum(residual ** 2 * weight) / (n - 1)
+
+	# Stetson (1996): relative residuals, products of pairs of close observations and the squares of the rest less one
+	delta = np.sqrt(n / (n - 1)) * residual / err
+	# runs of close observations are paired greedily, (i, i + 1), (i + 2, i + 3)...: a pair starts at every even
+	# offset from the start of its run
+	close = np.diff(lc.time) < PAIR_DAYS
+	step = np.arange(n - 1)
+	start = np.maximum.accumulate(np.where(close & ~np.concatenate([[False], close[:-1]]), step, 0))
+	first = close & ((step - start) % 2 == 0)
+	paired = np.zeros(n, dtype=bool)
+	paired[:-1] |= first
+	paired[1:] |= first
+	p = np.concatenate([delta[:-1][first] * delta[1:][first], delta[~paired] ** 2 - 1])
+	stetson_j = np.mean(np.sign(p) * np.sqrt(np.abs(p)))
+	stetson_k = np.mean(np.abs(delta)) / np.sqrt(np.mean(delta ** 2))
+
+	spread = np.std(mag)
+	skew = np.mean((mag - mag.mean()) ** 3) / spread ** 3 if spread > 0 else 0.0
+	low, high = np.percentile(mag, [1, 99])
+
+	return {'n': n, 'chi2': float(chi2), 'stetson_j': float(stetson_j), 'stetson_k': float(stetson_k),
+		'skew': float(skew), 'amplitude': float((high - low) / np.median(err))}
+
+
+def reason(stats, thresholds=None):
+	'''Why a light curve with these statistics is not worth a period search, or None if it is'''
+
+	limits = dict(DEFAULTS, **(thresholds or {}))
+
+	if stats['n'] < limits['min_points']:
+		return 'too few points'
+	if stats['chi2'] < limits['min_chi2'] and stats['stetson_j'] < limits['min_stetson_j'] and \
+			stats['amplitude'] < limits['min_amplitude']:
+		return 'constant'
+	if stats['skew'] < limits['min_skew']:
+		return 'skewed bright'
+
+	return None
+
+
+def screen_query(df, thresholds=None):
+	'''Screens the objects of a query dataframe before anything is downloaded, from the OGLE query columns Ndetect,
+	Isig and Imederr: returns the reason an object is not worth downloading, indexed like df, None for the rest.
+	Columns left out of the query (see initial_setup.read_batches) are not screened on'''
+
+	import pandas as pd
+
+	limits = dict(DEFAULTS, **(thresholds or {}))
+	reasons = pd.Series(np.full(len(df), None, dtype=object), index=df.index)
+
+	if 'Isig' in df and 'Imederr' in df:
+		scatter = pd.to_numeric(df['Isig'], errors='coerce')
+		error = pd.to_numeric(df['Imederr'], errors='coerce')
+		reasons[(scatter < MIN_SCATTER * error).to_numpy()] = 'constant'
+
+	if 'Ndetect' in df:
+		reasons[(pd.to_numeric(df['Ndetect'], errors='coerce') < limits['min_points']).to_numpy()] = 'too few points'
+
+	return reasons
+
+
+def savings(statuses, stage_totals):
+	'''Describes the compute saved by the triage, from the count of objects of every status and the total time of
+	every stage by status (see instrument.Monitor): rejected objects would have taken as long as the analyzed ones
+	did on average, and those screened before download their lookup as well'''
+
+	rejected = statuses['rejected'] + statuses['screened']
+	if not rejected:
+		return None
+
+	analyzed = statuses['analyzed']
+	if not analyzed:
+		return 'Triage rejected {} objects ({} before download)'.format(rejected, statuses['screened'])
+
+	analysis = stage_totals['analyzed']['analyze'] / analyzed
+	lookup = stage_totals['analyzed']['lookup'] / analyzed
+	saved = rejected * analysis + statuses['screened'] * lookup
+
+	return ('Triage rejected {} objects ({} before download): about {:.0f} s of analysis saved at {:.2f} s per '
+		'analyzed object').format(rejected, statuses['screened'], saved, analysis + lookup)
+
+
+def rounded(stats):
+	return {name: round(value, 3) for name, value in stats.items()}
+
+
+if __name__ == '__main__':
+	main()
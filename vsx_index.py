@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+
+import sys
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+
+# byte ranges of the columns used from the VSX catalog dump (vsx.dat of CDS catalog B/vsx)
+VSX_COLSPECS = [(8, 38), (41, 50), (51, 60), (61, 91)]
+VSX_NAMES = ['Name', 'RAdeg', 'DEdeg', 'Type']
+
+# neighbours farther than this (in arcmin) are not reported, like the default radius of a VSX position search
+SEARCH_RADIUS = 2.0
+
+
+def main():
+	'''Ingest command: reads a VSX catalog dump and writes the index file, e.g.
+	python3 vsx_index.py vsx.dat vsx_index.npz'''
+
+	if len(sys.argv) != 3:
+		print('Usage: vsx_index.py VSX_DUMP INDEX_FILE')
+		return
+
+	index = ingest(sys.argv[1], sys.argv[2])
+	print('Indexed {} VSX objects into {}'.format(len(index), sys.argv[2]))
+
+
+def read_dump(dump_file):
+	'''Reads the name, position and type of every object in a VSX dump; either the fixed width vsx.dat file from
+	CDS or a csv file with Name, RAdeg, DEdeg and Type columns'''
+
+	if dump_file.endswith('.csv'):
+		cat = pd.read_csv(dump_file, usecols=VSX_NAMES)
+	else:
+		cat = pd.read_fwf(dump_file, colspecs=VSX_COLSPECS, names=VSX_NAMES, header=None)
+
+	cat = cat.dropna(subset=['RAdeg', 'DEdeg'])
+	cat['Name'] = cat['Name'].fillna('').astype(str).str.strip()
+	cat['Type'] = cat['Type'].fillna('').astype(str).str.strip()
+
+	return cat
+
+
+def ingest(dump_file, index_file):
+	'''Loads a VSX catalog dump into a compact index file and returns the loaded index'''
+
+	cat = read_dump(dump_file)
+	np.savez_compressed(index_file, ra=cat['RAdeg'].to_numpy(np.float64), dec=cat['DEdeg'].to_numpy(np.float64),
+				name=cat['Name'].to_numpy(str), type=cat['Type'].to_numpy(str))
+
+	return VSXIndex(cat['RAdeg'], cat['DEdeg'], cat['Name'], cat['Type'])
+
+
+def load(index_file):
+	'''Reads an index file written by ingest'''
+
+	with np.load(index_file) as f:
+		return VSXIndex(f['ra'], f['dec'], f['name'], f['type'])
+
+
+def unit_vectors(ra, dec):
+	'''Converts right ascension and declination in degrees to unit vectors on the sphere'''
+
+	ra = np.radians(np.asarray(ra, dtype=np.float64))
+	dec = np.radians(np.asarray(dec, dtype=np.float64))
+	cos_dec = np.cos(dec)
+
+	return np.column_stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)])
+
+
+def chord(arcmin):
+	'''Straight line distance between two unit vectors separated by the angle given in arcmin'''
+
+	return 2 * np.sin(np.radians(np.asarray(arcmin) / 60) / 2)
+
+
+def arcmin(chord_len):
+	'''Angle in arcmin between two unit vectors separated by the chord length given'''
+
+	return np.degrees(2 * np.arcsin(np.clip(np.asarray(chord_len) / 2, 0, 1))) * 60
+
+
+class VSXIndex:
+	'''KD-tree over the unit vectors of the VSX objects answering nearest neighbour and within radius queries for
+	whole arrays of positions at once'''
+
+	def __init__(self, ra, dec, name, var_type):
+		self.ra = np.asarray(ra, dtype=np.float64)
+		self.dec = np.asarray(dec, dtype=np.float64)
+		self.name = np.asarray(name, dtype=str)
+		self.type = np.asarray(var_type, dtype=str)
+		self.tree = cKDTree(unit_vectors(self.ra, self.dec))
+
+	def __len__(self):
+		return len(self.ra)
+
+	def nearest(self, ra, dec, max_dist=SEARCH_RADIUS):
+		'''Returns the distance in arcmin, name, and type of the nearest VSX object to each position; positions with
+		nothing within max_dist arcmin get an infinite distance and empty name and type'''
+
+		d, i = self.tree.query(unit_vectors(ra, dec), distance_upper_bound=chord(max_dist))
+		found = np.isfinite(d)
+		i = np.where(found, i, 0)
+		dist = np.where(found, arcmin(np.where(found, d, 0)), np.inf)
+		names = np.where(found, self.name[i], '')
+		types = np.where(found, self.type[i], '')
+
+		return dist, names, types
+
+	def within(self, ra, dec, radius):
+		'''Returns, for each position, the array of VSX row numbers within radius arcmin'''
+
+		return self.tree.query_ball_point(unit_vectors(ra, dec), chord(radius), return_sorted=True)
+
+
+if __name__ == '__main__':
+	main()